@@ -1,133 +1,32 @@
+"""
+Интерфейс командной строки ассемблера УВМ.
+
+Ассемблирование находится в модуле assembly; его имена доступны и из этого модуля для кода,
+который импортирует их отсюда.
+"""
 import argparse  # Модуль для парсинга аргументов командной строки
+import contextlib  # Модуль для управления несколькими открытыми файлами
+import io  # Разбиение исходного текста из кэша на строки
 import json  # Модуль для работы с JSON-форматом
 import sys  # Модуль для взаимодействия с интерпретатором Python
 
+import build_cache  # Кэш собранных программ
+import optimizer  # Оптимизирующий проход
+from assembly import (  # Ассемблирование исходного кода УВМ
+    AssemblerError, assemble, assemble_instruction, assemble_parallel, assemble_stream, data_file_digests,
+    iter_assemble, iter_assemble_parallel, load_data_file, parse_data_directive,
+)
 
-def assemble_instruction(line):
-    """
-    Функция для ассемблирования одной строки исходного кода УВМ.
-
-    Параметры:
-        line (str): Одна строка исходного кода.
-
-    Возвращает:
-        tuple: Содержит бинарную инструкцию и словарь с полями инструкции.
-               Если строка является комментарием или пустой, возвращает (None, None).
 
-    Исключения:
-        ValueError: Если обнаружены некорректные значения полей или неизвестный opcode.
+def write_outputs(binary_file, binary_code, log_file=None, log_text=None):
     """
-    # Разделяем строку на токены по пробелам и удаляем начальные/конечные пробелы
-    tokens = line.strip().split()
-
-    # Если строка пустая или начинается с символа '#', считаем её комментарием и пропускаем
-    if not tokens or tokens[0].startswith('#'):
-        return None, None
-
-    # Получаем opcode (команду) и приводим его к верхнему регистру для стандартизации
-    opcode = tokens[0].upper()
-
-    if opcode == 'LOAD_CONST':
-        # Формат команды: LOAD_CONST B C
-        A = 10  # Устанавливаем фиксированное значение для поля A
-        B = int(tokens[1])  # Получаем значение поля B из второго токена
-        C = int(tokens[2])  # Получаем значение поля C из третьего токена
-
-        # Проверяем, что значения полей находятся в допустимых диапазонах
-        if not (0 <= A <= 0x7F):
-            raise ValueError(f"Field A={A} out of range for LOAD_CONST (0-127)")
-        if not (0 <= B <= 0x7):
-            raise ValueError(f"Field B={B} out of range for LOAD_CONST (0-7)")
-        if not (0 <= C <= 0xFFFFFF):
-            raise ValueError(f"Field C={C} out of range for LOAD_CONST (0-16777215)")
-
-        # Формируем бинарную инструкцию путем объединения полей A, B и C
-        # A занимает биты 0-6, B — биты 7-9, C — биты 10-33
-        instruction = (A << 0) | (B << 7) | (C << 10)
-
-        # Преобразуем инструкцию в байты (5 байт) с порядком байтов 'little endian'
-        binary = instruction.to_bytes(5, byteorder='little')
-
-        # Создаем запись для лога с разобранными полями
-        log_entry = {'A': A, 'B': B, 'C': C}
-
-    elif opcode == 'READ_MEM':
-        # Формат команды: READ_MEM B C
-        A = 54  # Устанавливаем фиксированное значение для поля A
-        B = int(tokens[1])  # Получаем значение поля B из второго токена
-        C = int(tokens[2])  # Получаем значение поля C из третьего токена
-
-        # Проверяем, что значения полей находятся в допустимых диапазонах
-        if not (0 <= A <= 0x7F):
-            raise ValueError(f"Field A={A} out of range for READ_MEM (0-127)")
-        if not (0 <= B <= 0xFFFFFFFF):
-            raise ValueError(f"Field B={B} out of range for READ_MEM (0-4294967295)")
-        if not (0 <= C <= 0x7):
-            raise ValueError(f"Field C={C} out of range for READ_MEM (0-7)")
-
-        # Формируем бинарную инструкцию
-        # A занимает биты 0-6, B — биты 7-38, C — биты 39-41
-        instruction = (A & 0x7F) | ((B & 0xFFFFFFFF) << 7) | ((C & 0x7) << 39)
-
-        # Преобразуем инструкцию в байты (6 байт) с порядком байтов 'little endian'
-        binary = instruction.to_bytes(6, byteorder='little')
-
-        # Создаем запись для лога с разобранными полями
-        log_entry = {'A': A, 'B': B, 'C': C}
-
-    elif opcode == 'WRITE_MEM':
-        # Формат команды: WRITE_MEM B C
-        A = 39  # Устанавливаем фиксированное значение для поля A
-        B = int(tokens[1])  # Получаем значение поля B из второго токена
-        C = int(tokens[2])  # Получаем значение поля C из третьего токена
-
-        # Проверяем, что значения полей находятся в допустимых диапазонах
-        if not (0 <= A <= 0x7F):
-            raise ValueError(f"Field A={A} out of range for WRITE_MEM (0-127)")
-        if not (0 <= B <= 0x7):
-            raise ValueError(f"Field B={B} out of range for WRITE_MEM (0-7)")
-        if not (0 <= C <= 0x7):
-            raise ValueError(f"Field C={C} out of range for WRITE_MEM (0-7)")
-
-        # Формируем бинарную инструкцию
-        # A занимает биты 0-6, B — биты 7-9, C — биты 10-12
-        instruction = (A & 0x7F) | ((B & 0x7) << 7) | ((C & 0x7) << 10)
-
-        # Преобразуем инструкцию в байты (2 байта) с порядком байтов 'little endian'
-        binary = instruction.to_bytes(2, byteorder='little')
-
-        # Создаем запись для лога с разобранными полями
-        log_entry = {'A': A, 'B': B, 'C': C}
-
-    elif opcode == 'POPCNT':
-        # Формат команды: POPCNT B C
-        A = 18  # Устанавливаем фиксированное значение для поля A
-        B = int(tokens[1])  # Получаем значение поля B из второго токена
-        C = int(tokens[2])  # Получаем значение поля C из третьего токена
-
-        # Проверяем, что значения полей находятся в допустимых диапазонах
-        if not (0 <= A <= 0x7F):
-            raise ValueError(f"Field A={A} out of range for POPCNT (0-127)")
-        if not (0 <= B <= 0x7):
-            raise ValueError(f"Field B={B} out of range for POPCNT (0-7)")
-        if not (0 <= C <= 0xFFFFFFFF):
-            raise ValueError(f"Field C={C} out of range for POPCNT (0-4294967295)")
-
-        # Формируем бинарную инструкцию
-        # A занимает биты 0-6, B — биты 7-9, C — биты 10-41
-        instruction = (A & 0x7F) | ((B & 0x7) << 7) | ((C & 0xFFFFFFFF) << 10)
-
-        # Преобразуем инструкцию в байты (6 байт) с порядком байтов 'little endian'
-        binary = instruction.to_bytes(6, byteorder='little')
-
-        # Создаем запись для лога с разобранными полями
-        log_entry = {'A': A, 'B': B, 'C': C}
-
-    else:
-        # Если opcode не распознан, выбрасываем исключение
-        raise ValueError(f"Unknown opcode: {opcode}")
-
-    return binary, log_entry
+    Записывает бинарный код и, если указан лог-файл, текст лога.
+    """
+    with open(binary_file, 'wb') as f:
+        f.write(binary_code)
+    if log_file:
+        with open(log_file, 'w') as f:
+            f.write(log_text)
 
 
 def main():
@@ -141,6 +40,22 @@ def main():
         4. Записывает бинарные данные в выходной файл.
         5. Если указан, записывает лог с разобранными полями инструкций в JSON-файл.
 
+    С флагом --optimize программа перед записью проходит через оптимизатор (см. optimizer.py).
+
+    С флагом --cache-dir результат ищется в кэше сборки (см. build_cache.py) и сохраняется в него.
+
+    С флагом --stream бинарный код и лог (в формате NDJSON) записываются по мере чтения
+    исходного файла, не накапливаясь в памяти.
+
+    С флагом --jobs N исходный файл делится на фрагменты, которые ассемблируются в N процессах.
+
+    С флагом --incremental рядом с бинарным файлом ведётся индекс строк, и при повторной сборке
+    перекодируются только изменившиеся строки (см. incremental.py).
+
+    С флагом --container бинарный код записывается в контейнер с заголовком и контрольной суммой
+    (см. container.py); --offsets добавляет в контейнер таблицу смещений команд. Директивы .data
+    (см. parse_data_directive) допускаются только в контейнере и записываются в его сегмент данных.
+
     При возникновении ошибки в процессе ассемблирования выводит сообщение об ошибке и завершает работу с кодом 1.
     """
     # Создаём парсер для обработки аргументов командной строки
@@ -152,43 +67,144 @@ def main():
 
     # Определяем необязательный аргумент: путь к лог-файлу
     parser.add_argument('--log_file', help='Path to the assembler log file.')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream the binary to disk while reading the source; the log is written as NDJSON.')
+    parser.add_argument('--optimize', type=int, choices=(0, 1, 2), default=0,
+                        help='Optimization level: 1 - register/store optimizations, '
+                             '2 - also assume zero-initialized memory.')
+    parser.add_argument('--memory-size', type=int, default=1024,
+                        help='Memory size used to prove accesses in bounds when optimizing.')
+    parser.add_argument('--cache-dir', help='Directory of the content-addressed build cache.')
+    parser.add_argument('--cache-size', type=int, default=build_cache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help='Build cache size limit in megabytes.')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Assemble in N worker processes (0 - one per CPU).')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep a line-to-offset index next to the binary and re-encode only changed lines.')
+    parser.add_argument('--container', action='store_true',
+                        help='Write a versioned container with a header, opcode histogram and checksum.')
+    parser.add_argument('--offsets', action='store_true',
+                        help='Also store the instruction offset table in the container.')
 
     # Парсим переданные аргументы
     args = parser.parse_args()
-
-    # Инициализируем переменные для хранения бинарного кода и лог-записей
-    binary_code = b''
-    log_entries = []
-
-    # Открываем исходный файл для чтения
-    with open(args.source_file, 'r') as f:
-        # Проходим по каждой строке в файле
-        for line in f:
+    if args.stream and args.optimize:
+        parser.error('--optimize cannot be combined with --stream.')
+    if args.stream and args.cache_dir:
+        parser.error('--cache-dir cannot be combined with --stream.')
+    if args.jobs < 0:
+        parser.error('--jobs must be non-negative.')
+    parallel = args.jobs != 1
+    if args.offsets and not args.container:
+        parser.error('--offsets requires --container.')
+    if args.container and (args.stream or args.incremental):
+        parser.error('--container cannot be combined with --stream or --incremental.')
+    if args.container:
+        import container
+
+    # Инкрементальная сборка правит бинарный файл по индексу строк; лог и оптимизация
+    # требуют полной картины программы, поэтому с ней не сочетаются
+    if args.incremental:
+        if args.stream or args.optimize or args.cache_dir or parallel or args.log_file:
+            parser.error('--incremental cannot be combined with --stream, --optimize, --cache-dir, '
+                         '--jobs or --log_file.')
+        import incremental
+        with open(args.source_file, 'rb') as f:
+            source = f.read()
+        try:
+            summary = incremental.reassemble(source, args.binary_file)
+        except AssemblerError as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(1)
+        print(f"incremental: {summary['mode']}, {summary['lines_encoded']} line(s) encoded, "
+              f"{summary['bytes_written']} byte(s) written")
+        return
+
+    # В потоковом режиме код и лог пишутся на диск по мере чтения исходного файла
+    if args.stream:
+        with contextlib.ExitStack() as stack:
+            src = stack.enter_context(open(args.source_file, 'r'))
+            out = stack.enter_context(open(args.binary_file, 'wb'))
+            log = stack.enter_context(open(args.log_file, 'w')) if args.log_file else None
             try:
-                # Ассемблируем текущую строку
-                binary_instr, log_entry = assemble_instruction(line)
-
-                # Если инструкция успешно ассемблирована, добавляем её бинарное представление
-                if binary_instr:
-                    binary_code += binary_instr
-
-                # Если требуется логирование, добавляем запись в лог
-                if log_entry:
-                    log_entries.append(log_entry)
-
-            except Exception as e:
-                # В случае ошибки выводим сообщение об ошибке и завершаем работу с кодом 1
-                print(f"Error assembling line: {line.strip()} - {e}", file=sys.stderr)
+                if parallel:
+                    # Фрагменты записываются по мере готовности, в исходном порядке
+                    encode_log = json.JSONEncoder(separators=(',', ':')).encode
+                    for binary_code, chunk_log in iter_assemble_parallel(args.source_file, args.jobs or None,
+                                                                         log is not None):
+                        out.write(binary_code)
+                        if log is not None:
+                            log.writelines(encode_log(entry) + '\n' for entry in chunk_log)
+                else:
+                    assemble_stream(src, out, log)
+            except AssemblerError as e:
+                print(str(e), file=sys.stderr)
                 sys.exit(1)
+        return
 
-    # Записываем собранный бинарный код в выходной файл
-    with open(args.binary_file, 'wb') as f:
-        f.write(binary_code)
-
-    # Если указан лог-файл, записываем туда лог-записи в формате JSON
-    if args.log_file:
-        with open(args.log_file, 'w') as f:
-            json.dump(log_entries, f, indent=2)
+    # Список для хранения лог-записей и, для контейнера, сегментов данных директив .data
+    log_entries = []
+    data_segments = [] if args.container else None
+
+    # При включённом кэше сначала ищем готовый результат по хэшу исходного текста и параметров
+    cache = None
+    if args.cache_dir:
+        with open(args.source_file, 'rb') as f:
+            source = f.read()
+        cache = build_cache.BuildCache(args.cache_dir, args.cache_size * 1024 * 1024)
+        # Размер памяти влияет только на оптимизацию: без неё он не входит в ключ
+        options = {'optimize': args.optimize}
+        if args.optimize:
+            options['memory_size'] = args.memory_size
+        # StringIO с newline=None делит строки так же, как файл, открытый в текстовом режиме (str.splitlines
+        # делит ещё и по \x0b, \x0c, \x1c-\x1e, \x85 и \u2028, и результат зависел бы от кэша)
+        lines = list(io.StringIO(source.decode('utf-8'), newline=None))
+        if args.container:
+            # Контейнер (вместе с сегментами данных) хранится в кэше целиком; значения из файлов
+            # директив .data @<файл> учитываются в ключе по хэшам этих файлов
+            options.update(container=True, offsets=args.offsets, data_files=data_file_digests(lines))
+        key = build_cache.cache_key(source, **options)
+        cached = cache.get(key)
+        if cached is not None:
+            binary_code, log_text = cached
+            write_outputs(args.binary_file, binary_code, args.log_file, log_text)
+            return
+    else:
+        lines = None
+
+    # Открываем исходный файл для чтения и ассемблируем его построчно (или фрагментами в пуле процессов)
+    with contextlib.ExitStack() as stack:
+        if lines is None and not parallel:
+            lines = stack.enter_context(open(args.source_file, 'r'))
+        try:
+            if parallel:
+                binary_code = assemble_parallel(args.source_file, args.jobs or None, log_entries,
+                                                data_segments=data_segments)
+            else:
+                binary_code = assemble(lines, log_entries, data_segments)
+        except AssemblerError as e:
+            # В случае ошибки выводим сообщение об ошибке и завершаем работу с кодом 1
+            print(str(e), file=sys.stderr)
+            sys.exit(1)
+
+    # При необходимости оптимизируем программу и выводим отчёт о сэкономленных командах и байтах
+    if args.optimize:
+        if data_segments and args.optimize >= 2:
+            print("Optimization level 2 assumes zero-initialized memory and cannot be used with .data directives.",
+                  file=sys.stderr)
+            sys.exit(1)
+        instructions = [(entry['A'], entry['B'], entry['C']) for entry in log_entries]
+        instructions, report = optimizer.optimize(instructions, args.optimize, args.memory_size)
+        binary_code, log_entries = optimizer.encode(instructions)
+        print(optimizer.format_report(report))
+
+    # Записываем бинарный код и лог (в формате JSON) и сохраняем результат в кэш
+    if args.container:
+        binary_code = container.pack(binary_code, args.offsets, data_segments)
+    log_text = json.dumps(log_entries, indent=2)
+    write_outputs(args.binary_file, binary_code, args.log_file, log_text)
+    if cache is not None:
+        cache.put(key, binary_code, log_text)
 
 
 # Проверяем, что скрипт запускается непосредственно, а не импортируется как модуль
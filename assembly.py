@@ -0,0 +1,402 @@
+"""
+Ассемблирование исходного кода УВМ: кодирование команд, директивы .data, потоковая и параллельная сборка.
+
+Модуль не зависит от командной строки и импортируется остальными модулями (инкрементальная сборка,
+сервис и т.д.); assembler.py — интерфейс командной строки поверх него.
+"""
+import hashlib  # Хэши файлов данных для ключа кэша
+import io  # Разбиение фрагментов исходного файла на строки
+import json  # Модуль для работы с JSON-форматом
+import multiprocessing  # Пул процессов для параллельного ассемблирования
+import os  # Размер исходного файла и количество процессоров
+import sys  # Порядок байтов платформы
+from array import array  # Значения сегментов данных
+
+from isa import ENCODERS  # Кодировщики команд, построенные по таблице ISA
+
+
+def assemble_instruction(line):
+    """
+    Функция для ассемблирования одной строки исходного кода УВМ.
+
+    Параметры:
+        line (str): Одна строка исходного кода.
+
+    Возвращает:
+        tuple: Содержит бинарную инструкцию и словарь с полями инструкции.
+               Если строка является комментарием или пустой, возвращает (None, None).
+
+    Исключения:
+        ValueError: Если обнаружены некорректные значения полей или неизвестный opcode.
+    """
+    # Разделяем строку на токены по пробелам и удаляем начальные/конечные пробелы
+    tokens = line.strip().split()
+
+    # Если строка пустая или начинается с символа '#', считаем её комментарием и пропускаем
+    if not tokens or tokens[0].startswith('#'):
+        return None, None
+
+    # Получаем opcode (команду) и приводим его к верхнему регистру для стандартизации
+    opcode = tokens[0].upper()
+
+    # Находим кодировщик команды в таблице ISA
+    encoder = ENCODERS.get(opcode)
+    if encoder is None and opcode == DATA_DIRECTIVE.upper():
+        raise ValueError("Data directives require a container binary (assembler.py --container).")
+    if encoder is None:
+        # Если opcode не распознан, выбрасываем исключение
+        raise ValueError(f"Unknown opcode: {opcode}")
+    A, encode = encoder
+
+    # Формат всех команд: <OPCODE> B C
+    B = int(tokens[1])  # Получаем значение поля B из второго токена
+    C = int(tokens[2])  # Получаем значение поля C из третьего токена
+
+    # Кодировщик проверяет диапазоны полей и упаковывает их согласно раскладке из isa.py
+    binary = encode(B, C)
+
+    # Создаем запись для лога с разобранными полями
+    log_entry = {'A': A, 'B': B, 'C': C}
+
+    return binary, log_entry
+
+
+# Директива сегмента данных: .data <адрес> <значение> ... или .data <адрес> @<файл>
+DATA_DIRECTIVE = '.data'
+
+# Наибольший адрес сегмента данных (ширина адресного поля команд) и наибольшее значение ячейки
+DATA_MAX_ADDRESS = (1 << 32) - 1
+DATA_MAX_VALUE = (1 << 64) - 1
+
+# Расширения файлов данных с 64-битными словами little-endian подряд (как вывод interpreter.py --format raw)
+RAW_DATA_EXTENSIONS = ('.raw', '.u64')
+
+
+def load_data_file(path):
+    """
+    Читает значения сегмента данных из файла.
+
+    Файлы с расширением из RAW_DATA_EXTENSIONS читаются как 64-битные слова little-endian одним
+    вызовом array.frombytes; остальные — как текст с целыми числами, разделёнными пробельными символами.
+
+    Параметры:
+        path (str): Путь к файлу (относительно текущего каталога).
+
+    Возвращает:
+        array: Значения (array('Q')).
+
+    Исключения:
+        ValueError: Если файл содержит недопустимые значения.
+        OSError: Если файл не удалось прочитать.
+    """
+    values = array('Q')
+    if path.lower().endswith(RAW_DATA_EXTENSIONS):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) % values.itemsize:
+            raise ValueError(f"Raw data file {path} size is not a multiple of {values.itemsize} bytes")
+        values.frombytes(data)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+    with open(path) as f:
+        return _data_values(f.read().split())
+
+
+def _data_values(tokens):
+    """
+    Преобразует токены в значения ячеек, проверяя диапазон.
+    """
+    try:
+        return array('Q', map(int, tokens))
+    except OverflowError:
+        raise ValueError(f"Data values must be in range 0-{DATA_MAX_VALUE}") from None
+
+
+def parse_data_directive(line):
+    """
+    Разбирает директиву сегмента данных.
+
+    Формат:
+        .data <адрес> <значение> [<значение> ...]  — значения ячеек, начиная с адреса;
+        .data <адрес> @<файл>                       — значения из файла (см. load_data_file).
+
+    Параметры:
+        line (str): Строка исходного кода.
+
+    Возвращает:
+        tuple: (адрес, array('Q') значений).
+
+    Исключения:
+        ValueError: Если директива некорректна.
+    """
+    tokens = line.split('#', 1)[0].split()
+    if tokens[0].lower() != DATA_DIRECTIVE:
+        raise ValueError(f"Unknown directive: {tokens[0]}")
+    if len(tokens) < 3:
+        raise ValueError("Data directive requires an address and at least one value or @file")
+    addr = int(tokens[1])
+    if len(tokens) == 3 and tokens[2].startswith('@'):
+        values = load_data_file(tokens[2][1:])
+    else:
+        values = _data_values(tokens[2:])
+    if not (0 <= addr <= DATA_MAX_ADDRESS) or addr + len(values) - 1 > DATA_MAX_ADDRESS:
+        raise ValueError(f"Data segment at {addr} with {len(values)} values is out of range 0-{DATA_MAX_ADDRESS}")
+    return addr, values
+
+
+def data_file_digests(lines):
+    """
+    Вычисляет хэши файлов, на которые ссылаются директивы .data <адрес> @<файл>.
+
+    Результат сборки зависит от содержимого этих файлов, поэтому хэши входят в ключ кэша сборки:
+    изменённый файл данных даёт новый ключ, а не устаревший результат из кэша.
+
+    Параметры:
+        lines (Iterable[str]): Строки исходного кода.
+
+    Возвращает:
+        dict[str, str | None]: Путь к файлу -> шестнадцатеричный SHA-256 содержимого
+                               (None, если файл не удалось прочитать).
+    """
+    digests = {}
+    for line in lines:
+        tokens = line.split('#', 1)[0].split()
+        if len(tokens) != 3 or tokens[0].lower() != DATA_DIRECTIVE or not tokens[2].startswith('@'):
+            continue
+        path = tokens[2][1:]
+        try:
+            with open(path, 'rb') as f:
+                digests[path] = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            digests[path] = None
+    return digests
+
+
+class AssemblerError(ValueError):
+    """
+    Ошибка ассемблирования конкретной строки исходного кода.
+
+    Атрибуты:
+        line_number (int): Номер строки в исходном коде (начиная с 1).
+        line (str): Текст строки без начальных и конечных пробелов.
+        reason (Exception): Исходная ошибка, возникшая при разборе строки.
+    """
+
+    def __init__(self, line_number, line, reason):
+        self.line_number = line_number
+        self.line = line.strip()
+        self.reason = reason
+        super().__init__(f"Error assembling line {line_number}: {self.line} - {reason}")
+
+
+def iter_assemble(lines, start_line=1, data_segments=None):
+    """
+    Последовательно ассемблирует строки исходного кода.
+
+    Параметры:
+        lines (Iterable[str]): Строки исходного кода (например, открытый файл).
+        start_line (int): Номер первой строки, используется в сообщениях об ошибках.
+        data_segments (list | None): Если передан список, директивы .data разбираются, и в него
+            добавляются пары (адрес, значения); иначе директива считается ошибкой.
+
+    Возвращает:
+        Iterator[tuple]: Пары (бинарная инструкция, запись лога) для каждой команды.
+                         Комментарии и пустые строки пропускаются.
+
+    Исключения:
+        AssemblerError: Если строку не удалось ассемблировать.
+    """
+    for line_number, line in enumerate(lines, start_line):
+        try:
+            if data_segments is not None and line.lstrip().startswith('.'):
+                data_segments.append(parse_data_directive(line))
+                continue
+            binary_instr, log_entry = assemble_instruction(line)
+        except Exception as e:
+            raise AssemblerError(line_number, line, e) from e
+        if binary_instr:
+            yield binary_instr, log_entry
+
+
+def assemble(source, log_entries=None, data_segments=None):
+    """
+    Ассемблирует исходный код УВМ в памяти, без обращения к файлам.
+
+    Параметры:
+        source (str | Iterable[str]): Исходный код целиком или последовательность строк.
+        log_entries (list | None): Если передан список, в него добавляются записи лога.
+        data_segments (list | None): Если передан список, в него добавляются сегменты данных
+            директив .data (см. iter_assemble).
+
+    Возвращает:
+        bytes: Бинарный код программы.
+
+    Исключения:
+        AssemblerError: Если какую-либо строку не удалось ассемблировать.
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+
+    chunks = []
+    for binary_instr, log_entry in iter_assemble(source, data_segments=data_segments):
+        chunks.append(binary_instr)
+        if log_entries is not None:
+            log_entries.append(log_entry)
+    return b''.join(chunks)
+
+
+def assemble_stream(source, binary_out, log_out=None, buffer_size=1 << 20):
+    """
+    Потоково ассемблирует исходный код: строки читаются по одной, а бинарный код и лог
+    записываются по мере обработки. Объём используемой памяти не зависит от размера программы.
+
+    Параметры:
+        source (Iterable[str]): Строки исходного кода (например, открытый файл).
+        binary_out (BinaryIO): Файл для записи бинарного кода.
+        log_out (TextIO | None): Файл для записи лога в формате NDJSON (одна запись JSON на строку).
+        buffer_size (int): Размер буфера (в байтах), после заполнения которого данные сбрасываются в файл.
+
+    Возвращает:
+        tuple: Количество команд и количество записанных байт.
+
+    Исключения:
+        AssemblerError: Если какую-либо строку не удалось ассемблировать.
+    """
+    buffer = bytearray()
+    instructions = 0
+    written = 0
+    encode_log = json.JSONEncoder(separators=(',', ':')).encode
+
+    for binary_instr, log_entry in iter_assemble(source):
+        buffer += binary_instr
+        instructions += 1
+        if log_out is not None:
+            log_out.write(encode_log(log_entry))
+            log_out.write('\n')
+        if len(buffer) >= buffer_size:
+            binary_out.write(buffer)
+            written += len(buffer)
+            buffer.clear()
+
+    binary_out.write(buffer)
+    written += len(buffer)
+    return instructions, written
+
+
+# Минимальный размер фрагмента исходного файла (в байтах) для параллельного ассемблирования
+MIN_CHUNK_BYTES = 1 << 20
+
+
+def _split_source(path, jobs, chunk_bytes=None):
+    """
+    Делит исходный файл на фрагменты по границам строк.
+
+    Возвращает:
+        list[tuple[int, int]]: Пары (начальное смещение, конечное смещение) в байтах.
+    """
+    size = os.path.getsize(path)
+    if chunk_bytes is None:
+        # Несколько фрагментов на процесс сглаживают разницу в скорости их обработки
+        chunk_bytes = max(MIN_CHUNK_BYTES, -(-size // (jobs * 4)))
+    bounds = []
+    start = 0
+    with open(path, 'rb') as f:
+        while start < size:
+            end = start + chunk_bytes
+            if end < size:
+                # Продлеваем фрагмент до конца текущей строки
+                f.seek(end - 1)
+                tail = f.readline()
+                end = end - 1 + len(tail)
+            end = min(end, size)
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def _assemble_chunk(task):
+    """
+    Ассемблирует один фрагмент исходного файла в процессе пула.
+
+    Возвращает:
+        tuple: (бинарный код, записи лога или None, сегменты данных или None, количество строк, ошибка или None).
+               Ошибка передаётся как (номер строки внутри фрагмента, строка, текст причины),
+               поскольку AssemblerError нельзя восстановить из pickle.
+    """
+    path, start, end, with_log, with_data = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # StringIO с newline=None делит строки так же, как файл, открытый в текстовом режиме
+    lines = list(io.StringIO(data.decode('utf-8'), newline=None))
+    log_entries = [] if with_log else None
+    data_segments = [] if with_data else None
+    try:
+        binary_code = assemble(lines, log_entries, data_segments)
+    except AssemblerError as e:
+        return None, None, None, len(lines), (e.line_number, e.line, str(e.reason))
+    return binary_code, log_entries, data_segments, len(lines), None
+
+
+def iter_assemble_parallel(path, jobs=None, with_log=False, chunk_bytes=None, data_segments=None):
+    """
+    Ассемблирует исходный файл в пуле процессов.
+
+    Файл делится на фрагменты по границам строк; каждый процесс читает и кодирует свои
+    фрагменты сам, а результаты выдаются строго в порядке фрагментов.
+
+    Параметры:
+        path (str): Путь к исходному файлу.
+        jobs (int | None): Количество процессов (None — по числу процессоров).
+        with_log (bool): Собирать ли записи лога.
+        chunk_bytes (int | None): Размер фрагмента в байтах (по умолчанию подбирается по размеру файла).
+        data_segments (list | None): Если передан список, в него по порядку добавляются сегменты данных.
+
+    Возвращает:
+        Iterator[tuple]: Пары (бинарный код фрагмента, записи лога фрагмента или None).
+
+    Исключения:
+        AssemblerError: Для первой по порядку ошибочной строки, с её номером во всём файле.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    tasks = [(path, start, end, with_log, data_segments is not None)
+             for start, end in _split_source(path, jobs, chunk_bytes)]
+    if not tasks:
+        return
+    lines_before = 0
+    with multiprocessing.Pool(min(jobs, len(tasks))) as pool:
+        for binary_code, log_entries, chunk_data, line_count, error in pool.imap(_assemble_chunk, tasks):
+            if error is not None:
+                line_number, line, reason = error
+                raise AssemblerError(lines_before + line_number, line, reason)
+            lines_before += line_count
+            if data_segments is not None:
+                data_segments.extend(chunk_data)
+            yield binary_code, log_entries
+
+
+def assemble_parallel(path, jobs=None, log_entries=None, chunk_bytes=None, data_segments=None):
+    """
+    Параллельный аналог assemble для исходного файла на диске.
+
+    Параметры:
+        path (str): Путь к исходному файлу.
+        jobs (int | None): Количество процессов (None — по числу процессоров).
+        log_entries (list | None): Если передан список, в него добавляются записи лога.
+        chunk_bytes (int | None): Размер фрагмента в байтах.
+        data_segments (list | None): Если передан список, в него добавляются сегменты данных.
+
+    Возвращает:
+        bytes: Бинарный код программы.
+
+    Исключения:
+        AssemblerError: Если какую-либо строку не удалось ассемблировать.
+    """
+    chunks = []
+    for binary_code, chunk_log in iter_assemble_parallel(path, jobs, log_entries is not None, chunk_bytes,
+                                                         data_segments):
+        chunks.append(binary_code)
+        if log_entries is not None:
+            log_entries.extend(chunk_log)
+    return b''.join(chunks)
@@ -0,0 +1,157 @@
+"""
+Пакетное исполнение одной программы УВМ над множеством начальных образов памяти.
+
+В системе команд УВМ нет переходов, поэтому все экземпляры проходят один и тот же
+поток команд. BatchVM хранит N экземпляров в виде двумерных массивов NumPy
+(N×8 регистров, N×1024 ячеек памяти) и исполняет каждую команду сразу для всех.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy — необязательная зависимость, нужна только для пакетного режима
+    np = None
+
+from machine import (
+    OP_LOAD_CONST, OP_POPCNT, OP_POPCNT_RANGE, OP_READ_MEM, OP_WRITE_MEM,
+    DecodedProgram, VMError, decode_program,
+)
+from popcnt_vector import popcount_numpy
+
+
+class BatchVM:
+    """
+    N экземпляров УВМ, исполняющих одну программу одновременно.
+
+    Атрибуты:
+        registers (numpy.ndarray): Регистры, массив uint64 формы (N, num_registers).
+        memory (numpy.ndarray): Память, массив uint64 формы (N, memory_size).
+        errors (list[str | None]): Сообщение об ошибке для каждого экземпляра или None.
+            Состояние экземпляра с ошибкой соответствует моменту ошибки, как при одиночном запуске.
+    """
+
+    def __init__(self, program, memory_images=None, count=None, memory_size=1024, num_registers=8):
+        """
+        Параметры:
+            program (bytes | DecodedProgram): Бинарный код или декодированная программа.
+            memory_images (array-like | None): Начальные образы памяти формы (N, k), k <= memory_size;
+                ячейки с индексами от k и выше заполняются нулями.
+            count (int | None): Количество экземпляров с нулевой памятью, если образы не заданы.
+            memory_size (int): Количество ячеек памяти каждого экземпляра.
+            num_registers (int): Количество регистров каждого экземпляра.
+
+        Исключения:
+            VMError: Если программа содержит слитые команды (см. fusion.py).
+        """
+        if np is None:
+            raise ImportError("BatchVM requires NumPy.")
+        if not isinstance(program, DecodedProgram):
+            program = decode_program(program)
+        if program.fused:
+            raise VMError("BatchVM does not support fused programs; pass the unfused program.")
+        self.program = program
+        self.memory_size = memory_size
+
+        images = None
+        if memory_images is not None:
+            images = np.asarray(memory_images, dtype=np.uint64)
+            if images.ndim != 2 or images.shape[1] > memory_size:
+                raise ValueError(f"Memory images must have shape (N, k) with k <= {memory_size}.")
+            count = images.shape[0]
+        elif count is None:
+            raise ValueError("Either memory_images or count must be given.")
+
+        self.memory = np.zeros((count, memory_size), dtype=np.uint64)
+        if images is not None:
+            self.memory[:, :images.shape[1]] = images
+        self.registers = np.zeros((count, num_registers), dtype=np.uint64)
+        self.errors = [None] * count
+        self._frozen = {}
+
+    def __len__(self):
+        return len(self.errors)
+
+    def _fail(self, indices, message):
+        """
+        Отмечает экземпляры как завершившиеся с ошибкой и запоминает их состояние на момент ошибки.
+        """
+        for i in indices:
+            i = int(i)
+            if self.errors[i] is None:
+                self.errors[i] = message(i) if callable(message) else message
+                self._frozen[i] = (self.registers[i].copy(), self.memory[i].copy())
+
+    def run(self):
+        """
+        Исполняет программу для всех экземпляров.
+
+        Ошибка READ_MEM, POPCNT или POPCNT_RANGE (адрес — непосредственное значение) одинакова для всех
+        экземпляров и останавливает исполнение. Ошибка WRITE_MEM зависит от содержимого
+        регистров и фиксируется только для тех экземпляров, где адрес вышел за границы.
+
+        Возвращает:
+            numpy.ndarray: Итоговая память всех экземпляров, форма (N, memory_size).
+
+        Исключения:
+            VMError: Если программа содержит opcode, который пакетный режим не исполняет.
+        """
+        registers = self.registers
+        memory = self.memory
+        memory_size = self.memory_size
+        rows = np.arange(len(self), dtype=np.intp)
+        program = self.program
+        everyone = range(len(self))
+        stopped = False
+
+        for opcode, B, C in zip(program.ops, program.b, program.c):
+            if opcode == OP_LOAD_CONST:
+                registers[:, B] = C
+            elif opcode == OP_READ_MEM:
+                if B >= memory_size:
+                    self._fail(everyone, f"Memory read error: Address {B} out of bounds.")
+                    stopped = True
+                    break
+                registers[:, C] = memory[:, B]
+            elif opcode == OP_WRITE_MEM:
+                addr = registers[:, C]
+                values = registers[:, B].copy()
+                bad = addr >= memory_size
+                if bad.any():
+                    self._fail(np.flatnonzero(bad),
+                               lambda i: f"Memory write error: Address {int(addr[i])} out of bounds.")
+                    good = ~bad
+                    memory[rows[good], addr[good].astype(np.intp)] = values[good]
+                else:
+                    memory[rows, addr.astype(np.intp)] = values
+            elif opcode == OP_POPCNT:
+                if C >= memory_size:
+                    self._fail(everyone, f"Memory popcnt error: Address {C} out of bounds.")
+                    stopped = True
+                    break
+                memory[:, C] = popcount_numpy(memory[:, C])
+                registers[:, B] = memory[:, C]
+            elif opcode == OP_POPCNT_RANGE:
+                end = min(B + C, memory_size)
+                if B < end:
+                    memory[:, B:end] = popcount_numpy(memory[:, B:end])
+                if B + C > memory_size:
+                    self._fail(everyone, f"Memory popcnt error: Address {max(B, memory_size)} out of bounds.")
+                    stopped = True
+                    break
+            else:
+                raise VMError(f"Cannot execute opcode {opcode} in batch mode.")
+
+        if not stopped and program.error is not None:
+            pc, opcode = program.error
+            self._fail(everyone, f"Unknown opcode at pc={pc}: {opcode}")
+
+        # Возвращаем экземплярам с ошибкой состояние на момент ошибки
+        for i, (frozen_registers, frozen_memory) in self._frozen.items():
+            registers[i] = frozen_registers
+            memory[i] = frozen_memory
+        self._frozen.clear()
+        return memory
+
+    def read_memory(self, start, end):
+        """
+        Возвращает диапазон памяти [start, end) всех экземпляров в виде массива формы (N, end - start).
+        """
+        return self.memory[:, start:end]
@@ -0,0 +1,350 @@
+"""
+Набор бенчмарков УВМ с генератором синтетических программ и эталонными результатами.
+
+Генератор строит корректные программы (без выхода за границы памяти) заданного размера
+и состава команд. Набор измеряет скорость ассемблера (строк в секунду), скорость
+интерпретатора (команд в секунду, циклом и скомпилированной программой), пиковое
+потребление памяти при исполнении и время запуска интерпретатора как процесса.
+Результаты сохраняются в JSON; режим сравнения отмечает регрессии сверх порога.
+
+Примеры:
+    python bench.py run --sizes 1000,100000 --output baseline.json
+    python bench.py run --compare baseline.json --threshold 0.15
+    python bench.py generate program.asm --size 10000 --mix LOAD_CONST=2,WRITE_MEM=2,POPCNT=1
+"""
+import argparse  # Модуль для парсинга аргументов командной строки
+import json  # Модуль для работы с JSON-форматом
+import os  # Пути к файлам и временные каталоги
+import platform  # Описание окружения в результатах
+import random  # Генерация синтетических программ
+import subprocess  # Замер времени запуска интерпретатора
+import sys  # Модуль для взаимодействия с интерпретатором Python
+import tempfile  # Временные файлы для замера запуска
+import time  # Замеры времени
+import tracemalloc  # Пиковое потребление памяти
+
+import assembly
+import compiler
+import machine
+from isa import BY_MNEMONIC
+
+# Формат файла результатов; меняется при несовместимых изменениях набора метрик
+RESULTS_VERSION = 1
+
+# Состав команд по умолчанию — как в input_program.txt: загрузка констант, запись и popcnt
+DEFAULT_MIX = {'LOAD_CONST': 4, 'WRITE_MEM': 4, 'POPCNT': 2, 'READ_MEM': 1}
+
+DEFAULT_SIZES = (1000, 100_000)
+
+# Порог регрессии по умолчанию (относительное ухудшение)
+DEFAULT_THRESHOLD = 0.10
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_mix(text):
+    """
+    Разбирает состав команд вида "LOAD_CONST=2,WRITE_MEM=1".
+
+    Исключения:
+        ValueError: Если мнемоника неизвестна или вес записан неверно.
+    """
+    mix = {}
+    for part in text.split(','):
+        name, weight = part.split('=')
+        name = name.strip().upper()
+        if name not in BY_MNEMONIC:
+            raise ValueError(f"Unknown mnemonic in mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def generate_program(size, mix=None, memory_size=1024, seed=0):
+    """
+    Генерирует исходный код синтетической программы УВМ.
+
+    Все обращения к памяти остаются в пределах [0, memory_size): генератор отслеживает значения
+    регистров и перед WRITE_MEM при необходимости загружает в регистр адреса допустимое значение
+    (такая загрузка входит в размер программы).
+
+    Параметры:
+        size (int): Количество команд.
+        mix (dict[str, float] | None): Мнемоника -> относительный вес (по умолчанию DEFAULT_MIX).
+        memory_size (int): Размер памяти, для которой генерируется программа.
+        seed (int): Начальное значение генератора случайных чисел.
+
+    Возвращает:
+        list[str]: Строки исходного кода.
+    """
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    registers = [0] * 8
+    lines = []
+
+    while len(lines) < size:
+        name = rng.choices(names, weights)[0]
+        if name == 'LOAD_CONST':
+            reg = rng.randrange(8)
+            # Половина констант — допустимые адреса, чтобы их можно было использовать в WRITE_MEM
+            value = rng.randrange(memory_size) if rng.random() < 0.5 else rng.getrandbits(24)
+            registers[reg] = value
+            lines.append(f"LOAD_CONST {reg} {value}")
+        elif name == 'READ_MEM':
+            reg = rng.randrange(8)
+            registers[reg] = None  # Значение из памяти генератору неизвестно
+            lines.append(f"READ_MEM {rng.randrange(memory_size)} {reg}")
+        elif name == 'WRITE_MEM':
+            candidates = [i for i, value in enumerate(registers) if value is not None and value < memory_size]
+            if not candidates:
+                reg = rng.randrange(8)
+                registers[reg] = rng.randrange(memory_size)
+                lines.append(f"LOAD_CONST {reg} {registers[reg]}")
+                candidates = [reg]
+                if len(lines) >= size:
+                    break
+            lines.append(f"WRITE_MEM {rng.randrange(8)} {rng.choice(candidates)}")
+        elif name == 'POPCNT':
+            reg = rng.randrange(8)
+            registers[reg] = None
+            lines.append(f"POPCNT {reg} {rng.randrange(memory_size)}")
+        elif name == 'POPCNT_RANGE':
+            start = rng.randrange(memory_size)
+            length = rng.randint(1, min(64, memory_size - start))
+            lines.append(f"POPCNT_RANGE {start} {length}")
+        else:
+            raise ValueError(f"Mnemonic {name} is not supported by the generator.")
+    return lines
+
+
+def _best_time(fn, repeat):
+    """
+    Возвращает лучшее время (в секундах) из repeat запусков fn.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _metric(value, unit, higher_is_better):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def measure_program(lines, memory_size=1024, repeat=3):
+    """
+    Измеряет одну программу.
+
+    Возвращает:
+        dict[str, dict]: Имя метрики -> {'value', 'unit', 'higher_is_better'}.
+    """
+    source = '\n'.join(lines) + '\n'
+    binary = assembly.assemble(source)
+    count = len(machine.decode_program(binary).ops)
+
+    def run_loop():
+        machine.VM(memory_size=memory_size).load(binary).run()
+
+    compiled = compiler.compile_binary(binary, cache_dir=None)
+
+    def run_compiled():
+        machine.VM(memory_size=memory_size).load(compiled).run()
+
+    metrics = {
+        'assemble_lines_per_s': _metric(len(lines) / _best_time(lambda: assembly.assemble(source), repeat),
+                                        'lines/s', True),
+        'loop_instructions_per_s': _metric(count / _best_time(run_loop, repeat), 'instructions/s', True),
+        'compiled_instructions_per_s': _metric(count / _best_time(run_compiled, repeat), 'instructions/s', True),
+    }
+
+    # Пиковое потребление памяти Python-объектами при декодировании и исполнении
+    tracemalloc.start()
+    try:
+        run_loop()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    metrics['loop_peak_bytes'] = _metric(peak, 'bytes', False)
+    return metrics
+
+
+def measure_startup(repeat=3):
+    """
+    Измеряет время запуска интерпретатора как процесса на программе из одной команды.
+
+    Возвращает:
+        float: Лучшее время в секундах.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        binary_path = os.path.join(tmp, 'startup.bin')
+        with open(binary_path, 'wb') as f:
+            f.write(assembly.assemble("LOAD_CONST 0 1\n"))
+        command = [sys.executable, os.path.join(_HERE, 'interpreter.py'),
+                   binary_path, os.path.join(tmp, 'result.json'), '0:1']
+        return _best_time(lambda: subprocess.run(command, check=True, capture_output=True), repeat)
+
+
+def run_suite(sizes=DEFAULT_SIZES, mix=None, memory_size=1024, repeat=3, seed=0, startup=True):
+    """
+    Выполняет весь набор бенчмарков.
+
+    Параметры:
+        sizes (Iterable[int]): Размеры синтетических программ.
+        mix (dict[str, float] | None): Состав команд.
+        memory_size (int): Размер памяти УВМ.
+        repeat (int): Количество повторов каждого замера (берётся лучший).
+        seed (int): Начальное значение генератора программ.
+        startup (bool): Измерять ли время запуска процесса.
+
+    Возвращает:
+        dict: Результаты в формате, который сохраняется в JSON и принимается compare().
+    """
+    mix = mix or DEFAULT_MIX
+    metrics = {}
+    for size in sizes:
+        lines = generate_program(size, mix, memory_size, seed)
+        for name, metric in measure_program(lines, memory_size, repeat).items():
+            metrics[f"{name}[size={size}]"] = metric
+    if startup:
+        metrics['startup_s'] = _metric(measure_startup(repeat), 's', False)
+    return {
+        'version': RESULTS_VERSION,
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+        },
+        'config': {'sizes': list(sizes), 'mix': mix, 'memory_size': memory_size, 'repeat': repeat, 'seed': seed},
+        'metrics': metrics,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнивает результаты с эталоном.
+
+    Параметры:
+        baseline (dict): Эталонные результаты (run_suite).
+        current (dict): Текущие результаты (run_suite).
+        threshold (float): Допустимое относительное ухудшение (0.1 — 10%).
+
+    Возвращает:
+        list[dict]: Строки сравнения для метрик, присутствующих в обоих результатах:
+            {'metric', 'baseline', 'current', 'change', 'regression'}. change — относительное
+            изменение значения; regression — True, если ухудшение превышает порог.
+    """
+    rows = []
+    for name, base in baseline['metrics'].items():
+        cur = current['metrics'].get(name)
+        if cur is None or not base['value']:
+            continue
+        change = (cur['value'] - base['value']) / base['value']
+        worse = -change if base['higher_is_better'] else change
+        rows.append({
+            'metric': name,
+            'baseline': base['value'],
+            'current': cur['value'],
+            'change': change,
+            'regression': worse > threshold,
+        })
+    return rows
+
+
+def format_comparison(rows):
+    """
+    Возвращает текстовую таблицу сравнения.
+    """
+    lines = [f"{'metric':<44}{'baseline':>16}{'current':>16}{'change':>10}"]
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        lines.append(f"{row['metric']:<44}{row['baseline']:>16.6g}{row['current']:>16.6g}"
+                     f"{row['change']:>+10.1%}{flag}")
+    return '\n'.join(lines)
+
+
+def format_results(results):
+    """
+    Возвращает текстовую таблицу результатов.
+    """
+    return '\n'.join(f"{name:<44}{metric['value']:>16.6g} {metric['unit']}"
+                     for name, metric in results['metrics'].items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='UVM benchmark suite.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks.')
+    run_parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                            help='Comma-separated program sizes (instructions).')
+    run_parser.add_argument('--mix', help='Opcode mix, e.g. LOAD_CONST=2,WRITE_MEM=1,POPCNT=1.')
+    run_parser.add_argument('--memory-size', type=int, default=1024, help='VM memory size.')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Repetitions per measurement (best is kept).')
+    run_parser.add_argument('--seed', type=int, default=0, help='Program generator seed.')
+    run_parser.add_argument('--no-startup', action='store_true', help='Skip the process startup measurement.')
+    run_parser.add_argument('--output', help='Write results as JSON to this path (e.g. a new baseline).')
+    run_parser.add_argument('--compare', metavar='BASELINE', help='Compare against a baseline JSON file.')
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='Relative slowdown that counts as a regression.')
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files.')
+    compare_parser.add_argument('baseline', help='Baseline JSON file.')
+    compare_parser.add_argument('current', help='Current JSON file.')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='Relative slowdown that counts as a regression.')
+
+    generate_parser = commands.add_parser('generate', help='Write a synthetic program to a file.')
+    generate_parser.add_argument('output', help='Assembly source file.')
+    generate_parser.add_argument('--size', type=int, default=1000, help='Number of instructions.')
+    generate_parser.add_argument('--mix', help='Opcode mix, e.g. LOAD_CONST=2,WRITE_MEM=1,POPCNT=1.')
+    generate_parser.add_argument('--memory-size', type=int, default=1024, help='VM memory size.')
+    generate_parser.add_argument('--seed', type=int, default=0, help='Program generator seed.')
+
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix) if getattr(args, 'mix', None) else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.command == 'generate':
+        lines = generate_program(args.size, mix, args.memory_size, args.seed)
+        with open(args.output, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return 0
+
+    if args.command == 'run':
+        try:
+            sizes = [int(size) for size in args.sizes.split(',')]
+        except ValueError:
+            parser.error('--sizes must be a comma-separated list of integers.')
+        current = run_suite(sizes, mix, args.memory_size, args.repeat, args.seed, startup=not args.no_startup)
+        print(format_results(current))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(current, f, indent=2)
+        if not args.compare:
+            return 0
+        baseline_path = args.compare
+    else:
+        baseline_path = args.baseline
+        with open(args.current) as f:
+            current = json.load(f)
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Кэш собранных программ УВМ с адресацией по содержимому.
+
+Ключ записи — SHA-256 от исходного текста и параметров ассемблера. Запись хранит бинарный код
+и текст лога в одном файле. Запись в кэш атомарна (временный файл + os.replace), поэтому
+несколько процессов ассемблера могут одновременно работать с одним каталогом. Размер кэша
+ограничен: при превышении лимита удаляются записи, к которым дольше всего не обращались (LRU
+по времени модификации файла, которое обновляется при каждом попадании).
+"""
+import hashlib  # Хэширование исходного текста и параметров
+import json  # Сериализация параметров ассемблера для ключа
+import os  # Работа с файлами кэша
+import tempfile  # Временные файлы для атомарной записи
+
+# Версия формата записей; входит в ключ, чтобы несовместимые записи не использовались
+CACHE_VERSION = 1
+
+# Ограничение размера кэша по умолчанию (в байтах)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SUFFIX = '.entry'
+
+
+def cache_key(source, **options):
+    """
+    Вычисляет ключ кэша.
+
+    Параметры:
+        source (bytes): Исходный текст программы.
+        **options: Параметры ассемблера, влияющие на результат (уровень оптимизации и т.п.).
+
+    Возвращает:
+        str: Шестнадцатеричный SHA-256.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps({'version': CACHE_VERSION, 'options': options}, sort_keys=True).encode())
+    h.update(b'\0')
+    h.update(source)
+    return h.hexdigest()
+
+
+class BuildCache:
+    """
+    Каталог с записями кэша сборки.
+
+    Формат записи: 8 байт длины бинарного кода (little endian), бинарный код, текст лога в UTF-8.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Параметры:
+            directory (str): Каталог кэша (создаётся при необходимости).
+            max_bytes (int): Максимальный суммарный размер записей.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """
+        Возвращает запись кэша.
+
+        Параметры:
+            key (str): Ключ, полученный из cache_key.
+
+        Возвращает:
+            tuple | None: (бинарный код, текст лога) или None, если записи нет.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        binary_length = int.from_bytes(data[:8], byteorder='little')
+        if len(data) < 8 + binary_length:
+            # Повреждённая запись — считаем промахом
+            return None
+
+        try:
+            # Отмечаем использование записи для LRU-вытеснения
+            os.utime(path)
+        except OSError:
+            pass
+        return data[8:8 + binary_length], data[8 + binary_length:].decode('utf-8')
+
+    def put(self, key, binary, log_text):
+        """
+        Атомарно сохраняет запись и при необходимости вытесняет старые записи.
+
+        Параметры:
+            key (str): Ключ, полученный из cache_key.
+            binary (bytes): Бинарный код программы.
+            log_text (str): Текст лога в том виде, в котором он записывается в лог-файл.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(len(binary).to_bytes(8, byteorder='little'))
+                f.write(binary)
+                f.write(log_text.encode('utf-8'))
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Удаляет записи, к которым дольше всего не обращались, пока суммарный размер превышает лимит.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Запись удалена другим процессом
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Запись уже удалена параллельно работающим процессом
+                pass
+            total -= size
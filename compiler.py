@@ -0,0 +1,175 @@
+"""
+Компилятор бинарных программ УВМ в функции Python.
+
+В системе команд УВМ нет переходов, поэтому любая программа — это один линейный блок.
+Компилятор превращает его в исходный код Python, где регистры — локальные переменные,
+компилирует этот код один раз и кэширует объект кода на диске по хэшу содержимого
+бинарного файла. Повторный запуск той же программы не требует ни декодирования, ни диспетчеризации.
+"""
+import hashlib  # Хэширование бинарного кода для ключа кэша
+import importlib.util  # Версия формата байт-кода текущего интерпретатора Python
+import marshal  # Сериализация объектов кода
+import os  # Работа с файлами кэша
+import tempfile  # Временные файлы для атомарной записи в кэш
+
+from machine import (
+    OP_LOAD_CONST, OP_POPCNT, OP_POPCNT_RANGE, OP_READ_MEM, OP_WRITE_MEM,
+    VMError, decode_program, popcnt, popcount_range,
+)
+
+# Версия генератора кода; входит в ключ кэша, чтобы изменения компилятора не подхватывали старый кэш
+COMPILER_VERSION = 2
+
+# Количество команд в одной сгенерированной функции (ограничивает размер компилируемых функций)
+CHUNK_SIZE = 2000
+
+# Каталог кэша по умолчанию
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'uvm', 'compiled')
+
+_REGISTERS = ', '.join(f'r{i}' for i in range(8))
+
+
+def _emit_instruction(lines, opcode, B, C):
+    """
+    Добавляет в lines строки Python-кода для одной команды.
+    """
+    if opcode == OP_LOAD_CONST:
+        lines.append(f'    r{B} = {C}')
+    elif opcode == OP_READ_MEM:
+        lines.append(f'    if {B} >= size:')
+        lines.append(f'        registers[:] = ({_REGISTERS})')
+        lines.append(f"        raise VMError('Memory read error: Address {B} out of bounds.')")
+        lines.append(f'    r{C} = memory[{B}]')
+    elif opcode == OP_WRITE_MEM:
+        lines.append(f'    if r{C} >= size:')
+        lines.append(f'        registers[:] = ({_REGISTERS})')
+        lines.append(f"        raise VMError('Memory write error: Address %d out of bounds.' % r{C})")
+        lines.append(f'    memory[r{C}] = r{B}')
+    elif opcode == OP_POPCNT:
+        lines.append(f'    if {C} >= size:')
+        lines.append(f'        registers[:] = ({_REGISTERS})')
+        lines.append(f"        raise VMError('Memory popcnt error: Address {C} out of bounds.')")
+        lines.append(f'    r{B} = memory[{C}] = popcnt(memory[{C}])')
+    elif opcode == OP_POPCNT_RANGE:
+        lines.append(f'    if {B + C} > size:')
+        lines.append(f'        registers[:] = ({_REGISTERS})')
+        lines.append(f'    popcount_range(memory, {B}, {C})')
+
+
+def generate_source(program):
+    """
+    Генерирует исходный код Python для декодированной программы.
+
+    Программа разбивается на функции по CHUNK_SIZE команд; каждая функция загружает регистры
+    в локальные переменные, исполняет свои команды и сохраняет регистры обратно.
+    Итоговая функция run(registers, memory) вызывает их по порядку.
+
+    Параметры:
+        program (DecodedProgram): Декодированная программа.
+
+    Возвращает:
+        str: Исходный код модуля.
+    """
+    lines = []
+    chunk_names = []
+    instructions = list(zip(program.ops, program.b, program.c))
+
+    for start in range(0, len(instructions), CHUNK_SIZE):
+        name = f'_chunk{len(chunk_names)}'
+        chunk_names.append(name)
+        lines.append(f'def {name}(registers, memory):')
+        lines.append(f'    {_REGISTERS} = registers')
+        lines.append('    size = len(memory)')
+        for opcode, B, C in instructions[start:start + CHUNK_SIZE]:
+            _emit_instruction(lines, opcode, B, C)
+        lines.append(f'    registers[:] = ({_REGISTERS})')
+        lines.append('')
+
+    lines.append('def run(registers, memory):')
+    for name in chunk_names:
+        lines.append(f'    {name}(registers, memory)')
+    if program.error is not None:
+        pc, opcode = program.error
+        lines.append(f"    raise VMError('Unknown opcode at pc={pc}: {opcode}')")
+    lines.append('    return None')
+    lines.append('')
+    return '\n'.join(lines)
+
+
+class CompiledProgram:
+    """
+    Скомпилированная программа УВМ.
+
+    Вызывается как функция с регистрами и памятью (изменяет их на месте) и может быть
+    загружена в VM вместо DecodedProgram.
+
+    Атрибуты:
+        digest (str): Ключ кэша (хэш бинарного кода и версий компилятора).
+        from_cache (bool): True, если объект кода был загружен из кэша на диске.
+    """
+
+    __slots__ = ('digest', 'from_cache', '_run')
+
+    def __init__(self, code_object, digest, from_cache=False):
+        namespace = {'VMError': VMError, 'popcnt': popcnt, 'popcount_range': popcount_range}
+        exec(code_object, namespace)
+        self._run = namespace['run']
+        self.digest = digest
+        self.from_cache = from_cache
+
+    def __call__(self, registers, memory):
+        if len(registers) != 8:
+            raise VMError("Compiled programs require exactly 8 registers.")
+        self._run(registers, memory)
+
+
+def cache_key(code):
+    """
+    Возвращает ключ кэша для бинарного кода: SHA-256 от содержимого, версии компилятора и формата байт-кода.
+    """
+    h = hashlib.sha256()
+    h.update(importlib.util.MAGIC_NUMBER)
+    h.update(COMPILER_VERSION.to_bytes(4, byteorder='little'))
+    h.update(code)
+    return h.hexdigest()
+
+
+def compile_binary(code, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Компилирует бинарный код УВМ, используя кэш на диске.
+
+    Параметры:
+        code (bytes): Бинарный код программы.
+        cache_dir (str | None): Каталог кэша; None отключает кэширование.
+
+    Возвращает:
+        CompiledProgram: Скомпилированная программа.
+    """
+    digest = cache_key(code)
+    path = os.path.join(cache_dir, digest + '.uvmc') if cache_dir else None
+
+    if path is not None:
+        try:
+            with open(path, 'rb') as f:
+                return CompiledProgram(marshal.load(f), digest, from_cache=True)
+        except (OSError, EOFError, ValueError, TypeError):
+            # Нет файла или он повреждён — компилируем заново
+            pass
+
+    source = generate_source(decode_program(code))
+    code_object = compile(source, f'<uvm {digest[:12]}>', 'exec')
+
+    if path is not None:
+        # Пишем во временный файл и атомарно переименовываем, чтобы параллельные процессы
+        # никогда не увидели частично записанный файл
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump(code_object, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    return CompiledProgram(code_object, digest)
@@ -0,0 +1,305 @@
+"""
+Контейнер бинарных программ УВМ: заголовок с версией, сведениями о программе и контрольной суммой.
+
+Обычный бинарный файл — это команды подряд: чтобы узнать количество команд или нужный размер памяти,
+его приходится разобрать целиком, а обрезанный файл обнаруживается только посреди исполнения.
+Контейнер (assembler.py --container) хранит эти сведения в заголовке, и интерпретатор проверяет файл
+до исполнения первой команды. Файлы без заголовка по-прежнему принимаются как обычный бинарный код.
+
+Формат (все числа little-endian):
+    заголовок    MAGIC, версия (u16), флаги (u16), количество команд N (u64), размер кода (u64),
+                 наибольший адрес памяти (i64, -1 — обращений нет или адрес неизвестен), CRC-32 (u32),
+                 количество записей гистограммы (u16);
+    гистограмма  пары opcode (u8), количество команд (u64);
+    таблица      количество сегментов данных S (u64) и пары начальный адрес, длина (u64 × 2 × S),
+    данных       если установлен флаг FLAG_DATA;
+    смещения     N смещений команд в коде (u64), если установлен флаг FLAG_OFFSETS;
+    данные       значения ячеек всех сегментов подряд (u64), если установлен флаг FLAG_DATA;
+    код          бинарный код команд.
+Сегменты данных (директивы .data ассемблера) копируются в память до исполнения первой команды.
+Если адреса программы вычисляются из значений сегментов данных, наибольший адрес зависит от данных
+(флаг FLAG_DATA_BOUND), и размер памяти по нему не выбирается. Оценка за пределами 32-битного адресного
+пространства не сохраняется: поле равно -1, и установлен флаг FLAG_UNBOUNDED.
+CRC-32 считается по всему файлу, в котором поле контрольной суммы заменено нулём.
+"""
+import struct  # Упаковка заголовка
+import sys  # Порядок байтов платформы
+import zlib  # CRC-32
+from array import array  # Таблица смещений
+
+from machine import decode_program
+from isa import BY_OPCODE
+from paged_memory import ADDRESS_SPACE
+
+MAGIC = b'UVMBIN\0\0'
+VERSION = 1
+
+# Флаги заголовка
+FLAG_OFFSETS = 1
+FLAG_DATA = 2
+# Наибольший адрес вычислен из значений сегментов данных
+FLAG_DATA_BOUND = 4
+# Наибольший адрес неизвестен: оценка выходит за пределы адресного пространства
+FLAG_UNBOUNDED = 8
+
+_HEADER = struct.Struct('<8sHHQQqIH')
+_HISTOGRAM_ENTRY = struct.Struct('<BQ')
+# Смещение поля CRC-32 в заголовке
+_CHECKSUM_OFFSET = _HEADER.size - 6
+
+
+class ContainerError(ValueError):
+    """
+    Повреждённый или несовместимый контейнер.
+    """
+
+
+class Container:
+    """
+    Разобранный контейнер.
+
+    Атрибуты:
+        version (int): Версия формата.
+        instruction_count (int): Количество команд.
+        max_address (int | None): Наибольший адрес памяти, к которому может обратиться программа
+            (статическая оценка, см. verifier.py; None — обращений нет или адрес неизвестен).
+        bounded (bool): False, если наибольший адрес неизвестен (оценка вне адресного пространства).
+        data_bound (bool): True, если наибольший адрес вычислен из значений сегментов данных.
+        histogram (dict[int, int]): opcode -> количество команд.
+        offsets (array | None): Смещения команд в коде, если они сохранены.
+        data (list[tuple[int, array]]): Сегменты данных: (начальный адрес, значения array('Q')).
+        code (bytes | memoryview): Бинарный код команд.
+    """
+
+    __slots__ = ('version', 'instruction_count', 'max_address', 'bounded', 'data_bound', 'histogram', 'offsets',
+                 'data', 'code')
+
+    def __init__(self, version, instruction_count, max_address, histogram, offsets, code, data=(), bounded=True,
+                 data_bound=False):
+        self.version = version
+        self.instruction_count = instruction_count
+        self.max_address = max_address
+        self.bounded = bounded
+        self.data_bound = data_bound
+        self.histogram = histogram
+        self.offsets = offsets
+        self.data = list(data)
+        self.code = code
+
+    @property
+    def memory_size(self):
+        """
+        Количество ячеек памяти, достаточное для сегментов данных и для всех обращений программы.
+        Неизвестный или вычисленный из значений данных наибольший адрес не учитывается: такие обращения
+        проверяются при исполнении.
+        """
+        data_end = max((addr + len(values) for addr, values in self.data), default=0)
+        if self.max_address is None or not self.bounded or self.data_bound:
+            return data_end
+        return max(data_end, self.max_address + 1)
+
+    def release(self):
+        """
+        Освобождает memoryview кода, чтобы отображённый в память файл можно было закрыть.
+        """
+        if isinstance(self.code, memoryview):
+            self.code.release()
+
+    def describe(self):
+        """
+        Возвращает сведения из заголовка в виде словаря (для вывода и журналов).
+        """
+        return {
+            'version': self.version,
+            'instructions': self.instruction_count,
+            'code_bytes': len(self.code),
+            'max_address': self.max_address,
+            'bounded': self.bounded,
+            'data_bound': self.data_bound,
+            'histogram': {BY_OPCODE[opcode].mnemonic: count for opcode, count in self.histogram.items()},
+            'offsets': self.offsets is not None,
+            'data_segments': len(self.data),
+            'data_cells': sum(len(values) for _, values in self.data),
+        }
+
+
+def is_container(data):
+    """
+    Возвращает True, если данные начинаются с заголовка контейнера.
+    """
+    return len(data) >= len(MAGIC) and bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def _words(values):
+    """
+    Возвращает значения array('Q') как байты u64 little-endian.
+    """
+    if sys.byteorder != 'little':
+        values = array('Q', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def pack(code, offsets=False, data=None):
+    """
+    Упаковывает бинарный код в контейнер.
+
+    Параметры:
+        code (bytes): Бинарный код команд.
+        offsets (bool): Сохранить таблицу смещений команд.
+        data (list[tuple[int, array]] | None): Сегменты данных (начальный адрес, значения).
+
+    Возвращает:
+        bytes: Содержимое файла-контейнера.
+
+    Исключения:
+        ContainerError: Если код содержит неизвестный opcode.
+    """
+    import verifier
+    program = decode_program(code)
+    if program.error is not None:
+        pc, opcode = program.error
+        raise ContainerError(f"Unknown opcode at pc={pc}: {opcode}")
+    count = len(program)
+
+    histogram = {}
+    for opcode in BY_OPCODE:
+        opcode_count = program.ops.count(opcode)
+        if opcode_count:
+            histogram[opcode] = opcode_count
+    data = [(addr, values) for addr, values in data or () if len(values)]
+    flags = 0
+    # Значения, прочитанные программой из памяти, ограничены наибольшим значением сегментов данных
+    memory_bound = max((max(values) for _, values in data), default=0)
+    max_address = verifier.verify(program, None, memory_bound=memory_bound).max_address
+    # Оценка, которая без значений данных меньше, зависит от данных: по ней память не выделяется
+    if memory_bound and max_address != verifier.verify(program, None, memory_bound=0).max_address:
+        flags |= FLAG_DATA_BOUND
+    data_end = max((addr + len(values) - 1 for addr, values in data), default=-1)
+    if max_address is None or data_end > max_address:
+        max_address = data_end if data_end >= 0 else None
+    if max_address is not None and max_address >= ADDRESS_SPACE:
+        flags |= FLAG_UNBOUNDED
+        max_address = None
+
+    parts = [b''.join(_HISTOGRAM_ENTRY.pack(opcode, n) for opcode, n in histogram.items())]
+    if data:
+        flags |= FLAG_DATA
+        table = array('Q', [len(data)])
+        for addr, values in data:
+            table.extend((addr, len(values)))
+        parts.append(_words(table))
+    if offsets:
+        flags |= FLAG_OFFSETS
+        table = array('Q', [0])
+        table.extend(program.next_pc[:-1])
+        parts.append(_words(table) if count else b'')
+    parts.extend(_words(values) for _, values in data)
+    parts.append(bytes(code))
+
+    header = _HEADER.pack(MAGIC, VERSION, flags, count, len(code),
+                          -1 if max_address is None else max_address, 0, len(histogram))
+    checksum = zlib.crc32(b''.join(parts), zlib.crc32(header))
+    return b''.join([header[:_CHECKSUM_OFFSET], struct.pack('<I', checksum), header[_CHECKSUM_OFFSET + 4:]]
+                    + parts)
+
+
+def unpack(data):
+    """
+    Разбирает и проверяет контейнер.
+
+    Параметры:
+        data (bytes | memoryview | mmap.mmap): Содержимое файла.
+
+    Возвращает:
+        Container: Контейнер; поле code — memoryview кода внутри data, без копирования.
+
+    Исключения:
+        ContainerError: Если заголовок повреждён, версия не поддерживается, файл обрезан
+            или контрольная сумма не совпадает.
+    """
+    if len(data) < _HEADER.size:
+        raise ContainerError("Container is truncated.")
+    magic, version, flags, count, code_size, max_address, checksum, entries = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ContainerError("Not a UVM container.")
+    if version != VERSION:
+        raise ContainerError(f"Unsupported container version {version}.")
+
+    histogram_end = position = _HEADER.size + entries * _HISTOGRAM_ENTRY.size
+    segments = []
+    if flags & FLAG_DATA:
+        # Таблица сегментов данных читается до проверки размера: от неё зависит размер файла
+        if len(data) < position + 8:
+            raise ContainerError("Container is truncated.")
+        (segment_count,) = struct.unpack_from('<Q', data, position)
+        position += 8
+        if len(data) < position + 16 * segment_count:
+            raise ContainerError("Container is truncated.")
+        table = struct.unpack_from(f'<{2 * segment_count}Q', data, position)
+        segments = list(zip(table[0::2], table[1::2]))
+        position += 16 * segment_count
+    offsets_size = 8 * count if flags & FLAG_OFFSETS else 0
+    data_size = 8 * sum(length for _, length in segments)
+    expected = position + offsets_size + data_size + code_size
+    if len(data) != expected:
+        raise ContainerError(f"Container size mismatch: expected {expected} bytes, got {len(data)}.")
+
+    view = memoryview(data)
+    try:
+        zeroed = bytearray(view[:_HEADER.size])
+        zeroed[_CHECKSUM_OFFSET:_CHECKSUM_OFFSET + 4] = bytes(4)
+        if zlib.crc32(view[_HEADER.size:], zlib.crc32(zeroed)) != checksum:
+            raise ContainerError("Container checksum mismatch.")
+
+        histogram = {}
+        for offset in range(_HEADER.size, histogram_end, _HISTOGRAM_ENTRY.size):
+            opcode, opcode_count = _HISTOGRAM_ENTRY.unpack_from(data, offset)
+            histogram[opcode] = opcode_count
+        if sum(histogram.values()) != count:
+            raise ContainerError("Container histogram does not match the instruction count.")
+
+        offsets = None
+        if flags & FLAG_OFFSETS:
+            offsets = _read_words(view, position, count)
+        position += offsets_size
+
+        # Значения сегментов копируются из буфера целиком, одним вызовом frombytes на сегмент
+        segment_data = []
+        for addr, length in segments:
+            segment_data.append((addr, _read_words(view, position, length)))
+            position += 8 * length
+        code = view[position:]
+    except BaseException:
+        view.release()
+        raise
+    return Container(version, count, None if max_address < 0 else max_address, histogram, offsets, code,
+                     segment_data, bounded=not flags & FLAG_UNBOUNDED, data_bound=bool(flags & FLAG_DATA_BOUND))
+
+
+def _read_words(view, position, count):
+    """
+    Читает count слов u64 little-endian, начиная с position.
+    """
+    words = array('Q')
+    words.frombytes(view[position:position + 8 * count])
+    if sys.byteorder != 'little':
+        words.byteswap()
+    return words
+
+
+def decode(container):
+    """
+    Декодирует код контейнера, сверяя результат с заголовком.
+
+    Возвращает:
+        DecodedProgram: Предекодированная программа.
+
+    Исключения:
+        ContainerError: Если код не соответствует заголовку.
+    """
+    program = decode_program(container.code)
+    if program.error is not None or len(program) != container.instruction_count:
+        raise ContainerError(f"Container code does not match its header: {container.instruction_count} "
+                             f"instructions declared, {len(program)} decoded.")
+    return program
@@ -0,0 +1,132 @@
+"""
+Дизассемблер бинарных программ УВМ с переходом к команде по номеру.
+
+С таблицей смещений (см. offset_index.py) переход к команде номер k выполняется за O(1),
+после чего разбираются только запрошенные команды. Контейнеры (см. container.py) разбираются
+по их собственной таблице смещений, если она сохранена. Вывод — исходный код УВМ, который можно
+снова собрать ассемблером (для контейнера с сегментами данных — с флагом --container).
+
+Пример:
+    python disassembler.py program.bin --start 1000000 --count 20 --addresses
+"""
+import argparse  # Модуль для парсинга аргументов командной строки
+import sys  # Модуль для взаимодействия с интерпретатором Python
+from array import array  # Таблица смещений контейнера
+
+import container
+import offset_index
+from machine import open_binary
+from isa import BY_OPCODE, DECODE_TABLE, OPCODE_MASK
+
+# Количество значений в одной выводимой директиве .data
+DATA_VALUES_PER_LINE = 16
+
+
+def disassemble(code, start=0, count=None, index=None):
+    """
+    Разбирает команды бинарного кода, начиная с команды номер start.
+
+    Параметры:
+        code (bytes | memoryview | mmap.mmap): Бинарный код.
+        start (int): Номер первой команды (начиная с 0).
+        count (int | None): Количество команд (None — до конца программы).
+        index (OffsetIndex | None): Таблица смещений; без неё к команде start
+            приходится идти, последовательно пропуская предыдущие.
+
+    Возвращает:
+        Iterator[tuple]: (номер команды, pc, мнемоника, B, C).
+
+    Исключения:
+        ValueError: При неизвестном opcode.
+    """
+    decode_table = DECODE_TABLE
+    code_length = len(code)
+    if index is not None:
+        if start >= len(index):
+            return
+        pc = index.offset(start)
+    else:
+        pc = 0
+        for _ in range(start):
+            if pc >= code_length:
+                return
+            layout = decode_table[code[pc] & OPCODE_MASK]
+            if layout is None:
+                raise ValueError(f"Unknown opcode at pc={pc}: {code[pc] & OPCODE_MASK}")
+            pc += layout[0]
+
+    k = start
+    while pc < code_length and (count is None or k < start + count):
+        opcode = code[pc] & OPCODE_MASK
+        layout = decode_table[opcode]
+        if layout is None:
+            raise ValueError(f"Unknown opcode at pc={pc}: {opcode}")
+        size, read, b_shift, b_mask, c_shift, c_mask = layout
+        instr = read(code, pc)
+        yield k, pc, BY_OPCODE[opcode].mnemonic, (instr >> b_shift) & b_mask, (instr >> c_shift) & c_mask
+        pc += size
+        k += 1
+
+
+def format_instruction(k, pc, mnemonic, B, C, addresses=False):
+    """
+    Форматирует команду как строку исходного кода УВМ (с номером и смещением в комментарии).
+    """
+    line = f"{mnemonic} {B} {C}"
+    return f"{line:<28}# {k} @ {pc:#x}" if addresses else line
+
+
+def format_data(addr, values, per_line=DATA_VALUES_PER_LINE):
+    """
+    Форматирует сегмент данных как директивы .data по per_line значений в строке.
+    """
+    for i in range(0, len(values), per_line):
+        yield f".data {addr + i} {' '.join(map(str, values[i:i + per_line]))}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Disassembler for EVM.')
+    parser.add_argument('binary_file', help='Path to the binary file.')
+    parser.add_argument('--start', type=int, default=0, help='Number of the first instruction (from 0).')
+    parser.add_argument('--count', type=int, help='Number of instructions to print (default: all).')
+    parser.add_argument('--addresses', action='store_true', help='Append the instruction number and offset.')
+    parser.add_argument('--index', help='Offset index file (default: <binary>.offsets).')
+    parser.add_argument('--save-index', action='store_true',
+                        help='Build the offset index if needed and save it next to the binary.')
+    parser.add_argument('--no-index', action='store_true', help='Do not use an offset index.')
+    args = parser.parse_args()
+
+    with open_binary(args.binary_file, use_mmap=True) as code:
+        header = None
+        try:
+            index = None
+            if container.is_container(code):
+                # Внешняя таблица смещений относится к обычным бинарным файлам; у контейнера своя
+                header = container.unpack(code)
+                code = header.code
+                if header.offsets is not None and not args.no_index:
+                    offsets = array('Q', header.offsets)
+                    offsets.append(len(code))
+                    index = offset_index.OffsetIndex(offsets)
+            elif not args.no_index:
+                # Сохранённая таблица используется, если она есть и не устарела; новая строится только
+                # с --save-index (построение стоит столько же, сколько один последовательный проход)
+                index = offset_index.load_index(args.binary_file, args.index, build=args.save_index,
+                                                save=args.save_index)
+            if header is not None and args.start == 0:
+                # Сегменты данных контейнера выводятся директивами .data перед командами
+                for addr, values in header.data:
+                    for line in format_data(addr, values):
+                        print(line)
+            for instruction in disassemble(code, args.start, args.count, index):
+                print(format_instruction(*instruction, addresses=args.addresses))
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if header is not None:
+                header.release()
+
+
+if __name__ == '__main__':
+    main()
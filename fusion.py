@@ -0,0 +1,130 @@
+"""
+Слияние частых пар команд УВМ в суперкоманды.
+
+Сгенерированные программы в основном состоят из пар «LOAD_CONST r v; WRITE_MEM b c» и
+«POPCNT r a; WRITE_MEM b c» (как в input_program.txt). Каждая такая пара проходит
+диспетчеризацию дважды. Проход слияния заменяет пары в предекодированной программе
+одной внутренней командой (OP_FUSED_* в machine.py), которая выполняет обе команды
+по порядку, поэтому регистры, память и сообщения об ошибках совпадают с исполнением без слияния.
+
+Слияние выполняется при загрузке программы (VM.load(..., fuse=True), флаг --fuse интерпретатора).
+В бинарном формате места для суперкоманд нет, поэтому ассемблер по-прежнему выдаёт исходные команды.
+"""
+import re
+from array import array
+from itertools import compress
+
+from machine import (
+    OP_FUSED_LOAD_WRITE, OP_FUSED_POPCNT_WRITE, OP_LOAD_CONST, OP_POPCNT, OP_WRITE_MEM,
+    DecodedProgram,
+)
+from isa import BY_OPCODE
+
+# Пары команд, которые сливаются: (первая, вторая) -> внутренний код суперкоманды
+FUSIONS = {
+    (OP_LOAD_CONST, OP_WRITE_MEM): OP_FUSED_LOAD_WRITE,
+    (OP_POPCNT, OP_WRITE_MEM): OP_FUSED_POPCNT_WRITE,
+}
+
+# Названия суперкоманд для отчётов и профилировщика
+FUSED_NAMES = {
+    OP_FUSED_LOAD_WRITE: 'LOAD_CONST+WRITE_MEM',
+    OP_FUSED_POPCNT_WRITE: 'POPCNT+WRITE_MEM',
+}
+
+# Шаблон поиска пар по байтам кодов операций
+_PAIR_PATTERN = re.compile(b'|'.join(re.escape(bytes(pair)) for pair in FUSIONS))
+
+
+def mnemonic(opcode):
+    """
+    Возвращает мнемонику команды ISA или название суперкоманды.
+    """
+    name = FUSED_NAMES.get(opcode)
+    return name if name is not None else BY_OPCODE[opcode].mnemonic
+
+
+class FusedProgram(DecodedProgram):
+    """
+    Предекодированная программа, в которой часть пар команд заменена суперкомандами.
+
+    Атрибуты (дополнительно к DecodedProgram):
+        report (FusionReport): Отчёт о выполненных слияниях.
+    """
+
+    __slots__ = ('report',)
+
+    fused = True
+
+    def __init__(self, ops, b, c, next_pc, error=None, report=None):
+        super().__init__(ops, b, c, next_pc, error)
+        self.report = report
+
+
+class FusionReport:
+    """
+    Отчёт о слиянии команд.
+
+    Атрибуты:
+        instructions_before (int): Количество команд до слияния.
+        instructions_after (int): Количество команд после слияния.
+        fusions (dict[str, int]): Название суперкоманды -> количество слияний.
+    """
+
+    def __init__(self, instructions_before, instructions_after, fusions):
+        self.instructions_before = instructions_before
+        self.instructions_after = instructions_after
+        self.fusions = fusions
+
+    @property
+    def dispatches_saved(self):
+        """
+        Количество сэкономленных диспетчеризаций за один прогон (в программах УВМ нет переходов,
+        поэтому каждая команда исполняется ровно один раз).
+        """
+        return self.instructions_before - self.instructions_after
+
+    def format(self):
+        """
+        Возвращает текстовый отчёт.
+        """
+        lines = [f"{name}: {count} fused" for name, count in self.fusions.items()]
+        lines.append(f"instructions: {self.instructions_before} -> {self.instructions_after} "
+                     f"({self.dispatches_saved} dispatches saved)")
+        return '\n'.join(lines)
+
+
+def fuse(program):
+    """
+    Сливает пары команд из FUSIONS в суперкоманды.
+
+    Регистры обеих команд упаковываются в поле B суперкоманды (первый регистр — биты 0-2,
+    регистры WRITE_MEM — биты 3-5 и 6-8), непосредственное значение или адрес первой команды —
+    в поле C.
+
+    Параметры:
+        program (DecodedProgram): Предекодированная программа.
+
+    Возвращает:
+        FusedProgram: Программа с суперкомандами и отчётом в атрибуте report.
+    """
+    ops, bs, cs, next_pcs = program.ops, program.b, program.c, program.next_pc
+    count = len(ops)
+    # Пары ищутся регулярным выражением по байтам кодов операций; WRITE_MEM не бывает первой
+    # командой пары, поэтому найденные пары не перекрываются
+    starts = [match.start() for match in _PAIR_PATTERN.finditer(bytes(ops))]
+    new_ops, new_b, new_next_pc = array('B', ops), array('Q', bs), array('Q', next_pcs)
+    # Вторые команды пар удаляются из столбцов фильтром itertools.compress по маске
+    keep = bytearray(b'\x01') * count
+    fusions = dict.fromkeys(FUSED_NAMES.values(), 0)
+    for i in starts:
+        fused_op = FUSIONS[ops[i], ops[i + 1]]
+        new_ops[i] = fused_op
+        new_b[i] = bs[i] | (bs[i + 1] << 3) | (cs[i + 1] << 6)
+        new_next_pc[i] = next_pcs[i + 1]
+        keep[i + 1] = 0
+        fusions[FUSED_NAMES[fused_op]] += 1
+    report = FusionReport(count, count - len(starts), fusions)
+    return FusedProgram(array('B', compress(new_ops, keep)), array('Q', compress(new_b, keep)),
+                        array('Q', compress(cs, keep)), array('Q', compress(new_next_pc, keep)),
+                        program.error, report)
@@ -0,0 +1,315 @@
+"""
+Инкрементальное ассемблирование с индексом «строка исходного кода -> смещение в бинарном коде».
+
+Рядом с бинарным файлом сохраняется индекс (<binary>.idx): смещение и длина закодированной команды
+для каждой строки исходного кода, а также копия исходного кода, из которого собран бинарный файл.
+При повторной сборке новый исходный код сравнивается с сохранённым: общие начало и конец находятся
+сравнением байтов, и заново кодируются только строки между ними (при равном количестве строк —
+только действительно изменившиеся). Если размеры команд не изменились, бинарный файл правится
+на месте; иначе изменённый участок вклеивается между неизменными префиксом и суффиксом.
+
+Формат индекса (все числа little-endian):
+    MAGIC, версия (u16), количество строк N (u64), размер и mtime_ns бинарного файла (u64, u64),
+    длина исходного кода (u64); смещения N + 1 (u64, последнее — размер бинарного кода);
+    длины N (u8); исходный код.
+"""
+import os  # Размеры и время изменения файлов, атомарная замена
+import struct  # Упаковка заголовка индекса
+import sys  # Порядок байтов платформы
+import tempfile  # Временные файлы для атомарной записи
+from array import array  # Компактные массивы смещений и длин
+
+from assembly import AssemblerError, assemble_instruction
+
+MAGIC = b'UVMIDX\0\0'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sHQQQQ')
+
+
+class LineIndex:
+    """
+    Индекс строк исходного кода.
+
+    Атрибуты:
+        offsets (array): Смещение команды каждой строки (N + 1 элементов; последний — размер бинарного кода).
+            Для строк без команды (комментарии, пустые строки) — смещение следующей команды.
+        lengths (array): Длина закодированной команды каждой строки (0 для строк без команды).
+        source (bytes): Исходный код, из которого собран бинарный код.
+        binary_size (int): Размер бинарного файла при записи индекса.
+        binary_mtime_ns (int): Время изменения бинарного файла при записи индекса.
+    """
+
+    __slots__ = ('offsets', 'lengths', 'source', 'binary_size', 'binary_mtime_ns')
+
+    def __init__(self, offsets, lengths, source, binary_size=0, binary_mtime_ns=0):
+        self.offsets = offsets
+        self.lengths = lengths
+        self.source = source
+        self.binary_size = binary_size
+        self.binary_mtime_ns = binary_mtime_ns
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def line_offset(self, line_number):
+        """
+        Возвращает (смещение, длина) команды строки с номером line_number (начиная с 1).
+        """
+        return self.offsets[line_number - 1], self.lengths[line_number - 1]
+
+    def dumps(self):
+        offsets = self.offsets
+        if sys.byteorder != 'little':
+            offsets = array('Q', offsets)
+            offsets.byteswap()
+        header = _HEADER.pack(MAGIC, VERSION, len(self.lengths), self.binary_size, self.binary_mtime_ns,
+                              len(self.source))
+        return b''.join((header, offsets.tobytes(), self.lengths.tobytes(), self.source))
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Восстанавливает индекс из байтов.
+
+        Исключения:
+            ValueError: Если данные не являются индексом этой версии.
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Index is truncated.")
+        magic, version, count, binary_size, binary_mtime_ns, source_length = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a UVM line index of a supported version.")
+        position = _HEADER.size
+        offsets = array('Q')
+        offsets.frombytes(data[position:position + 8 * (count + 1)])
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        position += 8 * (count + 1)
+        lengths = array('B', data[position:position + count])
+        position += count
+        source = bytes(data[position:position + source_length])
+        if len(offsets) != count + 1 or len(lengths) != count or len(source) != source_length:
+            raise ValueError("Index is truncated.")
+        return cls(offsets, lengths, source, binary_size, binary_mtime_ns)
+
+
+def index_path(binary_path):
+    """
+    Возвращает путь к индексу для бинарного файла.
+    """
+    return binary_path + '.idx'
+
+
+def _encode_lines(lines, first_line_number):
+    """
+    Кодирует строки исходного кода (bytes). Возвращает список бинарных команд (b'' для строк без команды).
+
+    Исключения:
+        AssemblerError: С номером строки во всём файле.
+    """
+    encoded = []
+    for line_number, raw in enumerate(lines, first_line_number):
+        line = raw.decode('utf-8')
+        try:
+            binary_instr, _ = assemble_instruction(line)
+        except Exception as e:
+            raise AssemblerError(line_number, line, e) from e
+        encoded.append(binary_instr or b'')
+    return encoded
+
+
+def assemble_indexed(source):
+    """
+    Ассемблирует исходный код целиком и строит индекс строк.
+
+    Параметры:
+        source (bytes): Исходный код.
+
+    Возвращает:
+        tuple: (бинарный код, LineIndex).
+    """
+    encoded = _encode_lines(source.split(b'\n'), 1)
+    offsets = array('Q')
+    lengths = array('B')
+    position = 0
+    for binary_instr in encoded:
+        offsets.append(position)
+        lengths.append(len(binary_instr))
+        position += len(binary_instr)
+    offsets.append(position)
+    return b''.join(encoded), LineIndex(offsets, lengths, source)
+
+
+def _common_prefix(a, b):
+    """
+    Длина общего начала двух байтовых строк (двоичный поиск со сравнением срезов на скорости memcmp).
+    """
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    """
+    Длина общего конца двух байтовых строк, не больше limit.
+    """
+    lo, hi = 0, limit
+    la, lb = len(a), len(b)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[la - mid:la - lo] == b[lb - mid:lb - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _split_region(data, start, end):
+    """
+    Делит участок [start, end) на строки так же, как data.split(b'\\n') делит весь файл.
+    """
+    lines = data[start:end].split(b'\n')
+    if end < len(data):
+        # Участок заканчивается переводом строки; последний пустой элемент относится к следующей строке
+        lines.pop()
+    return lines
+
+
+def _write_atomic(path, parts):
+    """
+    Записывает части во временный файл рядом с path и атомарно заменяет path.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for part in parts:
+                f.write(part)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _load_index(binary_path):
+    """
+    Загружает индекс, если он существует и соответствует текущему бинарному файлу.
+    """
+    try:
+        with open(index_path(binary_path), 'rb') as f:
+            index = LineIndex.loads(f.read())
+        stat = os.stat(binary_path)
+    except (OSError, ValueError):
+        return None
+    if stat.st_size != index.binary_size or stat.st_mtime_ns != index.binary_mtime_ns:
+        # Бинарный файл изменён в обход инкрементальной сборки
+        return None
+    return index
+
+
+def _save_index(binary_path, index):
+    stat = os.stat(binary_path)
+    index.binary_size = stat.st_size
+    index.binary_mtime_ns = stat.st_mtime_ns
+    _write_atomic(index_path(binary_path), [index.dumps()])
+
+
+def reassemble(source, binary_path):
+    """
+    Собирает бинарный файл, по возможности перекодируя только изменившиеся строки.
+
+    Параметры:
+        source (bytes): Новый исходный код.
+        binary_path (str): Путь к бинарному файлу; индекс хранится в index_path(binary_path).
+
+    Возвращает:
+        dict: Сводка: 'mode' ('full', 'unchanged', 'patch' или 'splice'), 'lines_encoded'
+            (количество перекодированных строк), 'bytes_written' (количество записанных байтов бинарного кода).
+
+    Исключения:
+        AssemblerError: Если какую-либо строку не удалось ассемблировать; файлы при этом не изменяются.
+    """
+    index = _load_index(binary_path)
+    if index is None:
+        binary_code, index = assemble_indexed(source)
+        _write_atomic(binary_path, [binary_code])
+        _save_index(binary_path, index)
+        return {'mode': 'full', 'lines_encoded': len(index), 'bytes_written': len(binary_code)}
+
+    old = index.source
+    if old == source:
+        return {'mode': 'unchanged', 'lines_encoded': 0, 'bytes_written': 0}
+
+    # Изменённый участок: от начала строки, где начинаются различия, до конца строки, где они заканчиваются
+    prefix = _common_prefix(old, source)
+    start = old.rfind(b'\n', 0, prefix) + 1
+    suffix = _common_suffix(old, source, min(len(old), len(source)) - start)
+    # Неизменный конец должен начинаться с начала строки в обоих файлах: отсчитываем его
+    # от первого перевода строки внутри общего суффикса
+    newline = old.find(b'\n', len(old) - suffix)
+    old_end = len(old) if newline == -1 else newline + 1
+    new_end = len(source) - (len(old) - old_end)
+
+    first = old.count(b'\n', 0, start)
+    old_lines = _split_region(old, start, old_end)
+    new_lines = _split_region(source, start, new_end)
+    old_count = len(old_lines)
+
+    if len(new_lines) == old_count:
+        # Количество строк не изменилось: перекодируем только строки, отличающиеся от прежних
+        changed = [i for i, (a, b) in enumerate(zip(old_lines, new_lines)) if a != b]
+        patches = [(i, _encode_lines([new_lines[i]], first + i + 1)[0]) for i in changed]
+        if all(len(binary_instr) == index.lengths[first + i] for i, binary_instr in patches):
+            # Размеры команд совпадают — правим бинарный файл на месте
+            with open(binary_path, 'r+b') as f:
+                for i, binary_instr in patches:
+                    if binary_instr:
+                        f.seek(index.offsets[first + i])
+                        f.write(binary_instr)
+            index.source = source
+            _save_index(binary_path, index)
+            return {'mode': 'patch', 'lines_encoded': len(patches),
+                    'bytes_written': sum(len(binary_instr) for _, binary_instr in patches)}
+        # Размеры изменились — собираем участок из прежних и новых команд
+        base = index.offsets[first]
+        with open(binary_path, 'rb') as f:
+            f.seek(base)
+            old_region = f.read(index.offsets[first + old_count] - base)
+        region = [old_region[index.offsets[first + i] - base:index.offsets[first + i + 1] - base]
+                  for i in range(old_count)]
+        for i, binary_instr in patches:
+            region[i] = binary_instr
+        lines_encoded = len(patches)
+    else:
+        region = _encode_lines(new_lines, first + 1)
+        lines_encoded = len(region)
+
+    # Вклеиваем новый участок между неизменными префиксом и суффиксом бинарного кода
+    old_start = index.offsets[first]
+    old_stop = index.offsets[first + old_count]
+    region_bytes = b''.join(region)
+    with open(binary_path, 'rb') as f:
+        binary_code = f.read()
+    _write_atomic(binary_path, [binary_code[:old_start], region_bytes, binary_code[old_stop:]])
+
+    delta = len(region_bytes) - (old_stop - old_start)
+    offsets = index.offsets[:first]
+    position = old_start
+    for binary_instr in region:
+        offsets.append(position)
+        position += len(binary_instr)
+    tail = index.offsets[first + old_count:]
+    offsets.extend(tail if not delta else array('Q', (offset + delta for offset in tail)))
+    index.offsets = offsets
+    index.lengths = (index.lengths[:first] + array('B', (len(binary_instr) for binary_instr in region))
+                     + index.lengths[first + old_count:])
+    index.source = source
+    _save_index(binary_path, index)
+    return {'mode': 'splice', 'lines_encoded': lines_encoded, 'bytes_written': len(region_bytes)}
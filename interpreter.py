@@ -1,19 +1,26 @@
+"""
+Интерфейс командной строки интерпретатора УВМ.
+
+Виртуальная машина, декодер и исполнение команд находятся в модуле machine; их имена доступны
+и из этого модуля для кода, который импортирует их отсюда.
+"""
 import argparse  # Модуль для парсинга аргументов командной строки
 import json  # Модуль для работы с JSON-форматом
 import sys  # Модуль для взаимодействия с интерпретатором Python
 
+import result_output  # Форматы вывода результата
+import snapshot as snapshots  # Снимки состояния
+from machine import (  # Виртуальная машина УВМ
+    DEFAULT_MEMORY_SIZE, OP_FUSED_LOAD_WRITE, OP_FUSED_POPCNT_WRITE, OP_LOAD_CONST, OP_POPCNT, OP_POPCNT_RANGE,
+    OP_READ_MEM, OP_WRITE_MEM, VM, DecodedProgram, VMError, decode_program, execute, execute_buffer, open_binary,
+    popcount_range,
+)
+from paged_memory import DEFAULT_PAGE_SIZE  # Размер страницы по умолчанию
 
-def popcnt(x):
-    """
-    Функция для подсчёта количества установленных (1) битов в числе.
-
-    Параметры:
-        x (int): Входное число.
-
-    Возвращает:
-        int: Количество установленных битов.
-    """
-    return bin(x).count('1')
+# Наибольший размер плоской памяти, выделяемой по заголовку контейнера без явного --memory-size (в ячейках).
+# Программе с обращениями выше этого адреса память по заголовку не выделяется: она исполняется
+# с памятью по умолчанию, и выход за границы сообщается при исполнении, как для обычного бинарного кода
+MAX_HEADER_MEMORY_SIZE = 1 << 24
 
 
 def main():
@@ -22,15 +29,27 @@ def main():
 
     Выполняет следующие шаги:
         1. Парсит аргументы командной строки.
-        2. Инициализирует память и регистры УВМ.
-        3. Загружает бинарный файл с командами УВМ.
-        4. Исполняет команды последовательно, изменяя состояние регистров и памяти.
-        5. Сохраняет значения из указанного диапазона памяти в файл-результат в формате JSON.
+        2. Загружает бинарный файл с командами УВМ.
+        3. Исполняет программу в виртуальной машине VM.
+        4. Сохраняет значения из указанного диапазона памяти в файл-результат в формате JSON.
+
+    Опция --memory paged включает разреженную страничную память на всё 32-битное адресное пространство;
+    в этом случае в результат попадают только выделенные страницы из указанного диапазона.
 
     Аргументы командной строки:
         binary_file (str): Путь к бинарному файлу с командами УВМ.
         result_file (str): Путь к файлу для сохранения результата выполнения.
-        mem_range (str): Диапазон памяти для вывода в формате "start:end".
+        mem_range (str): Диапазон памяти для вывода в формате "start:end"; несколько диапазонов
+            перечисляются через запятую.
+
+    Опции --format и --dirty-only выбирают формат результата (см. result_output.py).
+
+    Опции --stop-at, --save-snapshot и --resume останавливают исполнение после заданного количества
+    команд, сохраняют снимок состояния и продолжают исполнение из снимка (см. snapshot.py).
+
+    Опция --verify статически проверяет границы памяти (см. verifier.py) и при успехе исполняет
+    программу циклом без проверок. Для контейнера, исполняемого с начала, безопасность доказывается
+    по наибольшему адресу из заголовка, без прохода проверки по программе.
     """
     # Создаём парсер для обработки аргументов командной строки
     parser = argparse.ArgumentParser(description='Interpreter for EVM.')
@@ -38,161 +57,166 @@ def main():
     # Определяем обязательные аргументы: путь к бинарному файлу, путь к файлу результата и диапазон памяти
     parser.add_argument('binary_file', help='Path to the binary file.')
     parser.add_argument('result_file', help='Path to the result file.')
-    parser.add_argument('mem_range', help='Memory range to output (start:end).')
+    parser.add_argument('mem_range', help='Memory range(s) to output (start:end[,start:end...]).')
+    parser.add_argument('--format', choices=result_output.FORMATS, default='json',
+                        help='Result format: indented JSON, compact JSON, chunked streamed JSON, '
+                             'raw little-endian 64-bit words or .npy.')
+    parser.add_argument('--dirty-only', action='store_true',
+                        help='Output only non-zero cells as (address, value) pairs (including preloaded '
+                             'container data cells).')
+    parser.add_argument('--engine', choices=('loop', 'compiled'), default='loop',
+                        help='Execution engine: decoded dispatch loop or cached compiled Python function.')
+    parser.add_argument('--cache-dir', help='Directory for cached compiled programs (compiled engine only).')
+    parser.add_argument('--memory', choices=('flat', 'paged'), default='flat',
+                        help='Memory model: flat list of --memory-size cells or sparse paged 32-bit address space.')
+    parser.add_argument('--memory-size', type=int,
+                        help=f'Number of cells of the flat memory (default: {DEFAULT_MEMORY_SIZE}, or enough for '
+                             f'the highest address recorded in a container header, up to {MAX_HEADER_MEMORY_SIZE}).')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help='Page size in cells for the paged memory (power of two).')
+    parser.add_argument('--mmap', action='store_true',
+                        help='Memory-map the binary instead of reading it; the loop engine executes straight from the mapping.')
+
+    parser.add_argument('--profile', action='store_true',
+                        help='Run an instrumented loop and print per-opcode counts, timings and hot addresses.')
+    parser.add_argument('--profile-json', help='Also write the full profile as JSON to this path.')
+    parser.add_argument('--fuse', action='store_true',
+                        help='Fuse common instruction pairs into superinstructions and print a fusion report.')
+    parser.add_argument('--verify', action='store_true',
+                        help='Statically verify memory bounds (from the container header when possible) and run the '
+                             'unchecked loop if the program is proven safe. The unchecked loop needs the decoded '
+                             'program, so a single run is not faster than the default single-pass execution.')
+    parser.add_argument('--decode-jobs', type=int, default=1,
+                        help='Decode the binary in N worker processes using its offset index (0 - one per CPU).')
+    parser.add_argument('--stop-at', type=int,
+                        help='Stop before the instruction with this index (instructions executed from the start).')
+    parser.add_argument('--save-snapshot', help='Save the VM state after execution (or at --stop-at) to this file.')
+    parser.add_argument('--resume', help='Resume execution from a snapshot saved with --save-snapshot.')
 
     # Парсим переданные аргументы
     args = parser.parse_args()
-
-    # Инициализируем память и регистры УВМ
-    memory = [0] * 1024  # Память УВМ: 1024 ячейки, инициализированные нулями
-    registers = [0] * 8  # Регистры УВМ: 8 регистров, инициализированных нулями
-
-    # Открываем бинарный файл и считываем все команды
-    with open(args.binary_file, 'rb') as f:
-        code = f.read()
-
-    # Инициализируем счётчик команд (Program Counter)
-    pc = 0
-    code_length = len(code)
-
-    # Главный цикл интерпретатора: выполняем команды до конца бинарного кода
-    while pc < code_length:
-        # Извлекаем opcode текущей команды (7 младших битов первого байта)
-        opcode = code[pc] & 0x7F
-
-        if opcode == 10:  # LOAD_CONST
-            """
-            Команда LOAD_CONST:
-                Формат: LOAD_CONST B C
-                Описание: Загружает константу C в регистр по адресу B.
-
-                Биты команды:
-                    A (7 бит): 10 (уже обработано через opcode)
-                    B (3 бита): адрес регистра
-                    C (24 бита): константа
-            """
-            # Извлекаем байты команды (5 байт для LOAD_CONST)
-            instr_bytes = code[pc:pc + 5]
-            # Преобразуем байты в целое число (little endian)
-            instr = int.from_bytes(instr_bytes, byteorder='little')
-            # Извлекаем поля A, B и C из инструкции
-            A = instr & 0x7F
-            B = (instr >> 7) & 0x7
-            C = (instr >> 10) & 0xFFFFFF
-            # Загружаем константу C в регистр B
-            registers[B] = C
-            # Увеличиваем счётчик команд на размер команды (5 байт)
-            pc += 5
-
-        elif opcode == 54:  # READ_MEM
-            """
-            Команда READ_MEM:
-                Формат: READ_MEM B C
-                Описание: Читает значение из памяти по адресу B и сохраняет его в регистр по адресу C.
-
-                Биты команды:
-                    A (7 бит): 54 (уже обработано через opcode)
-                    B (32 бита): адрес в памяти
-                    C (3 бита): адрес регистра
-            """
-            # Извлекаем байты команды (6 байт для READ_MEM)
-            instr_bytes = code[pc:pc + 6]
-            # Преобразуем байты в целое число (little endian)
-            instr = int.from_bytes(instr_bytes, byteorder='little')
-            # Извлекаем поля A, B и C из инструкции
-            A = instr & 0x7F
-            B = (instr >> 7) & 0xFFFFFFFF
-            C = (instr >> 39) & 0x7
-            # Читаем значение из памяти по адресу B и сохраняем в регистр C
-            if B >= len(memory):
-                print(f"Memory read error: Address {B} out of bounds.", file=sys.stderr)
-                sys.exit(1)
-            registers[C] = memory[B]
-            # Увеличиваем счётчик команд на размер команды (6 байт)
-            pc += 6
-
-        elif opcode == 39:  # WRITE_MEM
-            """
-            Команда WRITE_MEM:
-                Формат: WRITE_MEM B C
-                Описание: Записывает значение из регистра по адресу B в память по адресу, хранящемуся в регистре по адресу C.
-
-                Биты команды:
-                    A (7 бит): 39 (уже обработано через opcode)
-                    B (3 бита): адрес регистра источника
-                    C (3 бита): адрес регистра с адресом памяти
-            """
-            # Извлекаем байты команды (2 байта для WRITE_MEM)
-            instr_bytes = code[pc:pc + 2]
-            # Преобразуем байты в целое число (little endian)
-            instr = int.from_bytes(instr_bytes, byteorder='little')
-            # Извлекаем поля A, B и C из инструкции
-            A = instr & 0x7F
-            B = (instr >> 7) & 0x7
-            C = (instr >> 10) & 0x7
-            # Получаем адрес памяти из регистра C
-            addr = registers[C]
-            if addr >= len(memory):
-                print(f"Memory write error: Address {addr} out of bounds.", file=sys.stderr)
-                sys.exit(1)
-            # Записываем значение из регистра B в память по адресу addr
-            memory[addr] = registers[B]
-            # Увеличиваем счётчик команд на размер команды (2 байта)
-            pc += 2
-
-        elif opcode == 18:  # POPCNT
-            """
-            Команда POPCNT:
-                Формат: POPCNT B C
-                Описание: Выполняет операцию popcnt на значении из памяти по адресу C и сохраняет результат в регистр по адресу B.
-
-                Биты команды:
-                    A (7 бит): 18 (уже обработано через opcode)
-                    B (3 бита): адрес регистра для результата
-                    C (32 бита): адрес в памяти для операции popcnt
-            """
-            # Извлекаем байты команды (6 байт для POPCNT)
-            instr_bytes = code[pc:pc + 6]
-            # Преобразуем байты в целое число (little endian)
-            instr = int.from_bytes(instr_bytes, byteorder='little')
-            # Извлекаем поля A, B и C из инструкции
-            A = instr & 0x7F
-            B = (instr >> 7) & 0x7
-            C = (instr >> 10) & 0xFFFFFFFF
-            # Получаем адрес памяти из регистра C
-            if C >= len(memory):
-                print(f"Memory popcnt error: Address {C} out of bounds.", file=sys.stderr)
+    use_snapshots = args.stop_at is not None or args.save_snapshot or args.resume
+    if use_snapshots and args.engine == 'compiled':
+        parser.error('--stop-at, --save-snapshot and --resume require the loop engine.')
+    if args.decode_jobs < 0:
+        parser.error('--decode-jobs must be non-negative.')
+    parallel_decode = args.decode_jobs != 1
+    if parallel_decode and args.engine == 'compiled':
+        parser.error('--decode-jobs requires the loop engine.')
+    if args.fuse and (args.engine == 'compiled' or args.stop_at is not None or args.resume):
+        # Номера слитых команд не совпадают с номерами команд в снимке
+        parser.error('--fuse cannot be combined with --engine compiled, --stop-at or --resume.')
+    if args.verify and (args.engine == 'compiled' or args.profile or args.profile_json):
+        parser.error('--verify cannot be combined with --engine compiled or --profile.')
+
+    # Профилирование выполняется отдельным инструментированным циклом над предекодированной программой
+    profile = None
+    if args.profile or args.profile_json:
+        if args.engine == 'compiled':
+            parser.error('--profile requires the loop engine.')
+        import profiler
+        profile = profiler.Profile()
+
+    # Загружаем программу в виртуальную машину (по умолчанию 1024 ячейки памяти, 8 регистров) и исполняем её.
+    # С флагом --mmap файл отображается в память, и цикл исполняет команды прямо из отображения.
+    import container
+    with open_binary(args.binary_file, use_mmap=args.mmap or parallel_decode) as code:
+        # Контейнер проверяется (размеры, контрольная сумма) до исполнения; обычный бинарный код принимается как есть
+        header = None
+        if container.is_container(code):
+            try:
+                header = container.unpack(code)
+            except container.ContainerError as e:
+                print(str(e), file=sys.stderr)
                 sys.exit(1)
-            # Выполняем popcnt на значении из памяти по адресу C и сохраняем результат в регистр B
-            memory[C] = popcnt(memory[C])
-            registers[B] = memory[C]  # Обновляем регистр B
-            # Увеличиваем счётчик команд на размер команды (6 байт)
-            pc += 6
-
-        else:
-            # Если opcode не распознан, выводим сообщение об ошибке и завершаем работу
-            print(f"Unknown opcode at pc={pc}: {opcode}", file=sys.stderr)
+            if parallel_decode:
+                header.release()
+                parser.error('--decode-jobs does not support container binaries.')
+        # Без явного --memory-size плоская память выделяется по наибольшему адресу из заголовка контейнера
+        memory_size = DEFAULT_MEMORY_SIZE if args.memory_size is None else args.memory_size
+        if header is not None and args.memory_size is None and header.memory_size <= MAX_HEADER_MEMORY_SIZE:
+            memory_size = max(memory_size, header.memory_size)
+        try:
+            try:
+                vm = VM(memory_size=memory_size, memory_model=args.memory, page_size=args.page_size)
+            except ValueError as e:
+                parser.error(str(e))
+            if args.engine == 'compiled':
+                import compiler
+                vm.load(compiler.compile_binary(header.code if header is not None else code,
+                                                args.cache_dir or compiler.DEFAULT_CACHE_DIR),
+                        data=header.data if header is not None else None)
+            elif parallel_decode:
+                # Таблица смещений делит файл по границам команд; фрагменты декодируются в пуле процессов
+                import offset_index
+                vm.load(offset_index.decode_parallel(args.binary_file, args.decode_jobs or None), fuse=args.fuse)
+            else:
+                # Однократный запуск исполняется за один проход по буферу (execute_buffer); массивы-столбцы
+                # строятся, только если они нужны профилировщику, снимкам, проверке границ или слиянию команд
+                vm.load(header if header is not None else code,
+                        decode=profile is not None or bool(use_snapshots) or args.verify, fuse=args.fuse)
+            if args.fuse:
+                print(vm.program.report.format())
+            if args.resume:
+                vm.restore(snapshots.load(args.resume))
+            # Программа, безопасность которой доказана, исполняется циклом без проверок границ;
+            # иначе отчёт указывает недоказанную команду, и исполнение идёт обычным циклом
+            unchecked = False
+            if args.verify:
+                import verifier
+                # Заголовок контейнера хранит оценку, вычисленную при сборке: с ней проверка не повторяется.
+                # Оценка не сверяется с кодом, поэтому ей доверяется только для плоской памяти: неверная
+                # оценка там приводит к VMError при исполнении, а не к записи за пределы адресного пространства
+                verification = None
+                if header is not None and not args.resume and args.memory == 'flat':
+                    verification = verifier.from_header(header, len(vm.memory))
+                if verification is None:
+                    verification = vm.verify()
+                print(verification.format())
+                unchecked = verification.safe
+            vm.run(profile, stop=args.stop_at, unchecked=unchecked)
+        except (VMError, container.ContainerError, snapshots.SnapshotError, OSError) as e:
+            if profile is not None:
+                profiler.write_report(profile, args.profile_json)
+            print(str(e), file=sys.stderr)
             sys.exit(1)
-
-    # После выполнения всех команд, извлекаем указанный диапазон памяти
+        except MemoryError:
+            print("Out of memory.", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if header is not None:
+                header.release()
+    if profile is not None:
+        profiler.write_report(profile, args.profile_json)
+    if args.save_snapshot:
+        snapshots.save(args.save_snapshot, vm.checkpoint())
+    memory = vm.memory
+
+    # После выполнения всех команд, разбираем указанные диапазоны памяти
     try:
-        start, end = map(int, args.mem_range.split(':'))
+        ranges = result_output.parse_ranges(args.mem_range)
     except ValueError:
         print(f"Invalid memory range format: {args.mem_range}. Expected format 'start:end'.", file=sys.stderr)
         sys.exit(1)
 
-    # Проверяем, что диапазон памяти корректен
-    if not (0 <= start <= end <= len(memory)):
-        print(f"Memory range out of bounds: {args.mem_range}.", file=sys.stderr)
-        sys.exit(1)
+    # Проверяем, что диапазоны памяти корректны
+    for start, end in ranges:
+        if not (0 <= start <= end <= len(memory)):
+            print(f"Memory range out of bounds: {args.mem_range}.", file=sys.stderr)
+            sys.exit(1)
 
-    # Извлекаем значения из памяти в указанном диапазоне
-    result = memory[start:end]
+    if args.format != 'json':
+        # Компактный, потоковый и двоичные форматы записываются модулем result_output
+        result_output.write_result(args.result_file, memory, ranges, args.format, args.dirty_only)
+        return
+
+    # Извлекаем значения из памяти в указанном диапазоне; для страничной памяти —
+    # только выделенные страницы в виде словаря {адрес начала фрагмента: значения}
+    result = result_output.json_result(memory, ranges, args.dirty_only)
 
     # Записываем результат в файл-результат в формате JSON
     with open(args.result_file, 'w') as f:
         json.dump(result, f, indent=2)
 
-
 if __name__ == '__main__':
     main()
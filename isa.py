@@ -0,0 +1,138 @@
+"""
+Декларативное описание системы команд УВМ.
+
+Единая таблица ISA задаёт для каждой команды opcode (поле A), размер в байтах и
+расположение полей B и C. Из таблицы заранее строятся кодировщики для ассемблера
+и таблицы декодирования для интерпретатора, поэтому оба инструмента всегда
+используют одинаковую раскладку полей.
+"""
+import re
+import struct
+from collections import namedtuple
+
+
+# Поле команды: имя, смещение младшего бита, ширина в битах и смысл значения
+# ('reg' — номер регистра, 'addr' — адрес в памяти, 'imm' — константа)
+Field = namedtuple('Field', ['name', 'offset', 'width', 'kind'])
+
+# Описание команды: мнемоника, opcode (поле A), размер в байтах и поля B и C
+InstructionSpec = namedtuple('InstructionSpec', ['mnemonic', 'opcode', 'size', 'b', 'c'])
+
+# Поле A (opcode) занимает 7 младших битов во всех командах
+OPCODE_MASK = 0x7F
+
+# Таблица команд УВМ
+ISA = (
+    # LOAD_CONST B C: загружает константу C в регистр B
+    InstructionSpec('LOAD_CONST', 10, 5, Field('B', 7, 3, 'reg'), Field('C', 10, 24, 'imm')),
+    # READ_MEM B C: читает ячейку памяти B в регистр C
+    InstructionSpec('READ_MEM', 54, 6, Field('B', 7, 32, 'addr'), Field('C', 39, 3, 'reg')),
+    # WRITE_MEM B C: записывает регистр B в ячейку памяти, адрес которой хранится в регистре C
+    InstructionSpec('WRITE_MEM', 39, 2, Field('B', 7, 3, 'reg'), Field('C', 10, 3, 'reg')),
+    # POPCNT B C: заменяет ячейку памяти C на popcnt её значения и копирует результат в регистр B
+    InstructionSpec('POPCNT', 18, 6, Field('B', 7, 3, 'reg'), Field('C', 10, 32, 'addr')),
+    # POPCNT_RANGE B C: заменяет ячейки памяти [B, B + C) на popcnt их значений (как C команд POPCNT подряд)
+    InstructionSpec('POPCNT_RANGE', 45, 8, Field('B', 7, 32, 'addr'), Field('C', 39, 24, 'imm')),
+)
+
+# Поиск описания команды по мнемонике и по opcode
+BY_MNEMONIC = {spec.mnemonic: spec for spec in ISA}
+BY_OPCODE = {spec.opcode: spec for spec in ISA}
+
+
+def _make_encoder(spec):
+    """
+    Строит функцию кодирования команды с заранее вычисленными масками и сдвигами.
+
+    Параметры:
+        spec (InstructionSpec): Описание команды.
+
+    Возвращает:
+        callable: Функция (B, C) -> bytes, выбрасывающая ValueError при выходе поля за допустимый диапазон.
+    """
+    mnemonic, opcode, size = spec.mnemonic, spec.opcode, spec.size
+    b_shift, b_max = spec.b.offset, (1 << spec.b.width) - 1
+    c_shift, c_max = spec.c.offset, (1 << spec.c.width) - 1
+
+    def encode(B, C):
+        if not (0 <= B <= b_max):
+            raise ValueError(f"Field B={B} out of range for {mnemonic} (0-{b_max})")
+        if not (0 <= C <= c_max):
+            raise ValueError(f"Field C={C} out of range for {mnemonic} (0-{c_max})")
+        return (opcode | (B << b_shift) | (C << c_shift)).to_bytes(size, byteorder='little')
+
+    return encode
+
+
+# Кодировщики для ассемблера: мнемоника -> (opcode, функция кодирования)
+ENCODERS = {spec.mnemonic: (spec.opcode, _make_encoder(spec)) for spec in ISA}
+
+
+def _make_reader(size):
+    """
+    Строит функцию чтения команды заданного размера из буфера без копирования байтов.
+
+    Команда читается через struct.unpack_from прямо из bytes, bytearray, memoryview или mmap;
+    6-байтовые и 5-байтовые команды собираются из 32-битного слова и остатка. Обрезанная
+    команда в конце буфера дополняется нулями.
+
+    Параметры:
+        size (int): Размер команды в байтах (2, 5, 6 или 8).
+
+    Возвращает:
+        callable: Функция (buffer, offset) -> int.
+    """
+    formats = {2: '<H', 5: '<IB', 6: '<IH', 8: '<Q'}
+    unpack_from = struct.Struct(formats[size]).unpack_from
+
+    if size in (2, 8):
+        def read(buffer, offset):
+            if offset + size > len(buffer):
+                return int.from_bytes(buffer[offset:offset + size], byteorder='little')
+            return unpack_from(buffer, offset)[0]
+    else:
+        def read(buffer, offset):
+            if offset + size > len(buffer):
+                return int.from_bytes(buffer[offset:offset + size], byteorder='little')
+            low, high = unpack_from(buffer, offset)
+            return low | (high << 32)
+
+    return read
+
+
+# Таблица декодирования для интерпретатора: индекс — opcode, значение — кортеж
+# (размер, функция чтения, сдвиг B, маска B, сдвиг C, маска C) или None для неизвестного opcode
+DECODE_TABLE = [None] * (OPCODE_MASK + 1)
+for _spec in ISA:
+    DECODE_TABLE[_spec.opcode] = (
+        _spec.size,
+        _make_reader(_spec.size),
+        _spec.b.offset, (1 << _spec.b.width) - 1,
+        _spec.c.offset, (1 << _spec.c.width) - 1,
+    )
+del _spec
+
+# Таблица полей для разбора по первому байту команды: индекс — первый байт (opcode и младший бит поля B),
+# значение — кортеж (opcode, сдвиг B, маска B, сдвиг C, маска C) или None для неизвестного opcode
+FIELD_TABLE = [None] * 256
+for _first in range(256):
+    _layout = DECODE_TABLE[_first & OPCODE_MASK]
+    if _layout is not None:
+        FIELD_TABLE[_first] = (_first & OPCODE_MASK,) + _layout[2:]
+del _first, _layout
+
+
+def _instruction_pattern(spec):
+    """
+    Возвращает регулярное выражение одной команды: первый байт — opcode при любом значении
+    старшего бита (он принадлежит полю B), затем остальные size - 1 байтов команды.
+    """
+    first = re.escape(bytes([spec.opcode])) + re.escape(bytes([spec.opcode | (OPCODE_MASK + 1)]))
+    return b'[' + first + b']' + b'.' * (spec.size - 1)
+
+
+# Команды различаются первым байтом, поэтому разбиение бинарного кода на команды однозначно, и его
+# выполняет модуль re, не проходя по командам циклом Python. INSTRUCTION_PATTERN.findall выдаёт байты
+# команд подряд, PROGRAM_PATTERN.match(...).end() — конец последней целой команды известного opcode
+INSTRUCTION_PATTERN = re.compile(b'|'.join(_instruction_pattern(spec) for spec in ISA), re.DOTALL)
+PROGRAM_PATTERN = re.compile(b'(?:' + INSTRUCTION_PATTERN.pattern + b')*', re.DOTALL)
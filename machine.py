@@ -0,0 +1,716 @@
+"""
+Виртуальная машина УВМ: декодирование бинарного кода, исполнение команд и класс VM.
+
+Модуль не зависит от командной строки и импортируется остальными модулями (профилировщик, компилятор,
+проверка границ, сервис и т.д.); interpreter.py — интерфейс командной строки поверх него.
+"""
+import contextlib  # Контекстные менеджеры для открытия бинарных файлов
+import mmap  # Отображение бинарных файлов в память без копирования
+from array import array  # Компактные типизированные массивы для предекодированной программы
+from itertools import accumulate, repeat  # Разбор фрагментов кода без цикла Python по командам
+from operator import and_, itemgetter, rshift
+
+import snapshot as snapshots  # Снимки состояния
+from isa import (  # Таблица команд УВМ
+    BY_MNEMONIC, DECODE_TABLE, FIELD_TABLE, INSTRUCTION_PATTERN, OPCODE_MASK, PROGRAM_PATTERN,
+)
+from paged_memory import DEFAULT_PAGE_SIZE, make_memory  # Модели памяти УВМ
+from popcnt_vector import popcnt  # Подсчёт установленных битов для команды POPCNT
+
+# Коды операций (поле A) команд УВМ
+OP_LOAD_CONST = BY_MNEMONIC['LOAD_CONST'].opcode
+OP_READ_MEM = BY_MNEMONIC['READ_MEM'].opcode
+OP_WRITE_MEM = BY_MNEMONIC['WRITE_MEM'].opcode
+OP_POPCNT = BY_MNEMONIC['POPCNT'].opcode
+OP_POPCNT_RANGE = BY_MNEMONIC['POPCNT_RANGE'].opcode
+
+# Размер плоской памяти по умолчанию (в ячейках)
+DEFAULT_MEMORY_SIZE = 1024
+
+# Внутренние коды слитых команд (суперкоманд, см. fusion.py). В бинарном коде opcode семибитный,
+# поэтому значения от 128 не пересекаются с командами ISA
+OP_FUSED_LOAD_WRITE = 128
+OP_FUSED_POPCNT_WRITE = 129
+
+# Размер фрагмента бинарного кода, разбираемого на команды за один вызов регулярного выражения
+TOKEN_CHUNK_BYTES = 1 << 16
+
+# Таблицы по первому байту команды для извлечения полей (неизвестные opcode разбором не пропускаются)
+_OPCODE_OF = bytes(first & OPCODE_MASK for first in range(256))
+_B_SHIFT, _B_MASK, _C_SHIFT, _C_MASK = (
+    [fields[i] if fields is not None else 0 for fields in FIELD_TABLE] for i in range(1, 5))
+
+
+class VMError(Exception):
+    """
+    Ошибка времени выполнения УВМ (выход за границы памяти, неизвестный opcode и т.п.).
+    """
+
+
+class DecodedProgram:
+    """
+    Предекодированная программа УВМ.
+
+    Бинарный код разбирается один раз, а поля команд хранятся в компактных массивах-столбцах
+    одинаковой длины (по одному элементу на команду). Объект не изменяется при исполнении,
+    поэтому его можно повторно использовать для многократных запусков одного и того же бинарного файла.
+
+    Атрибуты:
+        ops (array): Коды операций (поле A).
+        b (array): Значения поля B.
+        c (array): Значения поля C.
+        next_pc (array): Смещение (в байтах) следующей команды.
+        error (tuple | None): Пара (pc, opcode) для неизвестного opcode, на котором остановился разбор.
+    """
+
+    __slots__ = ('ops', 'b', 'c', 'next_pc', 'error')
+
+    # True для программ со слитыми командами (см. fusion.py): номера их команд не совпадают с исходными
+    fused = False
+
+    def __init__(self, ops, b, c, next_pc, error=None):
+        self.ops = ops
+        self.b = b
+        self.c = c
+        self.next_pc = next_pc
+        self.error = error
+
+    def __len__(self):
+        return len(self.ops)
+
+
+def _instruction_chunks(code):
+    """
+    Разбивает бинарный код на команды фрагментами по TOKEN_CHUNK_BYTES байтов (см. isa.INSTRUCTION_PATTERN).
+
+    Параметры:
+        code (bytes | bytearray | memoryview | mmap.mmap): Бинарный код программы.
+
+    Возвращает:
+        Iterator[tuple[int, list[bytes]]]: Пары (смещение фрагмента, байты его команд подряд). Разбор
+            останавливается перед неизвестным opcode или обрезанной последней командой (см. _decode_tail).
+    """
+    pos = 0
+    length = len(code)
+    while pos < length:
+        end = PROGRAM_PATTERN.match(code, pos, min(pos + TOKEN_CHUNK_BYTES, length)).end()
+        if end == pos:
+            return
+        yield pos, INSTRUCTION_PATTERN.findall(code, pos, end)
+        pos = end
+
+
+def _decode_tail(code, pc):
+    """
+    Разбирает остаток кода, на котором остановился _instruction_chunks.
+
+    Возвращает:
+        tuple | None: (opcode, B, C, размер) для обрезанной последней команды (недостающие байты
+            считаются нулями) или None для неизвестного opcode.
+    """
+    opcode = code[pc] & OPCODE_MASK
+    layout = DECODE_TABLE[opcode]
+    if layout is None:
+        return None
+    size, read, b_shift, b_mask, c_shift, c_mask = layout
+    instr = read(code, pc)
+    return opcode, (instr >> b_shift) & b_mask, (instr >> c_shift) & c_mask, size
+
+
+def decode_program(code):
+    """
+    Декодирует бинарный код УВМ в массивы-столбцы.
+
+    Параметры:
+        code (bytes | bytearray | memoryview | mmap.mmap): Бинарный код программы.
+
+    Возвращает:
+        DecodedProgram: Предекодированная программа.
+
+    Код разбивается на команды регулярным выражением, а поля извлекаются для всего фрагмента сразу
+    вложенными map со сдвигами и масками из таблиц по первому байту команды, без цикла Python по командам.
+
+    Если встречен неизвестный opcode, разбор останавливается, а ошибка сохраняется в поле error
+    и выбрасывается при исполнении после выполнения всех предшествующих команд.
+    """
+    ops = array('B')
+    bs = array('Q')
+    cs = array('Q')
+    next_pcs = array('Q')
+    error = None
+
+    pc = 0
+    for start, tokens in _instruction_chunks(code):
+        # Первый байт команды задаёт opcode и таблицы сдвигов и масок её полей
+        firsts = bytes(map(itemgetter(0), tokens))
+        words = list(map(int.from_bytes, tokens, repeat('little')))
+        ops.frombytes(firsts.translate(_OPCODE_OF))
+        bs.extend(map(and_, map(rshift, words, map(_B_SHIFT.__getitem__, firsts)),
+                      map(_B_MASK.__getitem__, firsts)))
+        cs.extend(map(and_, map(rshift, words, map(_C_SHIFT.__getitem__, firsts)),
+                      map(_C_MASK.__getitem__, firsts)))
+        offsets = accumulate(map(len, tokens), initial=start)
+        next(offsets)
+        next_pcs.extend(offsets)
+        pc = next_pcs[-1]
+
+    if pc < len(code):
+        tail = _decode_tail(code, pc)
+        if tail is None:
+            error = (pc, code[pc] & OPCODE_MASK)
+        else:
+            opcode, B, C, size = tail
+            ops.append(opcode)
+            bs.append(B)
+            cs.append(C)
+            next_pcs.append(pc + size)
+
+    return DecodedProgram(ops, bs, cs, next_pcs, error)
+
+
+def _exec_load_const(registers, memory, B, C):
+    """
+    Команда LOAD_CONST:
+        Формат: LOAD_CONST B C
+        Описание: Загружает константу C в регистр по адресу B.
+    """
+    registers[B] = C
+
+
+def _exec_read_mem(registers, memory, B, C):
+    """
+    Команда READ_MEM:
+        Формат: READ_MEM B C
+        Описание: Читает значение из памяти по адресу B и сохраняет его в регистр по адресу C.
+    """
+    if B >= len(memory):
+        raise VMError(f"Memory read error: Address {B} out of bounds.")
+    registers[C] = memory[B]
+
+
+def _exec_write_mem(registers, memory, B, C):
+    """
+    Команда WRITE_MEM:
+        Формат: WRITE_MEM B C
+        Описание: Записывает значение из регистра по адресу B в память по адресу,
+                  хранящемуся в регистре по адресу C.
+    """
+    addr = registers[C]
+    if addr >= len(memory):
+        raise VMError(f"Memory write error: Address {addr} out of bounds.")
+    memory[addr] = registers[B]
+
+
+def _exec_popcnt(registers, memory, B, C):
+    """
+    Команда POPCNT:
+        Формат: POPCNT B C
+        Описание: Выполняет операцию popcnt на значении из памяти по адресу C,
+                  записывает результат обратно в память и в регистр по адресу B.
+    """
+    if C >= len(memory):
+        raise VMError(f"Memory popcnt error: Address {C} out of bounds.")
+    memory[C] = popcnt(memory[C])
+    registers[B] = memory[C]
+
+
+def popcount_range(memory, start, length):
+    """
+    Заменяет ячейки памяти [start, start + length) на popcnt их значений одной операцией над срезом.
+
+    Семантика совпадает с length командами POPCNT подряд: если диапазон выходит за границы памяти,
+    ячейки в пределах памяти обрабатываются, после чего выбрасывается ошибка для первого
+    недопустимого адреса.
+
+    Исключения:
+        VMError: Если диапазон выходит за границы памяти.
+    """
+    size = len(memory)
+    end = start + length
+    in_bounds_end = min(end, size)
+    if start < in_bounds_end:
+        if isinstance(memory, list):
+            memory[start:in_bounds_end] = [x.bit_count() for x in memory[start:in_bounds_end]]
+        else:
+            memory.popcount_range(start, in_bounds_end)
+    if end > size:
+        raise VMError(f"Memory popcnt error: Address {max(start, size)} out of bounds.")
+
+
+def _exec_popcnt_range(registers, memory, B, C):
+    """
+    Команда POPCNT_RANGE:
+        Формат: POPCNT_RANGE B C
+        Описание: Выполняет popcnt над C ячейками памяти, начиная с адреса B, и записывает результаты на место.
+    """
+    popcount_range(memory, B, C)
+
+
+def _exec_fused_load_write(registers, memory, B, C):
+    """
+    Слитая команда LOAD_CONST r C; WRITE_MEM b c (см. fusion.py).
+    Поле B упаковывает регистры: r — биты 0-2, b — биты 3-5, c — биты 6-8.
+    """
+    registers[B & 7] = C
+    addr = registers[B >> 6]
+    if addr >= len(memory):
+        raise VMError(f"Memory write error: Address {addr} out of bounds.")
+    memory[addr] = registers[(B >> 3) & 7]
+
+
+def _exec_fused_popcnt_write(registers, memory, B, C):
+    """
+    Слитая команда POPCNT r C; WRITE_MEM b c (см. fusion.py). Регистры упакованы в поле B, как
+    в _exec_fused_load_write.
+    """
+    if C >= len(memory):
+        raise VMError(f"Memory popcnt error: Address {C} out of bounds.")
+    registers[B & 7] = memory[C] = popcnt(memory[C])
+    addr = registers[B >> 6]
+    if addr >= len(memory):
+        raise VMError(f"Memory write error: Address {addr} out of bounds.")
+    memory[addr] = registers[(B >> 3) & 7]
+
+
+# Таблица диспетчеризации: индекс — opcode (7 бит ISA и внутренние коды слитых команд), значение — обработчик
+DISPATCH = [None] * 256
+DISPATCH[OP_LOAD_CONST] = _exec_load_const
+DISPATCH[OP_READ_MEM] = _exec_read_mem
+DISPATCH[OP_WRITE_MEM] = _exec_write_mem
+DISPATCH[OP_POPCNT] = _exec_popcnt
+DISPATCH[OP_POPCNT_RANGE] = _exec_popcnt_range
+DISPATCH[OP_FUSED_LOAD_WRITE] = _exec_fused_load_write
+DISPATCH[OP_FUSED_POPCNT_WRITE] = _exec_fused_popcnt_write
+
+
+def _exec_read_mem_unchecked(registers, memory, B, C):
+    """
+    Команда READ_MEM без проверки границ памяти.
+    """
+    registers[C] = memory[B]
+
+
+def _exec_write_mem_unchecked(registers, memory, B, C):
+    """
+    Команда WRITE_MEM без проверки границ памяти.
+    """
+    memory[registers[C]] = registers[B]
+
+
+def _exec_popcnt_unchecked(registers, memory, B, C):
+    """
+    Команда POPCNT без проверки границ памяти.
+    """
+    registers[B] = memory[C] = popcnt(memory[C])
+
+
+def _exec_fused_load_write_unchecked(registers, memory, B, C):
+    """
+    Команда LOAD_CONST+WRITE_MEM без проверки границ памяти.
+    """
+    registers[B & 7] = C
+    memory[registers[B >> 6]] = registers[(B >> 3) & 7]
+
+
+def _exec_fused_popcnt_write_unchecked(registers, memory, B, C):
+    """
+    Команда POPCNT+WRITE_MEM без проверки границ памяти.
+    """
+    registers[B & 7] = memory[C] = popcnt(memory[C])
+    memory[registers[B >> 6]] = registers[(B >> 3) & 7]
+
+
+# Таблица диспетчеризации без проверок границ памяти — только для программ, прошедших проверку verifier.verify
+UNCHECKED_DISPATCH = list(DISPATCH)
+UNCHECKED_DISPATCH[OP_READ_MEM] = _exec_read_mem_unchecked
+UNCHECKED_DISPATCH[OP_WRITE_MEM] = _exec_write_mem_unchecked
+UNCHECKED_DISPATCH[OP_POPCNT] = _exec_popcnt_unchecked
+UNCHECKED_DISPATCH[OP_FUSED_LOAD_WRITE] = _exec_fused_load_write_unchecked
+UNCHECKED_DISPATCH[OP_FUSED_POPCNT_WRITE] = _exec_fused_popcnt_write_unchecked
+
+
+def execute(program, registers, memory, start=0, stop=None, unchecked=False):
+    """
+    Исполняет предекодированную программу над переданными регистрами и памятью.
+
+    Параметры:
+        program (DecodedProgram): Программа, полученная из decode_program.
+        registers (list[int]): Регистры УВМ (изменяются на месте).
+        memory (list[int]): Память УВМ (изменяется на месте).
+        start (int): Индекс первой исполняемой команды.
+        stop (int | None): Индекс команды, перед которой исполнение останавливается (None — до конца).
+        unchecked (bool): Исполнять без проверок границ памяти. Допустимо только для программ,
+            безопасность которых доказана verifier.verify для этого размера памяти и состояния.
+            Выход за границы плоской памяти и в этом режиме приводит к VMError.
+
+    Возвращает:
+        int: Индекс следующей команды (количество исполненных команд с начала программы).
+
+    Исключения:
+        VMError: При выходе за границы памяти или неизвестном opcode.
+    """
+    dispatch = UNCHECKED_DISPATCH if unchecked else DISPATCH
+    count = len(program.ops)
+    end = count if stop is None else min(stop, count)
+    try:
+        if start == 0 and end == count:
+            for opcode, B, C in zip(program.ops, program.b, program.c):
+                dispatch[opcode](registers, memory, B, C)
+        else:
+            # Срезы столбцов, а не islice: islice пропускал бы start команд заново при каждом продолжении
+            for opcode, B, C in zip(program.ops[start:end], program.b[start:end], program.c[start:end]):
+                dispatch[opcode](registers, memory, B, C)
+    except IndexError:
+        # Без проверок выход за границы плоской памяти обнаруживает сам список: доказательство
+        # безопасности оказалось неверным (например, подменённый заголовок контейнера)
+        if not unchecked:
+            raise
+        raise VMError("Memory access out of bounds in unchecked execution.") from None
+
+    if end == count and program.error is not None:
+        pc, opcode = program.error
+        raise VMError(f"Unknown opcode at pc={pc}: {opcode}")
+    return max(start, end)
+
+
+def execute_buffer(code, registers, memory):
+    """
+    Исполняет программу прямо из буфера за один проход, не строя массивы-столбцы.
+
+    Используется для однократного запуска (интерфейс командной строки) и для очень больших программ,
+    отображённых в память через mmap: код разбирается на команды фрагментами по TOKEN_CHUNK_BYTES байтов,
+    и ни бинарный код, ни его декодированное представление не копируются в кучу Python целиком.
+
+    Параметры:
+        code (bytes | memoryview | mmap.mmap): Бинарный код программы.
+        registers (list[int]): Регистры УВМ (изменяются на месте).
+        memory (list[int]): Память УВМ (изменяется на месте).
+
+    Исключения:
+        VMError: При выходе за границы памяти или неизвестном opcode.
+    """
+    fields = FIELD_TABLE
+    dispatch = DISPATCH
+    pc = 0
+    for start, tokens in _instruction_chunks(code):
+        for first, instr in zip(bytes(map(itemgetter(0), tokens)), map(int.from_bytes, tokens, repeat('little'))):
+            opcode, b_shift, b_mask, c_shift, c_mask = fields[first]
+            dispatch[opcode](registers, memory, (instr >> b_shift) & b_mask, (instr >> c_shift) & c_mask)
+        pc = start + sum(map(len, tokens))
+
+    if pc < len(code):
+        tail = _decode_tail(code, pc)
+        if tail is None:
+            raise VMError(f"Unknown opcode at pc={pc}: {code[pc] & OPCODE_MASK}")
+        opcode, B, C, _ = tail
+        dispatch[opcode](registers, memory, B, C)
+
+
+@contextlib.contextmanager
+def open_binary(path, use_mmap=False):
+    """
+    Открывает бинарный файл программы.
+
+    Параметры:
+        path (str): Путь к бинарному файлу.
+        use_mmap (bool): Если True, файл отображается в память (mmap) и возвращается
+            только для чтения без копирования; иначе файл читается целиком.
+
+    Возвращает:
+        Контекстный менеджер, выдающий bytes или mmap.mmap.
+    """
+    with open(path, 'rb') as f:
+        if not use_mmap:
+            yield f.read()
+            return
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Пустой файл нельзя отобразить в память
+            yield b''
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+class _RawProgram:
+    """
+    Недекодированная программа: буфер с бинарным кодом, исполняемый через execute_buffer.
+    """
+
+    __slots__ = ('code',)
+
+    def __init__(self, code):
+        self.code = code
+
+
+class VM:
+    """
+    Виртуальная машина УВМ для исполнения программ внутри процесса.
+
+    Позволяет загрузить программу (байты, буфер или DecodedProgram), исполнить её
+    и получить регистры и память напрямую, без запуска отдельного процесса и без файлов.
+
+    Пример:
+        vm = VM()
+        vm.load(assembly.assemble("LOAD_CONST 0 25"))
+        state = vm.run()
+    """
+
+    def __init__(self, memory_size=DEFAULT_MEMORY_SIZE, num_registers=8, memory_model='flat', page_size=DEFAULT_PAGE_SIZE):
+        """
+        Параметры:
+            memory_size (int): Количество ячеек плоской памяти.
+            num_registers (int): Количество регистров.
+            memory_model (str): 'flat' — список из memory_size ячеек, 'paged' — разреженная
+                страничная память на всё 32-битное адресное пространство (см. paged_memory.py).
+            page_size (int): Размер страницы для страничной памяти.
+        """
+        self.memory_size = memory_size
+        self.num_registers = num_registers
+        self.memory_model = memory_model
+        self.page_size = page_size
+        self.program = None
+        self.header = None
+        self.data = []
+        self.reset()
+
+    def reset(self):
+        """
+        Обнуляет регистры и память, сохраняя загруженную программу (и заново копирует её сегменты данных).
+        """
+        self.registers = [0] * self.num_registers
+        self.memory = make_memory(self.memory_model, self.memory_size, self.page_size)
+        self.steps = 0
+        self.write_data(self.data)
+
+    def write_data(self, segments):
+        """
+        Копирует сегменты данных в память: по одному присваиванию среза на сегмент.
+
+        Параметры:
+            segments (Iterable[tuple[int, array]]): Пары (начальный адрес, значения).
+
+        Исключения:
+            VMError: Если сегмент выходит за границы памяти.
+        """
+        memory = self.memory
+        for addr, values in segments:
+            if addr + len(values) > len(memory):
+                raise VMError(f"Data segment [{addr}, {addr + len(values)}) out of memory bounds "
+                              f"({len(memory)} cells).")
+            if isinstance(memory, list):
+                memory[addr:addr + len(values)] = values
+            else:
+                memory.write(addr, values)
+
+    def load(self, program, decode=True, fuse=False, data=None):
+        """
+        Загружает программу в виртуальную машину.
+
+        Параметры:
+            program (bytes | bytearray | memoryview | Container | DecodedProgram | CompiledProgram): Бинарный
+                код (обычный или в контейнере, см. container.py), разобранный контейнер, уже декодированная
+                программа или программа, скомпилированная модулем compiler.
+                Декодированную и скомпилированную программы можно разделять между несколькими экземплярами VM.
+            decode (bool): Если False, бинарный код не предекодируется, а исполняется прямо из буфера
+                (см. execute_buffer). Буфер должен оставаться открытым до окончания run().
+            fuse (bool): Слить частые пары команд в суперкоманды (см. fusion.py). Отчёт доступен
+                в атрибуте program.report.
+            data (list[tuple[int, array]] | None): Сегменты данных, копируемые в память при загрузке
+                и при reset() (по умолчанию — сегменты контейнера, если программа передана контейнером).
+
+        Возвращает:
+            VM: Текущий экземпляр (для цепочек вызовов).
+
+        Исключения:
+            container.ContainerError: Если контейнер повреждён; программа при этом не загружается.
+            VMError: Если сегмент данных выходит за границы памяти.
+        """
+        self.header = None
+        if not isinstance(program, DecodedProgram) and not callable(program):
+            import container
+            if isinstance(program, memoryview) and program.format != 'B':
+                program = program.cast('B')
+            if not isinstance(program, container.Container) and container.is_container(program):
+                program = container.unpack(program)
+            if isinstance(program, container.Container):
+                # Заголовок проверен при разборе; код сверяется с ним до исполнения
+                self.header = program
+                program = container.decode(program) if decode or fuse else _RawProgram(program.code)
+            else:
+                program = decode_program(program) if decode or fuse else _RawProgram(program)
+        if fuse and isinstance(program, DecodedProgram) and not program.fused:
+            import fusion
+            program = fusion.fuse(program)
+        if data is None:
+            data = self.header.data if self.header is not None else []
+        # Сегменты данных копируются в память до исполнения первой команды
+        self.write_data(data)
+        self.program = program
+        self.data = list(data)
+        return self
+
+    def run(self, profile=None, stop=None, unchecked=False):
+        """
+        Исполняет загруженную программу над текущим состоянием машины, начиная с команды steps.
+
+        Параметры:
+            profile (profiler.Profile | None): Если передан, программа исполняется отдельным
+                инструментированным циклом (см. profiler.py), и результаты добавляются в профиль.
+                Требует предекодированной программы.
+            stop (int | None): Остановиться перед командой с этим индексом (количество исполненных
+                команд с начала программы); позже исполнение можно продолжить повторным вызовом run().
+                Требует предекодированной программы.
+            unchecked (bool): Исполнять циклом без проверок границ памяти. Допустимо, только если
+                verify() для текущего состояния вернул safe=True. Требует предекодированной программы.
+
+        Возвращает:
+            dict: Снимок состояния (см. snapshot).
+
+        Исключения:
+            VMError: При ошибке исполнения или если программа не загружена.
+        """
+        if self.program is None:
+            raise VMError("No program loaded.")
+        decoded = isinstance(self.program, DecodedProgram)
+        if not decoded and (profile is not None or stop is not None or self.steps or unchecked):
+            raise VMError("Profiling, stopping, resuming and unchecked execution require a decoded program.")
+        if stop is not None and self.program.fused:
+            raise VMError("Stopping at an instruction index is not supported for fused programs.")
+        if profile is not None:
+            import profiler
+            profiler.execute_profiled(self.program, self.registers, self.memory, profile, self.steps, stop)
+            self.steps = max(self.steps, len(self.program) if stop is None else min(stop, len(self.program)))
+        elif decoded:
+            self.steps = execute(self.program, self.registers, self.memory, self.steps, stop, unchecked)
+        elif isinstance(self.program, _RawProgram):
+            execute_buffer(self.program.code, self.registers, self.memory)
+        else:
+            self.program(self.registers, self.memory)
+        return self.snapshot()
+
+    def step(self, budget, unchecked=False):
+        """
+        Исполняет не более budget следующих команд и останавливается; повторные вызовы продолжают
+        исполнение с того же места (см. scheduler.py). Для программ со слитыми командами (см. fusion.py)
+        бюджет считается в суперкомандах.
+
+        Параметры:
+            budget (int): Наибольшее количество команд.
+            unchecked (bool): Исполнять циклом без проверок границ памяти (см. run).
+
+        Возвращает:
+            int: Количество исполненных команд (меньше budget, только если программа закончилась).
+
+        Исключения:
+            VMError: При ошибке исполнения или если предекодированная программа не загружена.
+        """
+        if not isinstance(self.program, DecodedProgram):
+            raise VMError("Step-wise execution requires a decoded program.")
+        start = self.steps
+        self.steps = execute(self.program, self.registers, self.memory, start, start + budget, unchecked)
+        return self.steps - start
+
+    def verify(self):
+        """
+        Статически проверяет границы памяти оставшейся части предекодированной программы
+        при текущем состоянии машины (см. verifier.py).
+
+        Возвращает:
+            verifier.Verification: Результат проверки; при safe=True программу можно исполнять
+                через run(unchecked=True).
+
+        Исключения:
+            VMError: Если предекодированная программа не загружена.
+        """
+        if not isinstance(self.program, DecodedProgram):
+            raise VMError("Verification requires a decoded program.")
+        import verifier
+        return verifier.verify(self.program, len(self.memory), self.registers, self.memory, self.steps)
+
+    @property
+    def pc(self):
+        """
+        Смещение (в байтах) следующей команды предекодированной программы.
+        """
+        if not self.steps or not isinstance(self.program, DecodedProgram):
+            return 0
+        return self.program.next_pc[self.steps - 1]
+
+    @property
+    def finished(self):
+        """
+        True, если загруженная предекодированная программа исполнена до конца.
+        """
+        return isinstance(self.program, DecodedProgram) and self.steps >= len(self.program)
+
+    def checkpoint(self):
+        """
+        Возвращает снимок состояния (позиция исполнения, регистры, память) для сохранения
+        (см. snapshot.py) или для запуска нескольких продолжений через fork().
+        """
+        return snapshots.Snapshot(self.steps, self.pc, list(self.registers), self.memory.copy(),
+                                  self.memory_model, self.page_size)
+
+    def restore(self, state):
+        """
+        Восстанавливает состояние из снимка; снимок не изменяется и может использоваться повторно.
+
+        Параметры:
+            state (snapshot.Snapshot): Снимок, полученный из checkpoint() или snapshot.load().
+
+        Возвращает:
+            VM: Текущий экземпляр (для цепочек вызовов).
+
+        Исключения:
+            VMError: Если снимок не соответствует загруженной программе.
+        """
+        if isinstance(self.program, DecodedProgram):
+            if state.steps > len(self.program) or (
+                    state.steps and self.program.next_pc[state.steps - 1] != state.pc):
+                raise VMError(f"Snapshot position (instruction {state.steps}, pc={state.pc}) "
+                              f"does not match the loaded program.")
+        self.registers = list(state.registers)
+        self.memory = state.memory.copy()
+        self.memory_model = state.memory_model
+        self.memory_size = len(state.memory)
+        self.num_registers = len(state.registers)
+        self.page_size = state.page_size
+        self.steps = state.steps
+        return self
+
+    def fork(self, state=None):
+        """
+        Создаёт новую машину с той же (общей) программой и копией состояния, не исполняя префикс заново.
+
+        Параметры:
+            state (snapshot.Snapshot | None): Снимок, из которого начинается новая машина
+                (по умолчанию — текущее состояние).
+
+        Возвращает:
+            VM: Новый экземпляр.
+        """
+        other = VM(self.memory_size, self.num_registers, self.memory_model, self.page_size)
+        other.program = self.program
+        other.header = self.header
+        other.data = self.data
+        return other.restore(state if state is not None else self.checkpoint())
+
+    def snapshot(self):
+        """
+        Возвращает копию текущего состояния машины.
+
+        Возвращает:
+            dict: Словарь с ключами 'registers' (список) и 'memory' (копия памяти:
+                список для плоской памяти, PagedMemory для страничной).
+        """
+        return {'registers': list(self.registers), 'memory': self.memory.copy()}
+
+    def read_memory(self, start, end):
+        """
+        Возвращает значения памяти в диапазоне [start, end).
+        """
+        return self.memory[start:end]
@@ -0,0 +1,238 @@
+"""
+Таблица смещений команд бинарного файла УВМ.
+
+Команды УВМ имеют переменную длину (WRITE_MEM — 2 байта, LOAD_CONST — 5, READ_MEM и POPCNT — 6,
+POPCNT_RANGE — 8), поэтому найти команду номер k или начать разбор с середины файла можно
+только просмотрев всё, что ей предшествует. Индексатор один раз строит компактную таблицу
+смещений (array('I'), для файлов от 4 ГБ — array('Q')) и может сохранить её рядом с бинарным
+файлом. Таблица используется дизассемблером (переход к команде за O(1)) и для параллельного
+декодирования больших файлов фрагментами в пуле процессов.
+
+Формат файла таблицы (<binary>.offsets, числа little-endian):
+    MAGIC, версия (u16), тип элементов (1 байт: b'I' или b'Q'), наличие ошибки (u8),
+    количество команд N (u64), размер и mtime_ns бинарного файла (u64, u64),
+    pc и opcode неизвестной команды (u64, u64; нули, если ошибки нет); смещения N + 1.
+"""
+import contextlib  # Необязательный пул процессов
+import multiprocessing  # Пул процессов для параллельного декодирования
+import os  # Размеры и время изменения файлов
+import struct  # Упаковка заголовка
+import sys  # Порядок байтов платформы
+from array import array  # Компактная таблица смещений
+
+from machine import DecodedProgram, decode_program, open_binary
+from isa import DECODE_TABLE, OPCODE_MASK
+
+MAGIC = b'UVMOFFS\0'
+VERSION = 1
+
+# Минимальное количество команд во фрагменте при параллельном декодировании
+MIN_CHUNK_INSTRUCTIONS = 1 << 16
+
+_HEADER = struct.Struct('<8sHcBQQQQQ')
+
+# Размер команды по opcode (0 — неизвестный opcode)
+_SIZES = bytes(0 if layout is None else layout[0] for layout in DECODE_TABLE)
+
+
+class OffsetIndex:
+    """
+    Таблица смещений команд.
+
+    Атрибуты:
+        offsets (array): Смещение каждой команды; последний (N + 1-й) элемент — смещение конца
+            последней разобранной команды.
+        error (tuple | None): Пара (pc, opcode) неизвестной команды, на которой остановился разбор.
+        binary_size (int): Размер бинарного файла, для которого построена таблица.
+        binary_mtime_ns (int): Время изменения бинарного файла (0, если таблица построена не по файлу).
+    """
+
+    __slots__ = ('offsets', 'error', 'binary_size', 'binary_mtime_ns')
+
+    def __init__(self, offsets, error=None, binary_size=0, binary_mtime_ns=0):
+        self.offsets = offsets
+        self.error = error
+        self.binary_size = binary_size
+        self.binary_mtime_ns = binary_mtime_ns
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def offset(self, k):
+        """
+        Возвращает смещение команды номер k (начиная с 0).
+
+        Исключения:
+            IndexError: Если команды с таким номером нет.
+        """
+        if not 0 <= k < len(self):
+            raise IndexError(f"Instruction {k} out of range (0-{len(self) - 1}).")
+        return self.offsets[k]
+
+    def dumps(self):
+        offsets = self.offsets
+        if sys.byteorder != 'little':
+            offsets = array(offsets.typecode, offsets)
+            offsets.byteswap()
+        pc, opcode = self.error if self.error is not None else (0, 0)
+        header = _HEADER.pack(MAGIC, VERSION, offsets.typecode.encode('ascii'), self.error is not None,
+                              len(self), self.binary_size, self.binary_mtime_ns, pc, opcode)
+        return header + offsets.tobytes()
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Восстанавливает таблицу из байтов одним вызовом array.frombytes.
+
+        Исключения:
+            ValueError: Если данные повреждены или записаны несовместимой версией.
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Offset index is truncated.")
+        magic, version, typecode, has_error, count, size, mtime_ns, pc, opcode = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or typecode not in (b'I', b'Q'):
+            raise ValueError("Not a UVM offset index of a supported version.")
+        offsets = array(typecode.decode('ascii'))
+        end = _HEADER.size + offsets.itemsize * (count + 1)
+        if len(data) < end:
+            raise ValueError("Offset index is truncated.")
+        offsets.frombytes(data[_HEADER.size:end])
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        return cls(offsets, (pc, opcode) if has_error else None, size, mtime_ns)
+
+
+def build_index(code):
+    """
+    Строит таблицу смещений команд бинарного кода.
+
+    Параметры:
+        code (bytes | bytearray | memoryview | mmap.mmap): Бинарный код.
+
+    Возвращает:
+        OffsetIndex: Таблица смещений.
+    """
+    code_length = len(code)
+    offsets = array('I' if code_length < (1 << 32) else 'Q')
+    append = offsets.append
+    sizes = _SIZES
+    error = None
+    pc = 0
+    while pc < code_length:
+        opcode = code[pc] & OPCODE_MASK
+        size = sizes[opcode]
+        if not size:
+            error = (pc, opcode)
+            break
+        append(pc)
+        pc += size
+    # Последняя команда может быть обрезана концом файла; разбор, как и decode_program, её принимает
+    offsets.append(min(pc, code_length))
+    return OffsetIndex(offsets, error, code_length)
+
+
+def index_path(binary_path):
+    """
+    Возвращает путь к файлу таблицы смещений для бинарного файла.
+    """
+    return binary_path + '.offsets'
+
+
+def save_index(binary_path, index, path=None):
+    """
+    Сохраняет таблицу рядом с бинарным файлом, запоминая его размер и время изменения.
+    """
+    stat = os.stat(binary_path)
+    index.binary_size = stat.st_size
+    index.binary_mtime_ns = stat.st_mtime_ns
+    with open(path or index_path(binary_path), 'wb') as f:
+        f.write(index.dumps())
+
+
+def load_index(binary_path, path=None, build=True, save=False):
+    """
+    Загружает сохранённую таблицу смещений бинарного файла.
+
+    Параметры:
+        binary_path (str): Путь к бинарному файлу.
+        path (str | None): Путь к таблице (по умолчанию index_path(binary_path)).
+        build (bool): Построить таблицу, если сохранённой нет или она устарела.
+        save (bool): Сохранить построенную таблицу.
+
+    Возвращает:
+        OffsetIndex | None: Таблица или None, если её нет, а build=False.
+    """
+    path = path or index_path(binary_path)
+    stat = os.stat(binary_path)
+    try:
+        with open(path, 'rb') as f:
+            index = OffsetIndex.loads(f.read())
+        if index.binary_size == stat.st_size and index.binary_mtime_ns == stat.st_mtime_ns:
+            return index
+    except (OSError, ValueError):
+        pass
+    if not build:
+        return None
+    with open_binary(binary_path, use_mmap=True) as code:
+        index = build_index(code)
+    if save:
+        save_index(binary_path, index, path)
+    return index
+
+
+def _decode_chunk(task):
+    """
+    Декодирует фрагмент [start, end) бинарного файла в процессе пула.
+
+    Возвращает:
+        tuple: Массивы ops, b, c и next_pc (смещения — от начала файла).
+    """
+    path, start, end = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        program = decode_program(f.read(end - start))
+    next_pc = program.next_pc
+    if start:
+        next_pc = array('Q', (pc + start for pc in next_pc))
+    return program.ops, program.b, program.c, next_pc
+
+
+def decode_parallel(binary_path, jobs=None, index=None, chunk_instructions=None):
+    """
+    Декодирует большой бинарный файл фрагментами в пуле процессов.
+
+    Таблица смещений позволяет разрезать файл точно по границам команд; каждый процесс читает
+    и декодирует свой фрагмент, а массивы-столбцы фрагментов склеиваются по порядку.
+
+    Параметры:
+        binary_path (str): Путь к бинарному файлу.
+        jobs (int | None): Количество процессов (None — по числу процессоров).
+        index (OffsetIndex | None): Таблица смещений (по умолчанию загружается или строится).
+        chunk_instructions (int | None): Количество команд во фрагменте.
+
+    Возвращает:
+        DecodedProgram: Программа, совпадающая с decode_program для всего файла.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if index is None:
+        index = load_index(binary_path)
+    count = len(index)
+    if chunk_instructions is None:
+        chunk_instructions = max(MIN_CHUNK_INSTRUCTIONS, -(-count // (jobs * 4)))
+    offsets = index.offsets
+    tasks = [(binary_path, offsets[k], offsets[min(k + chunk_instructions, count)])
+             for k in range(0, count, chunk_instructions)]
+
+    ops, bs, cs, next_pcs = array('B'), array('Q'), array('Q'), array('Q')
+    with contextlib.ExitStack() as stack:
+        if jobs > 1 and len(tasks) > 1:
+            pool = stack.enter_context(multiprocessing.Pool(min(jobs, len(tasks))))
+            results = pool.imap(_decode_chunk, tasks)
+        else:
+            results = map(_decode_chunk, tasks)
+        for chunk_ops, chunk_b, chunk_c, chunk_next_pc in results:
+            ops.extend(chunk_ops)
+            bs.extend(chunk_b)
+            cs.extend(chunk_c)
+            next_pcs.extend(chunk_next_pc)
+    return DecodedProgram(ops, bs, cs, next_pcs, index.error)
@@ -0,0 +1,261 @@
+"""
+Оптимизирующий проход ассемблера УВМ.
+
+Программы УВМ линейны, а единственный источник данных — LOAD_CONST, поэтому многое
+можно вычислить на этапе сборки. Оптимизатор работает со списком команд
+(opcode, B, C) и выполняет:
+    - распространение констант через регистры и память;
+    - замену READ_MEM с известным значением на LOAD_CONST (или удаление, если регистр уже содержит это значение);
+    - удаление избыточных LOAD_CONST и записей, не меняющих содержимое памяти;
+    - удаление мёртвых LOAD_CONST (регистр перезаписывается до чтения) и перезаписываемых WRITE_MEM.
+
+Уровни оптимизации:
+    1 — не делает предположений о начальном содержимом памяти (безопасно для любых образов памяти);
+    2 — дополнительно считает, что память в начале заполнена нулями (как в interpreter.main).
+
+Итоговые регистры и память оптимизированной программы совпадают с исходной.
+Оптимизируется только начало программы до первого обращения к памяти, которое не удалось
+доказуемо уложить в пределы memory_size; эта команда и всё, что за ней следует, остаются
+без изменений, чтобы сохранить поведение при ошибках.
+"""
+from collections import namedtuple
+
+from isa import BY_MNEMONIC, ENCODERS
+from popcnt_vector import popcnt
+
+OP_LOAD_CONST = BY_MNEMONIC['LOAD_CONST'].opcode
+OP_READ_MEM = BY_MNEMONIC['READ_MEM'].opcode
+OP_WRITE_MEM = BY_MNEMONIC['WRITE_MEM'].opcode
+OP_POPCNT = BY_MNEMONIC['POPCNT'].opcode
+OP_POPCNT_RANGE = BY_MNEMONIC['POPCNT_RANGE'].opcode
+
+_SIZES = {spec.opcode: spec.size for spec in BY_MNEMONIC.values()}
+_MNEMONICS = {spec.opcode: spec.mnemonic for spec in BY_MNEMONIC.values()}
+_CONST_MAX = (1 << BY_MNEMONIC['LOAD_CONST'].c.width) - 1
+
+# Отчёт об оптимизации: размеры программы до и после, а также команда, на которой оптимизация остановилась
+OptimizationReport = namedtuple(
+    'OptimizationReport',
+    ['instructions_before', 'instructions_after', 'bytes_before', 'bytes_after', 'stopped_at'],
+)
+
+
+def program_size(instructions):
+    """
+    Возвращает размер программы в байтах.
+    """
+    return sum(_SIZES[opcode] for opcode, _, _ in instructions)
+
+
+class _MemoryState:
+    """
+    Известные значения ячеек памяти при прямом проходе.
+
+    None означает неизвестное значение. На уровне 2 незаписанные ячейки считаются нулевыми.
+    """
+
+    def __init__(self, zero_initialized):
+        self.values = {}
+        self.default = 0 if zero_initialized else None
+
+    def get(self, addr):
+        return self.values.get(addr, self.default)
+
+    def set(self, addr, value):
+        self.values[addr] = value
+
+    def popcount_range(self, start, end):
+        # Незаписанные ячейки остаются как есть: popcnt нуля равен нулю, а неизвестное остаётся неизвестным
+        if end - start < len(self.values):
+            addrs = [addr for addr in range(start, end) if addr in self.values]
+        else:
+            addrs = [addr for addr in self.values if start <= addr < end]
+        for addr in addrs:
+            value = self.values[addr]
+            if value is not None:
+                self.values[addr] = popcnt(value)
+
+
+def _forward(instructions, level, memory_size):
+    """
+    Прямой проход: распространение констант и удаление избыточных команд.
+
+    Возвращает:
+        tuple: (новый список команд, список известных адресов WRITE_MEM для каждой команды или None,
+                пара (индекс, описание) для первого обращения, которое не удалось проверить
+                на выход за границы, или None).
+    """
+    registers = [0] * 8  # Регистры УВМ всегда начинаются с нуля
+    memory = _MemoryState(zero_initialized=level >= 2)
+    result = []
+    addresses = []
+    unsafe = None
+
+    for index, (opcode, B, C) in enumerate(instructions):
+        if opcode == OP_LOAD_CONST:
+            if registers[B] == C:
+                continue
+            registers[B] = C
+            result.append((opcode, B, C))
+            addresses.append(None)
+
+        elif opcode == OP_READ_MEM:
+            if B >= memory_size and unsafe is None:
+                unsafe = (index, f"READ_MEM address {B} out of bounds")
+            value = memory.get(B)
+            if value is not None and registers[C] == value:
+                continue
+            if value is not None and value <= _CONST_MAX:
+                result.append((OP_LOAD_CONST, C, value))
+            else:
+                result.append((opcode, B, C))
+            registers[C] = value
+            addresses.append(None)
+
+        elif opcode == OP_WRITE_MEM:
+            addr = registers[C]
+            value = registers[B]
+            if addr is None or addr >= memory_size:
+                if unsafe is None:
+                    unsafe = (index, f"WRITE_MEM address {'unknown' if addr is None else addr}")
+                result.append((opcode, B, C))
+                addresses.append(None)
+                continue
+            if value is not None and memory.get(addr) == value:
+                continue
+            memory.set(addr, value)
+            result.append((opcode, B, C))
+            addresses.append(addr)
+
+        elif opcode == OP_POPCNT:
+            if C >= memory_size and unsafe is None:
+                unsafe = (index, f"POPCNT address {C} out of bounds")
+            value = memory.get(C)
+            if value is not None:
+                count = popcnt(value)
+                if count == value:
+                    # Содержимое памяти не меняется, остаётся только загрузка результата в регистр
+                    if registers[B] != count:
+                        registers[B] = count
+                        result.append((OP_LOAD_CONST, B, count))
+                        addresses.append(None)
+                    continue
+                memory.set(C, count)
+                registers[B] = count
+            else:
+                memory.set(C, None)
+                registers[B] = None
+            result.append((opcode, B, C))
+            addresses.append(None)
+
+        elif opcode == OP_POPCNT_RANGE:
+            if B + C > memory_size and unsafe is None:
+                unsafe = (index, f"POPCNT_RANGE range {B}:{B + C} out of bounds")
+            memory.popcount_range(B, B + C)
+            result.append((opcode, B, C))
+            addresses.append(None)
+
+    return result, addresses, unsafe
+
+
+def _backward(instructions, addresses):
+    """
+    Обратный проход: удаление мёртвых LOAD_CONST/READ_MEM и перезаписываемых WRITE_MEM.
+
+    Все регистры и ячейки памяти считаются наблюдаемыми в конце программы.
+    """
+    live_registers = set(range(8))
+    overwritten = set()  # Адреса, которые гарантированно перезаписываются позже без промежуточного чтения
+    kept = []
+
+    for (opcode, B, C), addr in zip(reversed(instructions), reversed(addresses)):
+        if opcode == OP_LOAD_CONST:
+            if B not in live_registers:
+                continue
+            live_registers.discard(B)
+        elif opcode == OP_READ_MEM:
+            if C not in live_registers:
+                continue
+            live_registers.discard(C)
+            overwritten.discard(B)
+        elif opcode == OP_WRITE_MEM:
+            if addr is not None:
+                if addr in overwritten:
+                    continue
+                overwritten.add(addr)
+            live_registers.add(B)
+            live_registers.add(C)
+        elif opcode == OP_POPCNT:
+            live_registers.discard(B)
+            overwritten.discard(C)
+        elif opcode == OP_POPCNT_RANGE:
+            overwritten = {a for a in overwritten if not B <= a < B + C}
+        kept.append((opcode, B, C))
+
+    kept.reverse()
+    return kept
+
+
+def optimize(instructions, level=1, memory_size=1024):
+    """
+    Оптимизирует список команд УВМ.
+
+    Параметры:
+        instructions (list[tuple]): Команды в виде кортежей (opcode, B, C).
+        level (int): Уровень оптимизации (0 — без изменений, 1 или 2, см. описание модуля).
+        memory_size (int): Размер памяти, для которого проверяются границы обращений.
+
+    Возвращает:
+        tuple: (оптимизированный список команд, OptimizationReport).
+    """
+    instructions = list(instructions)
+    before = (len(instructions), program_size(instructions))
+    stopped_at = None
+
+    if level > 0:
+        # Оптимизировать можно только префикс до первого непроверяемого обращения к памяти
+        _, _, unsafe = _forward(instructions, level, memory_size)
+        suffix = []
+        current = instructions
+        if unsafe is not None:
+            index, description = unsafe
+            stopped_at = f"instruction {index}: {description}"
+            current, suffix = instructions[:index], instructions[index:]
+
+        while True:
+            forwarded, addresses, _ = _forward(current, level, memory_size)
+            optimized = _backward(forwarded, addresses)
+            if optimized == current:
+                break
+            current = optimized
+        instructions = current + suffix
+
+    report = OptimizationReport(before[0], len(instructions), before[1], program_size(instructions), stopped_at)
+    return instructions, report
+
+
+def encode(instructions):
+    """
+    Кодирует список команд (opcode, B, C) в бинарный код и список записей лога.
+    """
+    chunks = []
+    log_entries = []
+    for opcode, B, C in instructions:
+        chunks.append(ENCODERS[_MNEMONICS[opcode]][1](B, C))
+        log_entries.append({'A': opcode, 'B': B, 'C': C})
+    return b''.join(chunks), log_entries
+
+
+def format_report(report):
+    """
+    Возвращает текстовое описание отчёта об оптимизации.
+    """
+    text = (
+        f"Optimized: {report.instructions_before} -> {report.instructions_after} instructions "
+        f"(saved {report.instructions_before - report.instructions_after}), "
+        f"{report.bytes_before} -> {report.bytes_after} bytes "
+        f"(saved {report.bytes_before - report.bytes_after})."
+    )
+    if report.stopped_at is not None:
+        text += f" Stopped at possible out-of-bounds access ({report.stopped_at})."
+    return text
@@ -0,0 +1,198 @@
+"""
+Разреженная страничная память УВМ, покрывающая всё 32-битное адресное пространство.
+
+Память разбита на страницы фиксированного размера, каждая хранится в array('Q') и выделяется
+при первой записи ненулевого значения. Чтение из невыделенной страницы возвращает 0. Последняя использованная
+страница кэшируется, поэтому последовательные обращения к одной странице не требуют поиска в словаре.
+"""
+from array import array
+
+# Размер адресного пространства (адреса READ_MEM и POPCNT — 32-битные)
+ADDRESS_SPACE = 1 << 32
+
+# Размер страницы по умолчанию (в ячейках)
+DEFAULT_PAGE_SIZE = 4096
+
+
+class PagedMemory:
+    """
+    Страничная память с интерфейсом списка: memory[addr], memory[addr] = value, len(memory).
+
+    Атрибуты:
+        page_size (int): Размер страницы в ячейках (степень двойки).
+        pages (dict[int, array]): Выделенные страницы по номеру страницы.
+    """
+
+    __slots__ = ('page_size', 'size', 'pages', '_shift', '_mask', '_hot_index', '_hot_page')
+
+    def __init__(self, page_size=DEFAULT_PAGE_SIZE, size=ADDRESS_SPACE):
+        """
+        Параметры:
+            page_size (int): Размер страницы в ячейках, степень двойки.
+            size (int): Размер адресного пространства.
+        """
+        if page_size <= 0 or page_size & (page_size - 1):
+            raise ValueError(f"Page size must be a power of two, got {page_size}.")
+        self.page_size = page_size
+        self.size = size
+        self.pages = {}
+        self._shift = page_size.bit_length() - 1
+        self._mask = page_size - 1
+        self._hot_index = -1
+        self._hot_page = None
+
+    def __len__(self):
+        return self.size
+
+    def _page(self, index, allocate):
+        """
+        Возвращает страницу с номером index, при необходимости выделяя её.
+        """
+        page = self.pages.get(index)
+        if page is None:
+            if not allocate:
+                return None
+            page = array('Q', bytes(8 * self.page_size))
+            self.pages[index] = page
+        self._hot_index = index
+        self._hot_page = page
+        return page
+
+    def __getitem__(self, addr):
+        if isinstance(addr, slice):
+            start, stop, step = addr.indices(self.size)
+            if step == 1:
+                return self.read(start, stop).tolist()
+            return [self[i] for i in range(start, stop, step)]
+        index = addr >> self._shift
+        if index == self._hot_index:
+            return self._hot_page[addr & self._mask]
+        page = self._page(index, allocate=False)
+        return 0 if page is None else page[addr & self._mask]
+
+    def __setitem__(self, addr, value):
+        index = addr >> self._shift
+        if index == self._hot_index:
+            self._hot_page[addr & self._mask] = value
+        elif value or index in self.pages:
+            self._page(index, allocate=True)[addr & self._mask] = value
+        # Запись нуля в невыделенную страницу ничего не меняет — страница не выделяется
+
+    def read(self, start, end):
+        """
+        Возвращает значения ячеек [start, end) в виде array('Q'), копируя выделенные страницы целиком.
+        """
+        result = array('Q', bytes(8 * max(0, end - start)))
+        for index, lo, hi in self._overlaps(start, end):
+            page_start = index << self._shift
+            result[lo - start:hi - start] = self.pages[index][lo - page_start:hi - page_start]
+        return result
+
+    def write(self, start, values):
+        """
+        Записывает значения в ячейки [start, start + len(values)) срезами по страницам.
+        """
+        end = start + len(values)
+        addr = start
+        while addr < end:
+            index = addr >> self._shift
+            page_start = index << self._shift
+            hi = min(end, page_start + self.page_size)
+            chunk = values[addr - start:hi - start]
+            if index in self.pages or any(chunk):
+                self._page(index, allocate=True)[addr - page_start:hi - page_start] = array('Q', chunk)
+            addr = hi
+
+    def _overlaps(self, start, end):
+        """
+        Перечисляет выделенные страницы, пересекающиеся с [start, end): (номер страницы, начало, конец пересечения).
+        """
+        for index in self._populated_in(start, end):
+            page_start = index << self._shift
+            yield index, max(start, page_start), min(end, page_start + self.page_size)
+
+    def iter_nonzero(self, start, end):
+        """
+        Перечисляет пары (адрес, значение) ненулевых ячеек в [start, end), просматривая только выделенные страницы.
+        """
+        for index, lo, hi in self._overlaps(start, end):
+            page = self.pages[index]
+            page_start = index << self._shift
+            for addr in range(lo, hi):
+                value = page[addr - page_start]
+                if value:
+                    yield addr, value
+
+    def popcount_range(self, start, end):
+        """
+        Заменяет ячейки [start, end) на popcnt их значений.
+
+        Обрабатываются только выделенные страницы: popcnt нуля равен нулю.
+        """
+        for index, lo, hi in self._overlaps(start, end):
+            page = self.pages[index]
+            lo -= index << self._shift
+            hi -= index << self._shift
+            page[lo:hi] = array('Q', [x.bit_count() for x in page[lo:hi]])
+
+    def _populated_in(self, start, end):
+        """
+        Возвращает номера выделенных страниц, пересекающихся с [start, end), в порядке возрастания.
+
+        Перебираются номера страниц самого диапазона, поэтому короткий диапазон не сортирует все выделенные
+        страницы; отсортированный обход выделенных страниц — только если в диапазоне больше страниц, чем выделено.
+        """
+        if start >= end:
+            return []
+        first, last = start >> self._shift, (end - 1) >> self._shift
+        pages = self.pages
+        if last - first >= len(pages):
+            return [index for index in self.populated_pages() if first <= index <= last]
+        return [index for index in range(first, last + 1) if index in pages]
+
+    def copy(self):
+        """
+        Возвращает независимую копию памяти.
+        """
+        other = PagedMemory(self.page_size, self.size)
+        other.pages = {index: array('Q', page) for index, page in self.pages.items()}
+        return other
+
+    def populated_pages(self):
+        """
+        Возвращает номера выделенных страниц в порядке возрастания.
+        """
+        return sorted(self.pages)
+
+    def dump(self, start, end):
+        """
+        Возвращает содержимое выделенных страниц, пересекающихся с диапазоном [start, end).
+
+        Возвращает:
+            dict[str, list[int]]: Адрес начала фрагмента -> значения ячеек фрагмента,
+                обрезанного по границам диапазона.
+        """
+        result = {}
+        for index, lo, hi in self._overlaps(start, end):
+            page_start = index << self._shift
+            result[str(lo)] = self.pages[index][lo - page_start:hi - page_start].tolist()
+        return result
+
+
+def make_memory(model='flat', size=1024, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Создаёт память УВМ выбранной модели.
+
+    Параметры:
+        model (str): 'flat' — список из size ячеек, 'paged' — PagedMemory на всё 32-битное пространство.
+        size (int): Размер плоской памяти.
+        page_size (int): Размер страницы страничной памяти.
+
+    Возвращает:
+        list[int] | PagedMemory: Память, заполненная нулями.
+    """
+    if model == 'flat':
+        return [0] * size
+    if model == 'paged':
+        return PagedMemory(page_size)
+    raise ValueError(f"Unknown memory model: {model}")
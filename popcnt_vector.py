@@ -1,35 +1,219 @@
-def popcnt(x):
-    """
-    Функция для подсчёта количества установленных (1) битов в числе.
-
-    Параметры:
-        x (int): Входное число.
-
-    Возвращает:
-        int: Количество установленных битов.
-    """
-    return bin(x).count('1')
-
-
-def apply_popcnt_to_vector(vector):
-    """
-    Применяет операцию popcnt поэлементно к вектору длины 8 и возвращает обновлённый вектор.
-
-    Параметры:
-        vector (list[int]): Список целых чисел длиной 8.
-
-    Возвращает:
-        list[int]: Обновлённый список, где каждый элемент заменён результатом операции popcnt.
-    """
-    if len(vector) != 8:
-        raise ValueError("Vector length must be 8.")
-
-    return [popcnt(x) for x in vector]
-
-
-if __name__ == "__main__":
-    # Пример использования
-    input_vector = [3, 7, 15, 31, 63, 127, 255, 511]
-    output_vector = apply_popcnt_to_vector(input_vector)
-    print("Input Vector:", input_vector)
-    print("Output Vector:", output_vector)
\ No newline at end of file
+"""
+Подсчёт установленных битов (popcount) для скаляров и векторов произвольной длины.
+
+Скаляры обрабатываются через int.bit_count. Векторы (list, array.array, массивы NumPy,
+буферы байтов) — через табличное ядро NumPy (таблица popcount для каждого байта),
+а без NumPy — поэлементно через int.bit_count. Модуль используется интерпретатором
+для команды POPCNT и для постобработки дампов памяти.
+
+NumPy импортируется при первой векторной операции: интерпретатору нужен только скалярный popcnt,
+и его запуск не должен тратить время на импорт NumPy.
+
+Векторные функции принимают только неотрицательные значения: popcount отрицательного числа зависел бы
+от представления (int.bit_count считает биты модуля, массив со знаком — биты дополнительного кода),
+поэтому отрицательные значения отвергаются на всех путях.
+"""
+import argparse  # Модуль для парсинга аргументов командной строки
+import functools  # Однократный импорт NumPy
+import sys  # Проверка, импортирован ли NumPy
+import time  # Замеры времени для бенчмарка
+from array import array  # Типизированные массивы
+
+
+def popcnt(x):
+    """
+    Функция для подсчёта количества установленных (1) битов в числе.
+
+    Параметры:
+        x (int): Входное число.
+
+    Возвращает:
+        int: Количество установленных битов.
+    """
+    return x.bit_count()
+
+
+def popcnt_str(x):
+    """
+    Прежняя реализация popcnt через строковое представление; оставлена для сравнения в бенчмарке.
+    """
+    return bin(x).count('1')
+
+
+# Таблица popcount для всех значений байта
+_BYTE_TABLE = bytes(popcnt(i) for i in range(256))
+
+# Коды типов array.array со знаком
+_SIGNED_TYPECODES = 'bhilq'
+
+_NEGATIVE_ERROR = "popcount of negative values is not defined; expected non-negative integers."
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """
+    Импортирует NumPy при первом обращении.
+
+    Возвращает:
+        tuple: (модуль numpy, таблица popcount байтов в виде массива uint8) или (None, None),
+            если NumPy не установлен (необязательная зависимость, без неё используется скалярный путь).
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return None, None
+    return np, np.frombuffer(_BYTE_TABLE, dtype=np.uint8)
+
+
+def _is_ndarray(values):
+    """
+    Возвращает True для массива NumPy, не импортируя NumPy: массив мог появиться, только если NumPy уже импортирован.
+    """
+    np = sys.modules.get('numpy')
+    return np is not None and isinstance(values, np.ndarray)
+
+
+def _check_non_negative(values):
+    """
+    Выбрасывает ValueError, если среди значений есть отрицательные.
+    """
+    if min(values, default=0) < 0:
+        raise ValueError(_NEGATIVE_ERROR)
+
+
+def popcount_numpy(values):
+    """
+    Поэлементный popcount массива NumPy целых неотрицательных чисел.
+
+    Каждый элемент рассматривается как последовательность байтов; popcount байтов берётся
+    из таблицы и суммируется по элементу.
+
+    Параметры:
+        values (numpy.ndarray): Массив целых чисел любой формы.
+
+    Возвращает:
+        numpy.ndarray: Массив uint8 той же формы.
+
+    Исключения:
+        TypeError: Если массив не целочисленный.
+        ValueError: Если массив со знаком содержит отрицательные значения.
+    """
+    np, byte_table = _numpy()
+    values = np.ascontiguousarray(values)
+    if values.dtype.kind not in 'ui':
+        raise TypeError(f"Integer array expected, got {values.dtype}.")
+    if values.dtype.kind == 'i' and values.size and values.min() < 0:
+        raise ValueError(_NEGATIVE_ERROR)
+    itemsize = values.dtype.itemsize
+    counts = byte_table[values.view(np.uint8)]
+    if itemsize == 1:
+        return counts.reshape(values.shape)
+    return counts.reshape(values.shape + (itemsize,)).sum(axis=-1, dtype=np.uint8)
+
+
+def popcount_vector(values, itemsize=8):
+    """
+    Поэлементный popcount вектора произвольной длины.
+
+    Параметры:
+        values: list/tuple целых чисел, array.array, numpy.ndarray или буфер байтов
+            (bytes, bytearray, memoryview) с little-endian словами размера itemsize.
+        itemsize (int): Размер слова (в байтах) для буферов байтов.
+
+    Возвращает:
+        numpy.ndarray для массивов NumPy и буферов (если NumPy установлен),
+        array.array того же типа для array.array, иначе list[int].
+
+    Исключения:
+        ValueError: Если среди значений есть отрицательные или длина буфера не кратна itemsize.
+    """
+    if _is_ndarray(values):
+        return popcount_numpy(values)
+    np = _numpy()[0]
+
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        if len(values) % itemsize:
+            raise ValueError(f"Buffer length {len(values)} is not a multiple of the word size {itemsize}.")
+        if np is not None:
+            dtype = np.dtype(f'<u{itemsize}')
+            return popcount_numpy(np.frombuffer(values, dtype=dtype))
+        # Без NumPy суммируем табличные значения байтов каждого слова
+        counts = bytes(values).translate(_BYTE_TABLE)
+        return [sum(counts[i:i + itemsize]) for i in range(0, len(counts), itemsize)]
+
+    if isinstance(values, array):
+        if values.typecode in _SIGNED_TYPECODES:
+            _check_non_negative(values)
+        if np is not None and values.typecode not in 'fd':
+            return array(values.typecode, popcount_numpy(np.frombuffer(values, dtype=values.typecode)).tolist())
+        return array(values.typecode, [popcnt(x) for x in values])
+
+    values = list(values)
+    _check_non_negative(values)
+    return [popcnt(x) for x in values]
+
+
+def apply_popcnt_to_vector(vector):
+    """
+    Применяет операцию popcnt поэлементно к вектору произвольной длины и возвращает обновлённый вектор.
+
+    Параметры:
+        vector (list[int]): Список целых чисел.
+
+    Возвращает:
+        list[int]: Обновлённый список, где каждый элемент заменён результатом операции popcnt.
+    """
+    return [popcnt(x) for x in vector]
+
+
+def benchmark(size=1_000_000, repeat=3):
+    """
+    Сравнивает скорость реализаций popcount на случайных 64-битных словах.
+
+    Параметры:
+        size (int): Количество слов.
+        repeat (int): Количество повторов (берётся лучшее время).
+
+    Возвращает:
+        dict[str, float]: Название реализации -> лучшее время в секундах.
+    """
+    import random
+    rng = random.Random(0)
+    words = [rng.getrandbits(64) for _ in range(size)]
+    candidates = {
+        'bin(x).count': lambda: [popcnt_str(x) for x in words],
+        'int.bit_count': lambda: [popcnt(x) for x in words],
+    }
+    np = _numpy()[0]
+    if np is not None:
+        np_words = np.array(words, dtype=np.uint64)
+        candidates['numpy byte table'] = lambda: popcount_numpy(np_words)
+
+    results = {}
+    for name, fn in candidates.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Vectorized popcount.')
+    parser.add_argument('--benchmark', action='store_true', help='Compare popcount implementations.')
+    parser.add_argument('--size', type=int, default=1_000_000, help='Number of words for the benchmark.')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        results = benchmark(args.size)
+        baseline = results['bin(x).count']
+        for name, seconds in results.items():
+            print(f"{name:>18}: {seconds:.4f} s ({baseline / seconds:.1f}x)")
+    else:
+        # Пример использования
+        input_vector = [3, 7, 15, 31, 63, 127, 255, 511]
+        output_vector = apply_popcnt_to_vector(input_vector)
+        print("Input Vector:", input_vector)
+        print("Output Vector:", output_vector)
@@ -0,0 +1,161 @@
+"""
+Профилировщик исполнения программ УВМ по кодам операций.
+
+Инструментированный цикл исполнения — отдельная функция execute_profiled, поэтому обычный цикл
+machine.execute не несёт никаких накладных расходов, когда профилирование выключено.
+Для каждого opcode собираются количество исполнений, суммарное и среднее время и гистограмма
+адресов памяти, к которым обращались команды; для всей программы — общее время и число команд в секунду.
+"""
+import json  # Машиночитаемый вывод профиля
+import time  # Счётчик времени высокого разрешения
+from collections import Counter
+from itertools import islice
+
+from fusion import mnemonic
+from machine import (
+    DISPATCH, OP_FUSED_LOAD_WRITE, OP_FUSED_POPCNT_WRITE, OP_POPCNT, OP_POPCNT_RANGE, OP_READ_MEM,
+    OP_WRITE_MEM, VMError,
+)
+
+# Функции извлечения адреса памяти, к которому обращалась команда. Вызываются после исполнения:
+# ни одна команда не изменяет регистр, в котором хранится адрес её записи
+_ADDRESS_OF = {
+    OP_READ_MEM: lambda registers, B, C: B,
+    OP_WRITE_MEM: lambda registers, B, C: registers[C],
+    OP_POPCNT: lambda registers, B, C: C,
+    OP_POPCNT_RANGE: lambda registers, B, C: B,
+    OP_FUSED_LOAD_WRITE: lambda registers, B, C: registers[B >> 6],
+    OP_FUSED_POPCNT_WRITE: lambda registers, B, C: registers[B >> 6],
+}
+
+
+class Profile:
+    """
+    Результаты профилирования.
+
+    Атрибуты:
+        counts (Counter): opcode -> количество исполнений.
+        times_ns (Counter): opcode -> суммарное время исполнения в наносекундах.
+        addresses (dict[int, Counter]): opcode -> гистограмма адресов памяти.
+        total_ns (int): Общее время цикла исполнения в наносекундах.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.times_ns = Counter()
+        self.addresses = {}
+        self.total_ns = 0
+
+    @property
+    def instructions(self):
+        return sum(self.counts.values())
+
+    @property
+    def instructions_per_second(self):
+        return self.instructions / (self.total_ns / 1e9) if self.total_ns else 0.0
+
+    def to_dict(self, top=None):
+        """
+        Возвращает результаты в машиночитаемом виде.
+
+        Параметры:
+            top (int | None): Сколько самых частых адресов выводить для каждого opcode (None — все).
+        """
+        opcodes = {}
+        for opcode, count in sorted(self.counts.items()):
+            name = mnemonic(opcode)
+            histogram = self.addresses.get(opcode, Counter())
+            opcodes[name] = {
+                'opcode': opcode,
+                'count': count,
+                'total_ns': self.times_ns[opcode],
+                'average_ns': self.times_ns[opcode] / count,
+                'addresses': [[addr, hits] for addr, hits in histogram.most_common(top)],
+            }
+        return {
+            'instructions': self.instructions,
+            'total_ns': self.total_ns,
+            'instructions_per_second': self.instructions_per_second,
+            'opcodes': opcodes,
+        }
+
+    def format_table(self, top=5):
+        """
+        Возвращает текстовую сводную таблицу.
+        """
+        lines = [f"{'opcode':<22}{'count':>12}{'total ms':>12}{'avg ns':>10}  hot addresses (address x hits)"]
+        for name, row in self.to_dict(top)['opcodes'].items():
+            hot = ', '.join(f"{addr}x{hits}" for addr, hits in row['addresses'])
+            lines.append(f"{name:<22}{row['count']:>12}{row['total_ns'] / 1e6:>12.3f}"
+                         f"{row['average_ns']:>10.0f}  {hot}")
+        lines.append(f"total: {self.instructions} instructions in {self.total_ns / 1e6:.3f} ms "
+                     f"({self.instructions_per_second:,.0f} instructions/s)")
+        return '\n'.join(lines)
+
+
+def write_report(profile, json_path=None, top=5):
+    """
+    Печатает сводную таблицу и, если указан путь, сохраняет полный профиль в JSON.
+    """
+    print(profile.format_table(top))
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(profile.to_dict(), f, indent=2)
+
+
+def execute_profiled(program, registers, memory, profile=None, start=0, stop=None):
+    """
+    Исполняет предекодированную программу с замером времени каждой команды.
+
+    Параметры:
+        program (DecodedProgram): Программа, полученная из decode_program.
+        registers (list[int]): Регистры УВМ (изменяются на месте).
+        memory (list[int] | PagedMemory): Память УВМ (изменяется на месте).
+        profile (Profile | None): Профиль, в который добавляются результаты.
+        start (int): Индекс первой исполняемой команды.
+        stop (int | None): Индекс команды, перед которой исполнение останавливается (None — до конца).
+
+    Возвращает:
+        Profile: Результаты профилирования. При ошибке исполнения профиль заполняется
+            до команды, вызвавшей ошибку, и прикрепляется к исключению в атрибуте profile.
+
+    Исключения:
+        VMError: При выходе за границы памяти или неизвестном opcode.
+    """
+    if profile is None:
+        profile = Profile()
+    dispatch = DISPATCH
+    address_of = _ADDRESS_OF
+    clock = time.perf_counter_ns
+    counts = profile.counts
+    times_ns = profile.times_ns
+    addresses = profile.addresses
+
+    count = len(program.ops)
+    end = count if stop is None else min(stop, count)
+
+    started = clock()
+    try:
+        for opcode, B, C in zip(islice(program.ops, start, end), islice(program.b, start, end),
+                                islice(program.c, start, end)):
+            t0 = clock()
+            dispatch[opcode](registers, memory, B, C)
+            times_ns[opcode] += clock() - t0
+            counts[opcode] += 1
+            get_address = address_of.get(opcode)
+            if get_address is not None:
+                addr = get_address(registers, B, C)
+                histogram = addresses.get(opcode)
+                if histogram is None:
+                    histogram = addresses[opcode] = Counter()
+                histogram[addr] += 1
+
+        if end == count and program.error is not None:
+            pc, opcode = program.error
+            raise VMError(f"Unknown opcode at pc={pc}: {opcode}")
+    except VMError as e:
+        e.profile = profile
+        raise
+    finally:
+        profile.total_ns += clock() - started
+    return profile
@@ -0,0 +1,207 @@
+"""
+Форматы вывода результата интерпретатора УВМ.
+
+Поддерживаются:
+    json    — JSON с отступами (формат по умолчанию, как раньше);
+    compact — JSON без пробелов;
+    stream  — JSON, записываемый порциями, без построения полного списка значений;
+    raw     — 64-битные слова little-endian подряд;
+    npy     — массив NumPy (.npy, dtype '<u8'), заголовок пишется без зависимости от NumPy.
+
+Можно запросить несколько диапазонов ("0:10,100:200") и вывод только ненулевых ячеек
+(dirty-only) парами [адрес, значение]. Режим выбирает ячейки по значению, а не по записи: ненулевые
+ячейки сегментов данных контейнера выводятся, даже если программа их не меняла, а ячейка,
+в которую программа записала ноль, не выводится.
+"""
+import json  # Модуль для работы с JSON-форматом
+import sys  # Порядок байтов платформы
+from array import array  # Типизированные массивы для двоичных форматов
+
+from paged_memory import PagedMemory
+
+FORMATS = ('json', 'compact', 'stream', 'raw', 'npy')
+
+# Количество ячеек, обрабатываемых за одну порцию в потоковых форматах
+CHUNK_CELLS = 1 << 16
+
+
+def parse_ranges(text):
+    """
+    Разбирает список диапазонов памяти.
+
+    Параметры:
+        text (str): Диапазоны вида "start:end", разделённые запятыми.
+
+    Возвращает:
+        list[tuple[int, int]]: Пары (start, end).
+
+    Исключения:
+        ValueError: Если какой-либо диапазон записан в неверном формате.
+    """
+    ranges = []
+    for part in text.split(','):
+        start, end = map(int, part.split(':'))
+        ranges.append((start, end))
+    return ranges
+
+
+def _read(memory, start, end):
+    """
+    Возвращает значения ячеек [start, end) в виде array('Q').
+    """
+    if isinstance(memory, PagedMemory):
+        return memory.read(start, end)
+    return array('Q', memory[start:end])
+
+
+def _iter_chunks(memory, start, end):
+    """
+    Перечисляет значения диапазона порциями по CHUNK_CELLS ячеек.
+    """
+    for lo in range(start, end, CHUNK_CELLS):
+        yield _read(memory, lo, min(end, lo + CHUNK_CELLS))
+
+
+def iter_dirty(memory, start, end):
+    """
+    Перечисляет пары (адрес, значение) ненулевых ячеек диапазона.
+    """
+    if isinstance(memory, PagedMemory):
+        yield from memory.iter_nonzero(start, end)
+        return
+    for lo in range(start, end, CHUNK_CELLS):
+        for offset, value in enumerate(memory[lo:min(end, lo + CHUNK_CELLS)]):
+            if value:
+                yield lo + offset, value
+
+
+def json_result(memory, ranges, dirty_only=False):
+    """
+    Строит объект результата для форматов json и compact.
+
+    Для одного диапазона возвращается список значений (для страничной памяти — словарь
+    выделенных страниц, см. PagedMemory.dump), для нескольких — словарь {"start:end": результат}.
+    """
+    def single(start, end):
+        if dirty_only:
+            return [[addr, value] for addr, value in iter_dirty(memory, start, end)]
+        if isinstance(memory, PagedMemory):
+            return memory.dump(start, end)
+        return memory[start:end]
+
+    if len(ranges) == 1:
+        return single(*ranges[0])
+    return {f"{start}:{end}": single(start, end) for start, end in ranges}
+
+
+def _write_stream(f, memory, ranges, dirty_only):
+    """
+    Записывает JSON порциями: значения каждого диапазона выводятся как массив,
+    несколько диапазонов — как объект {"start:end": [...]}.
+    """
+    def write_range(start, end):
+        f.write('[')
+        first = True
+        if dirty_only:
+            for addr, value in iter_dirty(memory, start, end):
+                f.write(f'[{addr},{value}]' if first else f',[{addr},{value}]')
+                first = False
+        else:
+            for chunk in _iter_chunks(memory, start, end):
+                if not first:
+                    f.write(',')
+                f.write(','.join(map(str, chunk)))
+                first = False
+        f.write(']')
+
+    if len(ranges) == 1:
+        write_range(*ranges[0])
+        return
+    f.write('{')
+    for i, (start, end) in enumerate(ranges):
+        f.write(f'{"," if i else ""}"{start}:{end}":')
+        write_range(start, end)
+    f.write('}')
+
+
+def _iter_binary_chunks(memory, ranges, dirty_only):
+    """
+    Перечисляет порции array('Q') для двоичных форматов: значения диапазонов подряд
+    или пары (адрес, значение) в режиме dirty-only.
+    """
+    for start, end in ranges:
+        if dirty_only:
+            chunk = array('Q')
+            for addr, value in iter_dirty(memory, start, end):
+                chunk.append(addr)
+                chunk.append(value)
+                if len(chunk) >= CHUNK_CELLS:
+                    yield chunk
+                    chunk = array('Q')
+            yield chunk
+        else:
+            yield from _iter_chunks(memory, start, end)
+
+
+def _write_binary(f, chunks):
+    """
+    Записывает порции array('Q') как слова little-endian. Возвращает количество записанных слов.
+    """
+    count = 0
+    for chunk in chunks:
+        if sys.byteorder != 'little':
+            chunk.byteswap()
+        f.write(chunk.tobytes())
+        count += len(chunk)
+    return count
+
+
+def _npy_header(shape):
+    """
+    Формирует заголовок файла .npy версии 1.0 для массива '<u8' заданной формы.
+    """
+    shape_text = f"({shape[0]},)" if len(shape) == 1 else f"({', '.join(map(str, shape))})"
+    header = f"{{'descr': '<u8', 'fortran_order': False, 'shape': {shape_text}, }}"
+    # Длина заголовка вместе с магической строкой и полем длины выравнивается на 64 байта
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = header + ' ' * padding + '\n'
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, byteorder='little') + header.encode('latin1')
+
+
+def write_result(path, memory, ranges, fmt, dirty_only=False):
+    """
+    Записывает результат в файл в выбранном формате.
+
+    Параметры:
+        path (str): Путь к файлу результата.
+        memory (list[int] | PagedMemory): Память УВМ.
+        ranges (list[tuple[int, int]]): Диапазоны памяти.
+        fmt (str): Один из FORMATS.
+        dirty_only (bool): Выводить только ненулевые ячейки парами (адрес, значение).
+    """
+    if fmt == 'json':
+        with open(path, 'w') as f:
+            json.dump(json_result(memory, ranges, dirty_only), f, indent=2)
+    elif fmt == 'compact':
+        with open(path, 'w') as f:
+            json.dump(json_result(memory, ranges, dirty_only), f, separators=(',', ':'))
+    elif fmt == 'stream':
+        with open(path, 'w') as f:
+            _write_stream(f, memory, ranges, dirty_only)
+    elif fmt == 'raw':
+        with open(path, 'wb') as f:
+            _write_binary(f, _iter_binary_chunks(memory, ranges, dirty_only))
+    elif fmt == 'npy':
+        with open(path, 'wb') as f:
+            # Размер заголовка зависит от количества элементов; в режиме dirty-only оно заранее
+            # неизвестно, поэтому пишем заголовок-заглушку максимальной длины и переписываем его в конце
+            placeholder = _npy_header((2 ** 62, 2) if dirty_only else (2 ** 62,))
+            f.write(placeholder)
+            count = _write_binary(f, _iter_binary_chunks(memory, ranges, dirty_only))
+            header = _npy_header((count // 2, 2) if dirty_only else (count,))
+            header = header[:-1].ljust(len(placeholder) - 1, b' ') + b'\n'
+            header = header[:8] + (len(header) - 10).to_bytes(2, byteorder='little') + header[10:]
+            f.seek(0)
+            f.write(header)
+    else:
+        raise ValueError(f"Unknown result format: {fmt}")
@@ -0,0 +1,270 @@
+"""
+Кооперативный планировщик asyncio для одновременного исполнения многих программ УВМ в одном процессе.
+
+VM.run() исполняет программу до конца, и одна длинная программа занимает цикл событий целиком.
+Планировщик исполняет каждую задачу квантами (VM.step) и после каждого кванта уступает цикл событий.
+Готовые корутины asyncio обслуживаются по очереди (FIFO), поэтому задачи получают кванты по кругу,
+а между квантами успевают выполняться сетевой ввод-вывод и остальные корутины процесса.
+
+Размер кванта в командах подстраивается под скорость задачи так, чтобы квант длился около slice_time
+секунд: POPCNT_RANGE по длинному диапазону стоит гораздо дороже LOAD_CONST, и квант постоянной длины
+в командах дал бы таким программам несправедливо много времени.
+
+Для каждой задачи задаются лимиты количества команд и времени исполнения; задачу можно отменить.
+Задача, превысившая лимит, останавливается на границе кванта: её машину можно исполнить дальше,
+отправив в планировщик ещё раз. Метрики задачи (команды, кванты, время исполнения, ожидание
+и задержка, пропускная способность) доступны в её атрибутах и через describe().
+
+Пример:
+    scheduler = Scheduler()
+    job = scheduler.submit(vm, max_steps=10**6)
+    state = await job.wait()
+    print(job.describe())
+"""
+import asyncio  # Кооперативная многозадачность
+import time  # Измерение квантов и задержек
+
+from machine import DecodedProgram, VMError
+
+# Размер первого кванта задачи в командах
+DEFAULT_SLICE_STEPS = 1000
+# Желаемая длительность кванта в секундах
+DEFAULT_SLICE_TIME = 0.001
+# Наибольший размер кванта в командах
+MAX_SLICE_STEPS = 1 << 20
+
+
+class LimitExceeded(VMError):
+    """
+    Задача превысила лимит команд или времени исполнения.
+    """
+
+
+class Job:
+    """
+    Задача планировщика: исполнение одной машины.
+
+    Атрибуты:
+        vm (VM): Исполняемая машина.
+        name (str | None): Имя задачи (для журналов).
+        max_steps (int | None): Лимит количества команд задачи.
+        max_time (float | None): Лимит времени исполнения задачи в секундах (сумма длительностей её квантов).
+        status (str): 'pending', 'running', 'done', 'failed' или 'cancelled'.
+        error (str | None): Сообщение об ошибке исполнения или о превышении лимита.
+        steps (int): Количество команд, исполненных задачей.
+        slices (int): Количество квантов.
+        run_time (float): Время исполнения в секундах (сумма длительностей квантов).
+        submitted (float): Момент постановки в очередь (time.perf_counter()).
+        started (float | None): Момент начала первого кванта.
+        finished (float | None): Момент завершения.
+    """
+
+    def __init__(self, vm, name=None, max_steps=None, max_time=None):
+        self.vm = vm
+        self.name = name
+        self.max_steps = max_steps
+        self.max_time = max_time
+        self.status = 'pending'
+        self.error = None
+        self.steps = 0
+        self.slices = 0
+        self.run_time = 0.0
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self._task = None
+
+    async def wait(self):
+        """
+        Ожидает завершения задачи. Отмена ожидающей корутины (например, asyncio.wait_for с таймаутом)
+        отменяет и саму задачу.
+
+        Возвращает:
+            dict: Снимок состояния машины (см. VM.snapshot).
+
+        Исключения:
+            LimitExceeded: Если задача превысила лимит.
+            VMError: При ошибке исполнения.
+            asyncio.CancelledError: Если задача отменена.
+        """
+        return await self._task
+
+    def cancel(self):
+        """
+        Отменяет задачу; машина остаётся в состоянии на границе последнего исполненного кванта.
+        """
+        self._task.cancel()
+
+    def done(self):
+        """
+        True, если задача завершена (успешно, с ошибкой или отменена).
+        """
+        return self._task.done()
+
+    @property
+    def wait_time(self):
+        """
+        Время от постановки в очередь до начала первого кванта в секундах (None — задача не начата).
+        """
+        return None if self.started is None else self.started - self.submitted
+
+    @property
+    def latency(self):
+        """
+        Время от постановки в очередь до завершения в секундах (None — задача не завершена).
+        """
+        return None if self.finished is None else self.finished - self.submitted
+
+    @property
+    def throughput(self):
+        """
+        Команд в секунду времени исполнения задачи.
+        """
+        return self.steps / self.run_time if self.run_time else 0.0
+
+    def describe(self):
+        """
+        Возвращает состояние и метрики задачи в виде словаря (для вывода и журналов).
+        """
+        return {
+            'name': self.name,
+            'status': self.status,
+            'error': self.error,
+            'steps': self.steps,
+            'slices': self.slices,
+            'run_time': self.run_time,
+            'wait_time': self.wait_time,
+            'latency': self.latency,
+            'throughput': self.throughput,
+        }
+
+
+class Scheduler:
+    """
+    Планировщик задач УВМ в текущем цикле событий asyncio.
+
+    Атрибуты:
+        slice_steps (int): Размер первого кванта задачи в командах.
+        slice_time (float): Желаемая длительность кванта в секундах.
+        jobs (set[Job]): Незавершённые задачи.
+        completed (int): Количество завершённых задач (с любым исходом).
+        total_steps (int): Количество команд, исполненных всеми завершёнными задачами.
+    """
+
+    def __init__(self, slice_steps=DEFAULT_SLICE_STEPS, slice_time=DEFAULT_SLICE_TIME, max_running=None):
+        """
+        Параметры:
+            slice_steps (int): Размер первого кванта задачи в командах.
+            slice_time (float): Желаемая длительность кванта в секундах.
+            max_running (int | None): Наибольшее количество одновременно исполняемых задач; остальные
+                ждут в очереди в порядке поступления (None — без ограничения).
+        """
+        if slice_steps < 1 or slice_time <= 0:
+            raise ValueError("Slice size and slice time must be positive.")
+        self.slice_steps = slice_steps
+        self.slice_time = slice_time
+        self.jobs = set()
+        self.completed = 0
+        self.total_steps = 0
+        self._slots = asyncio.Semaphore(max_running) if max_running is not None else None
+
+    def submit(self, vm, max_steps=None, max_time=None, name=None):
+        """
+        Ставит машину с загруженной программой в очередь. Вызывается из работающего цикла событий.
+
+        Параметры:
+            vm (VM): Машина с предекодированной программой; исполнение продолжается с команды vm.steps.
+            max_steps (int | None): Лимит количества команд.
+            max_time (float | None): Лимит времени исполнения в секундах.
+            name (str | None): Имя задачи.
+
+        Возвращает:
+            Job: Задача.
+
+        Исключения:
+            VMError: Если предекодированная программа не загружена.
+        """
+        if not isinstance(vm.program, DecodedProgram):
+            raise VMError("Scheduling requires a decoded program.")
+        job = Job(vm, name, max_steps, max_time)
+        job._task = asyncio.ensure_future(self._run(job))
+        job._task.add_done_callback(lambda task: self._finish(job))
+        self.jobs.add(job)
+        return job
+
+    async def run(self, vm, max_steps=None, max_time=None, name=None):
+        """
+        Исполняет машину и возвращает снимок её состояния (submit и wait одним вызовом).
+        """
+        return await self.submit(vm, max_steps, max_time, name).wait()
+
+    async def join(self):
+        """
+        Ожидает завершения всех поставленных задач; их ошибки не выбрасываются.
+        """
+        while self.jobs:
+            await asyncio.wait([job._task for job in self.jobs])
+
+    def cancel_all(self):
+        """
+        Отменяет все незавершённые задачи.
+        """
+        for job in self.jobs:
+            job.cancel()
+
+    def describe(self):
+        """
+        Возвращает сводные метрики планировщика в виде словаря.
+        """
+        return {'running': len(self.jobs), 'completed': self.completed, 'steps': self.total_steps}
+
+    async def _run(self, job):
+        if self._slots is None:
+            return await self._execute(job)
+        async with self._slots:
+            return await self._execute(job)
+
+    async def _execute(self, job):
+        """
+        Исполняет задачу квантами до конца программы, ошибки, превышения лимита или отмены.
+        """
+        vm = job.vm
+        budget = self.slice_steps
+        job.status = 'running'
+        job.started = time.perf_counter()
+        while True:
+            quantum = budget if job.max_steps is None else max(0, min(budget, job.max_steps - job.steps))
+            started = time.perf_counter()
+            executed = vm.step(quantum)
+            elapsed = time.perf_counter() - started
+            job.steps += executed
+            job.slices += 1
+            job.run_time += elapsed
+            if vm.finished:
+                return vm.snapshot()
+            if job.max_steps is not None and job.steps >= job.max_steps:
+                raise LimitExceeded(f"Instruction limit of {job.max_steps} exceeded.")
+            if job.max_time is not None and job.run_time >= job.max_time:
+                raise LimitExceeded(f"Time limit of {job.max_time} s exceeded after {job.steps} instructions.")
+            if executed and elapsed > 0:
+                # Следующий квант рассчитан по скорости этого так, чтобы длиться около slice_time
+                budget = max(1, min(MAX_SLICE_STEPS, int(executed * self.slice_time / elapsed)))
+            await asyncio.sleep(0)
+
+    def _finish(self, job):
+        """
+        Записывает исход завершённой задачи.
+        """
+        task = job._task
+        job.finished = time.perf_counter()
+        if task.cancelled():
+            job.status = 'cancelled'
+        elif task.exception() is not None:
+            # Исключение считается полученным: без ожидающих задача не выводит предупреждение
+            job.status = 'failed'
+            job.error = str(task.exception())
+        else:
+            job.status = 'done'
+        self.jobs.discard(job)
+        self.completed += 1
+        self.total_steps += job.steps
@@ -0,0 +1,449 @@
+"""
+Долгоживущий сервис ассемблирования и исполнения программ УВМ.
+
+Каждый запуск пары assembler.py + interpreter.py стоит двух запусков Python и промежуточных
+файлов (program.bin, program_log.json, result.json). Сервис принимает исходный код или
+бинарный код вместе с диапазоном памяти и сразу возвращает результат.
+
+Протокол — JSON по строкам (NDJSON) через Unix-сокет или TCP на localhost: клиент отправляет
+по одному запросу на строку и получает по одному ответу на строку в том же порядке.
+
+Запрос:
+    {"source": "LOAD_CONST 0 5\\n..."}  или  {"binary": "<base64>"} (обычный бинарный код или контейнер,
+    в том числе с сегментами данных; директивы .data в исходном коде не принимаются, так как могут
+    ссылаться на файлы на стороне сервиса),
+    а также необязательные "range" ("start:end[,start:end...]", по умолчанию "0:0"),
+    "memory_size", "memory" ('flat' | 'paged'), "page_size" (целые, не больше --max-memory-size), "dirty_only",
+    а в режиме планировщика — лимиты "max_steps" (команд) и "max_time" (секунд исполнения).
+Ответ:
+    {"ok": true, "result": <как в result.json>, "registers": [...], "cached": bool}
+    или {"ok": false, "error": "<сообщение>"}; в режиме планировщика также "metrics" с метриками задачи.
+
+Фронтенд — asyncio, исполнение — в пуле процессов. Каждый процесс пула держит LRU-кэш
+собранных и декодированных программ, поэтому повторные запросы той же программы
+не ассемблируются и не декодируются заново.
+
+В режиме планировщика (serve --scheduler) программы исполняются в самом процессе сервиса
+квантами по очереди (см. scheduler.py): множество небольших задач обслуживается одним процессом,
+и длинная программа не задерживает остальные. Ассемблирование и декодирование запроса выполняются
+в потоке, а не в цикле событий, чтобы большой исходный код не останавливал остальные соединения и задачи.
+
+Примеры:
+    python service.py serve --socket /tmp/uvm.sock --workers 4
+    python service.py serve --socket /tmp/uvm.sock --scheduler --slice-time 0.002
+    python service.py run program.asm 0:10 --socket /tmp/uvm.sock --output result.json
+"""
+import argparse  # Модуль для парсинга аргументов командной строки
+import asyncio  # Асинхронный фронтенд сервиса
+import base64  # Передача бинарного кода в JSON
+import concurrent.futures  # Пул процессов для исполнения программ
+import hashlib  # Ключи кэша программ
+import json  # Модуль для работы с JSON-форматом
+import os  # Удаление файла Unix-сокета
+import signal  # Завершение по SIGTERM
+import socket  # Синхронный клиент
+import sys  # Модуль для взаимодействия с интерпретатором Python
+import threading  # Блокировка кэша программ, общего для потоков подготовки запросов
+from collections import OrderedDict
+
+import assembly
+import container
+import result_output
+import scheduler
+from machine import VM, VMError, decode_program
+from paged_memory import DEFAULT_PAGE_SIZE
+
+DEFAULT_SOCKET = '/tmp/uvm.sock'
+
+# Количество программ в кэше каждого процесса пула
+CACHE_ENTRIES = 256
+
+# Максимальный размер одного запроса (строки NDJSON) в байтах
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+# Наибольший размер плоской памяти и страницы страничной памяти (в ячейках) по умолчанию:
+# ограничивает память, которую процесс выделяет для одного запроса
+MAX_MEMORY_SIZE = 1 << 22
+
+# Кэш процесса пула: ключ (sha256 исходного или бинарного кода) -> (DecodedProgram, сегменты данных)
+_programs = OrderedDict()
+# В режиме планировщика запросы подготавливаются в потоках, и кэш изменяется из нескольких потоков
+_programs_lock = threading.Lock()
+
+
+def _cached_program(kind, payload):
+    """
+    Возвращает декодированную программу из кэша процесса или собирает и декодирует её.
+
+    Параметры:
+        kind (str): 'source' или 'binary'.
+        payload (str | bytes): Исходный или бинарный код.
+
+    Возвращает:
+        tuple: ((DecodedProgram, сегменты данных), True если программа взята из кэша).
+    """
+    data = payload.encode('utf-8') if kind == 'source' else payload
+    key = (kind, hashlib.sha256(data).digest())
+    with _programs_lock:
+        program = _programs.get(key)
+        if program is not None:
+            _programs.move_to_end(key)
+            return program, True
+
+    binary = assembly.assemble(payload) if kind == 'source' else payload
+    if container.is_container(binary):
+        header = container.unpack(binary)
+        program = (container.decode(header), header.data)
+    else:
+        program = (decode_program(binary), [])
+    with _programs_lock:
+        _programs[key] = program
+        if len(_programs) > CACHE_ENTRIES:
+            _programs.popitem(last=False)
+    return program, False
+
+
+def _size_option(request, name, default, minimum, maximum):
+    """
+    Возвращает целочисленный параметр запроса, проверяя тип и диапазон.
+
+    Исключения:
+        ValueError: Если значение не целое или вне [minimum, maximum].
+    """
+    value = request.get(name, default)
+    # bool — подкласс int, но размером памяти не является
+    if type(value) is not int or not (minimum <= value <= maximum):
+        raise ValueError(f"'{name}' must be an integer from {minimum} to {maximum}, got {value!r}.")
+    return value
+
+
+def prepare_request(request, max_memory_size=MAX_MEMORY_SIZE):
+    """
+    Разбирает запрос и загружает программу в новую машину, не исполняя её.
+
+    Параметры:
+        request (dict): Запрос (см. описание протокола в начале модуля).
+        max_memory_size (int): Наибольшие допустимые "memory_size" и "page_size".
+
+    Возвращает:
+        tuple: (VM с загруженной программой, диапазоны памяти результата, True если программа взята из кэша).
+
+    Исключения:
+        assembly.AssemblerError, VMError, ValueError, TypeError: При ошибке в запросе или программе.
+    """
+    if 'source' in request:
+        (program, data), cached = _cached_program('source', request['source'])
+    elif 'binary' in request:
+        (program, data), cached = _cached_program('binary', base64.b64decode(request['binary']))
+    else:
+        raise ValueError("Request must contain 'source' or 'binary'.")
+
+    mem_range = request.get('range', '0:0')
+    try:
+        ranges = result_output.parse_ranges(mem_range)
+    except ValueError:
+        raise ValueError(f"Invalid memory range format: {mem_range}. Expected format 'start:end'.")
+
+    vm = VM(memory_size=_size_option(request, 'memory_size', 1024, 0, max_memory_size),
+            memory_model=request.get('memory', 'flat'),
+            page_size=_size_option(request, 'page_size', DEFAULT_PAGE_SIZE, 1, max_memory_size))
+    vm.load(program, data=data)
+    return vm, ranges, cached
+
+
+def _response(vm, ranges, request, cached):
+    """
+    Строит ответ по состоянию исполненной машины.
+    """
+    for start, end in ranges:
+        if not (0 <= start <= end <= len(vm.memory)):
+            raise ValueError(f"Memory range out of bounds: {request.get('range', '0:0')}.")
+    result = result_output.json_result(vm.memory, ranges, request.get('dirty_only', False))
+    return {'ok': True, 'result': result, 'registers': vm.registers, 'cached': cached}
+
+
+def handle_request(request, max_memory_size=MAX_MEMORY_SIZE):
+    """
+    Обрабатывает один запрос (исполняется в процессе пула).
+
+    Параметры:
+        request (dict): Запрос (см. описание протокола в начале модуля).
+        max_memory_size (int): Наибольшие допустимые "memory_size" и "page_size".
+
+    Возвращает:
+        dict: Ответ; ошибки ассемблирования, исполнения и неверные параметры возвращаются
+            как {"ok": false, "error": ...}, а не выбрасываются.
+    """
+    try:
+        if 'max_steps' in request or 'max_time' in request:
+            raise ValueError("Instruction and time limits require the scheduler (service.py serve --scheduler).")
+        vm, ranges, cached = prepare_request(request, max_memory_size)
+        vm.run()
+        return _response(vm, ranges, request, cached)
+    except (assembly.AssemblerError, VMError, ValueError, TypeError) as e:
+        return {'ok': False, 'error': str(e)}
+    except MemoryError:
+        return {'ok': False, 'error': "Out of memory."}
+
+
+async def handle_scheduled(scheduler, request, max_memory_size=MAX_MEMORY_SIZE):
+    """
+    Обрабатывает один запрос в текущем процессе, исполняя программу квантами через планировщик.
+
+    Параметры:
+        scheduler (scheduler.Scheduler): Планировщик.
+        request (dict): Запрос; дополнительно принимаются лимиты "max_steps" и "max_time".
+        max_memory_size (int): Наибольшие допустимые "memory_size" и "page_size".
+
+    Возвращает:
+        dict: Ответ, как у handle_request, с метриками задачи в поле "metrics".
+    """
+    job = None
+    try:
+        # Ассемблирование и декодирование — в потоке: в цикле событий исполняются только кванты
+        vm, ranges, cached = await asyncio.get_running_loop().run_in_executor(
+            None, prepare_request, request, max_memory_size)
+        job = scheduler.submit(vm, request.get('max_steps'), request.get('max_time'))
+        await job.wait()
+        response = _response(vm, ranges, request, cached)
+    except (assembly.AssemblerError, VMError, ValueError, TypeError) as e:
+        response = {'ok': False, 'error': str(e)}
+    except MemoryError:
+        response = {'ok': False, 'error': "Out of memory."}
+    if job is not None:
+        response['metrics'] = {key: value for key, value in job.describe().items()
+                               if key in ('steps', 'slices', 'run_time', 'wait_time', 'latency')}
+    return response
+
+
+class Server:
+    """
+    Асинхронный сервер УВМ.
+
+    Атрибуты:
+        path (str | None): Путь к Unix-сокету.
+        host (str): Адрес TCP (используется, если задан port).
+        port (int | None): Порт TCP; 0 — выбрать свободный (см. атрибут port после start()).
+        workers (int | None): Количество процессов пула (None — по числу процессоров,
+            0 — исполнять в одном потоке текущего процесса).
+        scheduler (scheduler.Scheduler | None): Если задан, программы исполняются в цикле событий
+            сервиса квантами через этот планировщик, а пул не создаётся.
+        max_memory_size (int): Наибольшие допустимые "memory_size" и "page_size" запросов.
+    """
+
+    def __init__(self, path=None, host='127.0.0.1', port=None, workers=None, scheduler=None,
+                 max_memory_size=MAX_MEMORY_SIZE):
+        if path is None and port is None:
+            path = DEFAULT_SOCKET
+        self.path = path
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.scheduler = scheduler
+        self.max_memory_size = max_memory_size
+        self._server = None
+        self._executor = None
+
+    async def start(self):
+        """
+        Запускает пул и начинает принимать соединения.
+        """
+        if self.scheduler is None and self.workers == 0:
+            self._executor = concurrent.futures.ThreadPoolExecutor(1)
+        elif self.scheduler is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+        if self.port is not None:
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                      limit=MAX_REQUEST_BYTES)
+            self.port = self._server.sockets[0].getsockname()[1]
+        else:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = await asyncio.start_unix_server(self._handle_connection, self.path,
+                                                           limit=MAX_REQUEST_BYTES)
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Прекращает приём соединений и останавливает пул (или отменяет задачи планировщика).
+        """
+        self._server.close()
+        if self.scheduler is not None:
+            self.scheduler.cancel_all()
+            await self.scheduler.join()
+        await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown()
+        if self.port is None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Строка длиннее MAX_REQUEST_BYTES — соединение больше не синхронизировано
+                    writer.write(b'{"ok":false,"error":"Request too large."}\n')
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request must be a JSON object.")
+                except ValueError as e:
+                    response = {'ok': False, 'error': f"Invalid request: {e}"}
+                else:
+                    if self.scheduler is not None:
+                        response = await handle_scheduled(self.scheduler, request, self.max_memory_size)
+                    else:
+                        response = await loop.run_in_executor(self._executor, handle_request, request,
+                                                              self.max_memory_size)
+                writer.write(json.dumps(response, separators=(',', ':')).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class Client:
+    """
+    Синхронный клиент сервиса УВМ. Соединение открывается один раз и используется для всех запросов.
+    """
+
+    def __init__(self, path=None, host='127.0.0.1', port=None):
+        if port is not None:
+            self._sock = socket.create_connection((host, port))
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(path or DEFAULT_SOCKET)
+        self._file = self._sock.makefile('rwb')
+
+    def request(self, request):
+        """
+        Отправляет запрос и возвращает ответ сервера (dict).
+        """
+        self._file.write(json.dumps(request, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection.")
+        return json.loads(line)
+
+    def run(self, source=None, binary=None, mem_range='0:0', **options):
+        """
+        Исполняет исходный или бинарный код и возвращает ответ сервера.
+
+        Параметры:
+            source (str | None): Исходный код УВМ.
+            binary (bytes | None): Бинарный код УВМ.
+            mem_range (str): Диапазон(ы) памяти для результата.
+            **options: memory_size, memory, page_size, dirty_only, max_steps, max_time.
+        """
+        request = dict(options, range=mem_range)
+        if source is not None:
+            request['source'] = source
+        else:
+            request['binary'] = base64.b64encode(binary).decode('ascii')
+        return self.request(request)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def _serve(args):
+    jobs = scheduler.Scheduler(slice_time=args.slice_time) if args.scheduler else None
+    server = await Server(args.socket, args.host, args.port, args.workers, jobs, args.max_memory_size).start()
+    where = f"{server.host}:{server.port}" if server.port is not None else server.path
+    print(f"Listening on {where}", flush=True)
+    # SIGTERM завершает сервер так же аккуратно, как Ctrl+C: с остановкой пула и удалением сокета
+    serving = asyncio.ensure_future(server.serve_forever())
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, serving.cancel)
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='UVM assemble-and-run service.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in (('serve', 'Start the service.'), ('run', 'Send a program to the service.')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--socket', help=f'Unix socket path (default {DEFAULT_SOCKET}).')
+        command.add_argument('--host', default='127.0.0.1', help='TCP host (with --port).')
+        command.add_argument('--port', type=int, help='Listen on / connect to TCP instead of a Unix socket.')
+
+    serve_parser = commands.choices['serve']
+    serve_parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count; 0 - in-process).')
+    serve_parser.add_argument('--scheduler', action='store_true',
+                              help='Run programs in-process, time-sliced by the cooperative scheduler.')
+    serve_parser.add_argument('--max-memory-size', type=int, default=MAX_MEMORY_SIZE,
+                              help='Largest memory_size and page_size a request may ask for (cells).')
+    serve_parser.add_argument('--slice-time', type=float, default=scheduler.DEFAULT_SLICE_TIME,
+                              help='Target scheduler time slice in seconds.')
+
+    run_parser = commands.choices['run']
+    run_parser.add_argument('program', help='Assembly source file (or binary with --binary).')
+    run_parser.add_argument('mem_range', help='Memory range(s) to output (start:end[,start:end...]).')
+    run_parser.add_argument('--binary', action='store_true', help='The program is an assembled binary.')
+    run_parser.add_argument('--output', help='Write the result as JSON to this file instead of stdout.')
+    run_parser.add_argument('--memory', choices=('flat', 'paged'), default='flat', help='Memory model.')
+    run_parser.add_argument('--memory-size', type=int, default=1024, help='Number of flat memory cells.')
+    run_parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                            help='Page size in cells for the paged memory (power of two).')
+    run_parser.add_argument('--dirty-only', action='store_true',
+                            help='Only output non-zero cells (including preloaded data cells).')
+    run_parser.add_argument('--max-steps', type=int, help='Instruction limit (server with --scheduler).')
+    run_parser.add_argument('--max-time', type=float,
+                            help='Execution time limit in seconds (server with --scheduler).')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(_serve(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.binary:
+        with open(args.program, 'rb') as f:
+            program = {'binary': f.read()}
+    else:
+        with open(args.program, 'r') as f:
+            program = {'source': f.read()}
+    for limit in ('max_steps', 'max_time'):
+        if getattr(args, limit) is not None:
+            program[limit] = getattr(args, limit)
+    with Client(args.socket, args.host, args.port) as client:
+        response = client.run(mem_range=args.mem_range, memory=args.memory, memory_size=args.memory_size,
+                              page_size=args.page_size, dirty_only=args.dirty_only, **program)
+    if not response['ok']:
+        print(response['error'], file=sys.stderr)
+        sys.exit(1)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(response['result'], f, indent=2)
+    else:
+        print(json.dumps(response['result'], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Снимки состояния УВМ: компактный двоичный формат для сохранения и восстановления.
+
+Снимок содержит позицию исполнения (номер следующей команды и её смещение pc в бинарном коде),
+регистры и память. Память хранится разреженно: только сегменты, содержащие ненулевые ячейки
+(для плоской памяти — блоки по SEGMENT_CELLS ячеек, для страничной — выделенные страницы).
+
+Формат файла (все числа little-endian):
+    заголовок   MAGIC, версия (u16), модель памяти (u16: 0 — flat, 1 — paged),
+                steps (u64), pc (u64), размер памяти (u64), размер страницы (u32),
+                количество регистров (u32), количество сегментов (u64);
+    регистры    u64 × количество регистров;
+    сегменты    пары (начальный адрес, длина) u64 × 2 × количество сегментов;
+    данные      значения ячеек всех сегментов подряд, u64.
+Регистры, таблица сегментов и данные читаются целиком через array.frombytes, без разбора по ячейкам.
+"""
+import struct  # Упаковка заголовка
+import sys  # Порядок байтов платформы
+from array import array  # Массовое чтение и запись 64-битных слов
+
+from paged_memory import DEFAULT_PAGE_SIZE, PagedMemory
+
+MAGIC = b'UVMSNAP\0'
+VERSION = 1
+
+# Количество ячеек в блоке плоской памяти, который сохраняется целиком, если в нём есть ненулевые ячейки
+SEGMENT_CELLS = 64
+
+_HEADER = struct.Struct('<8sHHQQQIIQ')
+_MODELS = {'flat': 0, 'paged': 1}
+
+
+class SnapshotError(ValueError):
+    """
+    Повреждённый или несовместимый снимок.
+    """
+
+
+class Snapshot:
+    """
+    Состояние УВМ в заданной точке исполнения.
+
+    Атрибуты:
+        steps (int): Количество исполненных команд (индекс следующей команды).
+        pc (int): Смещение следующей команды в бинарном коде (в байтах).
+        registers (list[int]): Регистры.
+        memory (list[int] | PagedMemory): Память.
+        memory_model (str): 'flat' или 'paged'.
+        page_size (int): Размер страницы страничной памяти.
+    """
+
+    __slots__ = ('steps', 'pc', 'registers', 'memory', 'memory_model', 'page_size')
+
+    def __init__(self, steps, pc, registers, memory, memory_model='flat', page_size=DEFAULT_PAGE_SIZE):
+        self.steps = steps
+        self.pc = pc
+        self.registers = registers
+        self.memory = memory
+        self.memory_model = memory_model
+        self.page_size = page_size
+
+
+def _words(values):
+    """
+    Возвращает значения как байты u64 little-endian.
+    """
+    words = values if isinstance(values, array) else array('Q', values)
+    if sys.byteorder != 'little':
+        words = array('Q', words)
+        words.byteswap()
+    return words.tobytes()
+
+
+def _read_words(data, offset, count):
+    """
+    Читает count слов u64 little-endian, начиная с offset, одним вызовом frombytes.
+    """
+    end = offset + 8 * count
+    if end > len(data):
+        raise SnapshotError("Snapshot is truncated.")
+    words = array('Q')
+    words.frombytes(data[offset:end])
+    if sys.byteorder != 'little':
+        words.byteswap()
+    return words, end
+
+
+def _segments(memory):
+    """
+    Перечисляет сегменты памяти с ненулевыми ячейками: (начальный адрес, значения).
+    """
+    if isinstance(memory, PagedMemory):
+        for index in memory.populated_pages():
+            page = memory.pages[index]
+            if any(page):
+                yield index * memory.page_size, page
+        return
+
+    size = len(memory)
+    start = None
+    for lo in range(0, size, SEGMENT_CELLS):
+        hi = min(size, lo + SEGMENT_CELLS)
+        if any(memory[lo:hi]):
+            if start is None:
+                start = lo
+        elif start is not None:
+            yield start, memory[start:lo]
+            start = None
+    if start is not None:
+        yield start, memory[start:size]
+
+
+def dumps(snapshot):
+    """
+    Сериализует снимок в байты.
+    """
+    segments = list(_segments(snapshot.memory))
+    table = array('Q')
+    for start, values in segments:
+        table.append(start)
+        table.append(len(values))
+    header = _HEADER.pack(MAGIC, VERSION, _MODELS[snapshot.memory_model], snapshot.steps, snapshot.pc,
+                          len(snapshot.memory), snapshot.page_size, len(snapshot.registers), len(segments))
+    parts = [header, _words(snapshot.registers), _words(table)]
+    parts.extend(_words(values) for _, values in segments)
+    return b''.join(parts)
+
+
+def loads(data):
+    """
+    Восстанавливает снимок из байтов.
+
+    Исключения:
+        SnapshotError: Если данные повреждены или записаны несовместимой версией.
+    """
+    if len(data) < _HEADER.size:
+        raise SnapshotError("Snapshot is truncated.")
+    magic, version, model, steps, pc, memory_size, page_size, num_registers, count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("Not a UVM snapshot.")
+    if version != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}.")
+    models = {code: name for name, code in _MODELS.items()}
+    if model not in models:
+        raise SnapshotError(f"Unknown memory model code {model}.")
+    if page_size <= 0 or page_size & (page_size - 1):
+        raise SnapshotError(f"Snapshot page size must be a power of two, got {page_size}.")
+
+    registers, offset = _read_words(data, _HEADER.size, num_registers)
+    table, offset = _read_words(data, offset, 2 * count)
+    cells, offset = _read_words(data, offset, sum(table[1::2]))
+
+    if models[model] == 'paged':
+        memory = PagedMemory(page_size, memory_size)
+        position = 0
+        for start, length in zip(table[0::2], table[1::2]):
+            if start % page_size or length != page_size:
+                raise SnapshotError("Paged snapshot segments must be whole pages.")
+            memory.pages[start // page_size] = cells[position:position + length]
+            position += length
+    else:
+        memory = [0] * memory_size
+        position = 0
+        for start, length in zip(table[0::2], table[1::2]):
+            if start + length > memory_size:
+                raise SnapshotError("Snapshot segment is out of memory bounds.")
+            memory[start:start + length] = cells[position:position + length].tolist()
+            position += length
+
+    return Snapshot(steps, pc, registers.tolist(), memory, models[model], page_size)
+
+
+def save(path, snapshot):
+    """
+    Записывает снимок в файл.
+    """
+    with open(path, 'wb') as f:
+        f.write(dumps(snapshot))
+
+
+def load(path):
+    """
+    Читает снимок из файла.
+    """
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -2,7 +2,10 @@ import unittest
 import subprocess
 import tempfile
 import os
+import struct
+import io
 import json
+import assembler
 
 
 class TestAssembler(unittest.TestCase):
@@ -128,5 +131,159 @@ class TestAssembler(unittest.TestCase):
         self.assertIn("Field B=8 out of range for LOAD_CONST (0-7)", result.stderr)
 
 
+    def test_stream_mode(self):
+        # Потоковый режим: тот же бинарный код, лог в формате NDJSON
+        self.source_file.write(
+            "LOAD_CONST 6 632\n"
+            "# комментарий\n"
+            "POPCNT 6 310\n"
+        )
+        self.source_file.flush()
+        result = subprocess.run([
+            'python', 'assembler.py',
+            self.source_file.name,
+            self.binary_file.name,
+            '--log_file', self.log_file.name,
+            '--stream'
+        ], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.read_binary(bytes([0x0A, 0xE3, 0x09, 0x00, 0x00]) + bytes([0x12, 0xDB, 0x04, 0x00, 0x00, 0x00]))
+        with open(self.log_file.name, 'r') as f:
+            log_data = [json.loads(line) for line in f]
+        self.assertEqual(log_data, [{"A": 10, "B": 6, "C": 632}, {"A": 18, "B": 6, "C": 310}])
+
+    def test_stream_mode_error(self):
+        self.source_file.write("LOAD_CONST 1 1\nINVALID_CMD 1 2\n")
+        self.source_file.flush()
+        result = subprocess.run([
+            'python', 'assembler.py',
+            self.source_file.name,
+            self.binary_file.name,
+            '--stream'
+        ], capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("Unknown opcode", result.stderr)
+
+
+class TestAssembleFunction(unittest.TestCase):
+    def test_assemble_stream_flushes_in_chunks(self):
+        out = io.BytesIO()
+        log = io.StringIO()
+        count, written = assembler.assemble_stream(["WRITE_MEM 1 5\n"] * 10, out, log, buffer_size=4)
+        self.assertEqual((count, written), (10, 20))
+        self.assertEqual(out.getvalue(), bytes([0xA7, 0x14]) * 10)
+        self.assertEqual(log.getvalue().splitlines()[0], '{"A":39,"B":1,"C":5}')
+
+    def test_assemble_source(self):
+        log_entries = []
+        binary = assembler.assemble(
+            "# комментарий\n"
+            "LOAD_CONST 6 632\n"
+            "\n"
+            "WRITE_MEM 1 5\n",
+            log_entries
+        )
+        self.assertEqual(binary, bytes([0x0A, 0xE3, 0x09, 0x00, 0x00, 0xA7, 0x14]))
+        self.assertEqual(log_entries, [{"A": 10, "B": 6, "C": 632}, {"A": 39, "B": 1, "C": 5}])
+
+    def test_assemble_error_names_line(self):
+        with self.assertRaises(assembler.AssemblerError) as cm:
+            assembler.assemble(["LOAD_CONST 1 1\n", "LOAD_CONST 8 123456\n"])
+        self.assertEqual(cm.exception.line_number, 2)
+        self.assertIn("Field B=8 out of range for LOAD_CONST (0-7)", str(cm.exception))
+
+
+class TestDataDirective(unittest.TestCase):
+    def test_inline_values(self):
+        segments = []
+        binary = assembler.assemble(".data 10 1 2 3  # комментарий\nLOAD_CONST 0 5\n.DATA 0 7\n",
+                                    data_segments=segments)
+        self.assertEqual(binary, assembler.assemble("LOAD_CONST 0 5\n"))
+        self.assertEqual([(addr, list(values)) for addr, values in segments], [(10, [1, 2, 3]), (0, [7])])
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            text_path = os.path.join(tmp, 'values.txt')
+            raw_path = os.path.join(tmp, 'values.u64')
+            with open(text_path, 'w') as f:
+                f.write("4 5\n6\n")
+            with open(raw_path, 'wb') as f:
+                f.write(struct.pack('<3Q', 1, 2, (1 << 64) - 1))
+            segments = []
+            assembler.assemble(f".data 0 @{text_path}\n.data 100 @{raw_path}\n", data_segments=segments)
+            self.assertEqual([(addr, list(values)) for addr, values in segments],
+                             [(0, [4, 5, 6]), (100, [1, 2, (1 << 64) - 1])])
+
+    def test_errors(self):
+        for line in (".data 5", ".data 0 -1", f".data 0 {1 << 64}", f".data {1 << 32} 1", ".bss 0 1",
+                     ".data 0 @/nonexistent/values.txt"):
+            with self.assertRaises(assembler.AssemblerError, msg=line):
+                assembler.assemble(line, data_segments=[])
+        # Без контейнера директива — ошибка с подсказкой
+        with self.assertRaisesRegex(assembler.AssemblerError, '--container'):
+            assembler.assemble(".data 0 1\n")
+
+    def test_parallel(self):
+        source = ''.join(f".data {i} {i}\nLOAD_CONST 0 {i}\n" for i in range(50))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'program.asm')
+            with open(path, 'w') as f:
+                f.write(source)
+            expected = []
+            binary = assembler.assemble(source, data_segments=expected)
+            segments = []
+            self.assertEqual(assembler.assemble_parallel(path, jobs=2, chunk_bytes=64, data_segments=segments),
+                             binary)
+            self.assertEqual(segments, expected)
+
+
+class TestParallelAssembler(unittest.TestCase):
+    def setUp(self):
+        lines = []
+        for i in range(300):
+            lines.append(f"LOAD_CONST {i % 8} {i * 7}\n")
+            lines.append("# комментарий\r\n" if i % 5 == 0 else f"WRITE_MEM {i % 8} {(i + 1) % 8}\n")
+        self.source = ''.join(lines)
+        fd, self.path = tempfile.mkstemp(suffix='.asm')
+        with os.fdopen(fd, 'w', newline='') as f:
+            f.write(self.source)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_matches_sequential(self):
+        expected_log = []
+        expected = assembler.assemble(self.source, expected_log)
+        log_entries = []
+        binary = assembler.assemble_parallel(self.path, jobs=3, log_entries=log_entries, chunk_bytes=97)
+        self.assertEqual(binary, expected)
+        self.assertEqual(log_entries, expected_log)
+
+    def test_error_reports_global_line_number(self):
+        with open(self.path, 'a') as f:
+            f.write("LOAD_CONST 1 1\nBOGUS 1 2\n")
+        with self.assertRaises(assembler.AssemblerError) as cm:
+            assembler.assemble_parallel(self.path, jobs=2, chunk_bytes=64)
+        self.assertEqual(cm.exception.line_number, 602)
+        self.assertIn("Unknown opcode: BOGUS", str(cm.exception))
+        # В сгенерированном коде текст строки не уникален: сообщение называет номер строки
+        with tempfile.TemporaryDirectory() as tmp:
+            result = subprocess.run(['python', 'assembler.py', self.path, os.path.join(tmp, 'program.bin'),
+                                     '--jobs', '2'], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Error assembling line 602: BOGUS 1 2 - Unknown opcode: BOGUS", result.stderr)
+
+    def test_cli_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sequential = os.path.join(tmp, 'seq.bin')
+            parallel = os.path.join(tmp, 'par.bin')
+            for output, extra in ((sequential, []), (parallel, ['--jobs', '2'])):
+                result = subprocess.run(['python', 'assembler.py', self.path, output] + extra,
+                                        capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+            with open(sequential, 'rb') as f1, open(parallel, 'rb') as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from array import array
+
+import assembler
+import fusion
+import interpreter
+
+try:
+    import numpy as np
+    import batch
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestBatchVM(unittest.TestCase):
+    def run_single(self, binary, image):
+        vm = interpreter.VM()
+        vm.load(binary)
+        vm.memory[:len(image)] = image
+        try:
+            vm.run()
+        except interpreter.VMError as e:
+            return vm, str(e)
+        return vm, None
+
+    def test_matches_single_vm(self):
+        binary = assembler.assemble(
+            "READ_MEM 0 1\n"
+            "READ_MEM 1 2\n"
+            "WRITE_MEM 2 1\n"
+            "POPCNT 3 1\n"
+            "LOAD_CONST 4 20\n"
+            "WRITE_MEM 3 4\n"
+            "POPCNT_RANGE 0 30\n"
+        )
+        images = [[5, 7], [9, 1023], [1, 255], [0, 0]]
+        vms = batch.BatchVM(binary, images)
+        result = vms.run()
+
+        self.assertEqual(result.shape, (4, 1024))
+        for i, image in enumerate(images):
+            vm, error = self.run_single(binary, image)
+            self.assertIsNone(error)
+            self.assertEqual(result[i].tolist(), vm.memory)
+            self.assertEqual(vms.registers[i].tolist(), vm.registers)
+
+    def test_write_error_is_per_instance(self):
+        binary = assembler.assemble(
+            "READ_MEM 0 1\n"
+            "LOAD_CONST 0 3\n"
+            "WRITE_MEM 0 1\n"
+            "LOAD_CONST 2 7\n"
+        )
+        images = [[10], [5000], [20]]
+        vms = batch.BatchVM(binary, images)
+        vms.run()
+
+        for i, image in enumerate(images):
+            vm, error = self.run_single(binary, image)
+            self.assertEqual(vms.errors[i], error)
+            self.assertEqual(vms.memory[i].tolist(), vm.memory)
+            self.assertEqual(vms.registers[i].tolist(), vm.registers)
+        self.assertIn("Memory write error: Address 5000", vms.errors[1])
+
+    def test_uniform_read_error(self):
+        binary = assembler.assemble("LOAD_CONST 1 1\nREAD_MEM 4000 1\nLOAD_CONST 2 2\n")
+        vms = batch.BatchVM(binary, count=2)
+        vms.run()
+        self.assertEqual(vms.errors, ["Memory read error: Address 4000 out of bounds."] * 2)
+        self.assertEqual(vms.registers[:, 2].tolist(), [0, 0])
+
+    def test_unsupported_opcode_rejected(self):
+        program = interpreter.DecodedProgram(array('B', [77]), array('Q', [0]), array('Q', [0]), array('Q', [2]))
+        with self.assertRaisesRegex(interpreter.VMError, 'opcode 77'):
+            batch.BatchVM(program, count=1).run()
+
+    def test_fused_program_rejected(self):
+        program = fusion.fuse(interpreter.decode_program(assembler.assemble("LOAD_CONST 0 1\nWRITE_MEM 0 0\n")))
+        with self.assertRaisesRegex(interpreter.VMError, 'fused'):
+            batch.BatchVM(program, count=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import assembler
+import bench
+import interpreter
+
+
+class TestGenerator(unittest.TestCase):
+    def test_programs_run_without_errors(self):
+        mix = {'LOAD_CONST': 1, 'WRITE_MEM': 3, 'READ_MEM': 1, 'POPCNT': 1, 'POPCNT_RANGE': 1}
+        for seed in range(5):
+            lines = bench.generate_program(500, mix, memory_size=64, seed=seed)
+            self.assertEqual(len(lines), 500)
+            vm = interpreter.VM(memory_size=64)
+            vm.load(assembler.assemble('\n'.join(lines))).run()
+
+    def test_deterministic(self):
+        self.assertEqual(bench.generate_program(100, seed=3), bench.generate_program(100, seed=3))
+
+    def test_parse_mix(self):
+        self.assertEqual(bench.parse_mix('load_const=2,POPCNT=1'), {'LOAD_CONST': 2.0, 'POPCNT': 1.0})
+        with self.assertRaises(ValueError):
+            bench.parse_mix('JUMP=1')
+
+
+class TestSuite(unittest.TestCase):
+    def test_run_suite(self):
+        results = bench.run_suite(sizes=[200], repeat=1, startup=False)
+        self.assertEqual(results['version'], bench.RESULTS_VERSION)
+        self.assertIn('loop_instructions_per_s[size=200]', results['metrics'])
+        self.assertGreater(results['metrics']['assemble_lines_per_s[size=200]']['value'], 0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'metrics': {
+            'speed': {'value': 100.0, 'unit': 'instructions/s', 'higher_is_better': True},
+            'memory': {'value': 1000, 'unit': 'bytes', 'higher_is_better': False},
+            'startup_s': {'value': 0.1, 'unit': 's', 'higher_is_better': False},
+        }}
+        current = {'metrics': {
+            'speed': {'value': 80.0, 'unit': 'instructions/s', 'higher_is_better': True},
+            'memory': {'value': 1050, 'unit': 'bytes', 'higher_is_better': False},
+        }}
+        rows = {row['metric']: row for row in bench.compare(baseline, current, threshold=0.1)}
+        self.assertTrue(rows['speed']['regression'])
+        self.assertFalse(rows['memory']['regression'])
+        self.assertNotIn('startup_s', rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
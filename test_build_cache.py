@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import build_cache
+
+
+class TestBuildCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key_depends_on_source_and_options(self):
+        key = build_cache.cache_key(b"LOAD_CONST 1 1\n", optimize=0)
+        self.assertEqual(key, build_cache.cache_key(b"LOAD_CONST 1 1\n", optimize=0))
+        self.assertNotEqual(key, build_cache.cache_key(b"LOAD_CONST 1 2\n", optimize=0))
+        self.assertNotEqual(key, build_cache.cache_key(b"LOAD_CONST 1 1\n", optimize=1))
+
+    def test_put_and_get(self):
+        cache = build_cache.BuildCache(self.directory)
+        self.assertIsNone(cache.get('missing'))
+        cache.put('k', b'\x0a\x01', '[]')
+        self.assertEqual(cache.get('k'), (b'\x0a\x01', '[]'))
+
+    def test_lru_eviction(self):
+        cache = build_cache.BuildCache(self.directory, max_bytes=3 * (8 + 100))
+        for i, key in enumerate(['a', 'b', 'c']):
+            cache.put(key, bytes(100), '')
+            os.utime(os.path.join(self.directory, key + '.entry'), (1000 + i, 1000 + i))
+        # Обращение к 'a' делает её самой свежей, поэтому вытесняется 'b'
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('d', bytes(100), '')
+        self.assertIsNone(cache.get('b'))
+        for key in ['a', 'c', 'd']:
+            self.assertIsNotNone(cache.get(key), key)
+
+    def test_assembler_cache_hit(self):
+        source = os.path.join(self.directory, 'prog.asm')
+        with open(source, 'w') as f:
+            f.write("LOAD_CONST 6 632\nWRITE_MEM 1 5\n")
+        cache_dir = os.path.join(self.directory, 'cache')
+        outputs = []
+        for run in range(2):
+            binary = os.path.join(self.directory, f'out{run}.bin')
+            log = os.path.join(self.directory, f'out{run}.json')
+            result = subprocess.run([
+                'python', 'assembler.py', source, binary, '--log_file', log, '--cache-dir', cache_dir
+            ], capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(binary, 'rb') as f, open(log) as g:
+                outputs.append((f.read(), json.load(g)))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0][0], bytes([0x0A, 0xE3, 0x09, 0x00, 0x00, 0xA7, 0x14]))
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_cached_build_matches_uncached(self):
+        source = os.path.join(self.directory, 'prog.asm')
+        with open(source, 'w', newline='') as f:
+            f.write("LOAD_CONST 0 1\x0cLOAD_CONST 1 2\r\nLOAD_CONST 2 3\n")
+        cache_dir = os.path.join(self.directory, 'cache')
+        outputs = []
+        for options in ([], ['--cache-dir', cache_dir], ['--cache-dir', cache_dir, '--memory-size', '64']):
+            binary = os.path.join(self.directory, 'out.bin')
+            result = subprocess.run(['python', 'assembler.py', source, binary] + options,
+                                    capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(binary, 'rb') as f:
+                outputs.append(f.read())
+        self.assertEqual(outputs, [outputs[0]] * 3)
+        self.assertEqual(len(outputs[0]), 10)
+        # Без оптимизации размер памяти не входит в ключ: третий запуск берёт запись второго
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_data_file_changes_key(self):
+        values = os.path.join(self.directory, 'vals.txt')
+        source = os.path.join(self.directory, 'prog.asm')
+        binary = os.path.join(self.directory, 'out.bin')
+        with open(source, 'w') as f:
+            f.write(f".data 0 @{values}\nREAD_MEM 0 1\n")
+        cache_dir = os.path.join(self.directory, 'cache')
+        outputs = []
+        for text in ("1 2\n", "3 4\n"):
+            with open(values, 'w') as f:
+                f.write(text)
+            result = subprocess.run([
+                'python', 'assembler.py', source, binary, '--container', '--cache-dir', cache_dir
+            ], capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(binary, 'rb') as f:
+                outputs.append(f.read())
+        # Изменённый файл данных собирается заново, а не берётся из кэша
+        self.assertNotEqual(outputs[0], outputs[1])
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
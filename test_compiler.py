@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import assembler
+import compiler
+import interpreter
+
+
+class TestCompiler(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def run_both(self, binary, memory_size=1024):
+        results = []
+        for program in (binary, compiler.compile_binary(binary, self.cache_dir)):
+            vm = interpreter.VM(memory_size=memory_size)
+            vm.load(program)
+            try:
+                vm.run()
+                error = None
+            except interpreter.VMError as e:
+                error = str(e)
+            results.append((vm.registers, vm.memory, error))
+        return results
+
+    def test_matches_loop_engine(self):
+        with open('input_program.txt') as f:
+            binary = assembler.assemble(f)
+        loop_result, compiled_result = self.run_both(binary)
+        self.assertEqual(loop_result, compiled_result)
+
+    def test_error_behavior(self):
+        sources = [
+            "LOAD_CONST 1 2000\nLOAD_CONST 0 9\nWRITE_MEM 0 1\n",
+            "LOAD_CONST 3 4\nREAD_MEM 5000 2\n",
+            "LOAD_CONST 3 4\nPOPCNT 1 70000\n",
+            "LOAD_CONST 3 4\nLOAD_CONST 1 1020\nWRITE_MEM 3 1\nPOPCNT_RANGE 1018 10\n",
+        ]
+        for source in sources:
+            loop_result, compiled_result = self.run_both(assembler.assemble(source))
+            self.assertIsNotNone(loop_result[2])
+            self.assertEqual(loop_result, compiled_result)
+
+        binary = assembler.assemble("LOAD_CONST 2 5\n") + bytes([99])
+        loop_result, compiled_result = self.run_both(binary)
+        self.assertIn("Unknown opcode at pc=5: 99", compiled_result[2])
+        self.assertEqual(loop_result, compiled_result)
+
+    def test_large_program_is_chunked(self):
+        source = "".join(f"LOAD_CONST {i % 8} {i}\nWRITE_MEM {i % 8} {i % 8}\n" for i in range(3 * compiler.CHUNK_SIZE))
+        loop_result, compiled_result = self.run_both(assembler.assemble(source))
+        self.assertEqual(loop_result, compiled_result)
+
+    def test_cache_hit_skips_compilation(self):
+        binary = assembler.assemble("LOAD_CONST 1 7\n")
+        first = compiler.compile_binary(binary, self.cache_dir)
+        self.assertFalse(first.from_cache)
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, first.digest + '.uvmc')))
+
+        with patch('compiler.generate_source', side_effect=AssertionError("should not recompile")):
+            second = compiler.compile_binary(binary, self.cache_dir)
+        self.assertTrue(second.from_cache)
+        registers = [0] * 8
+        second(registers, [0] * 16)
+        self.assertEqual(registers[1], 7)
+
+    def test_cli_engine(self):
+        with tempfile.NamedTemporaryFile(delete=False) as bin_f:
+            bin_f.write(assembler.assemble("LOAD_CONST 0 25\nLOAD_CONST 1 10\nWRITE_MEM 0 1\n"))
+        res_name = bin_f.name + '.json'
+        try:
+            result = subprocess.run([
+                'python', 'interpreter.py', bin_f.name, res_name, '9:12',
+                '--engine', 'compiled', '--cache-dir', self.cache_dir
+            ], capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(res_name) as f:
+                self.assertEqual(json.load(f), [0, 25, 0])
+        finally:
+            os.unlink(bin_f.name)
+            if os.path.exists(res_name):
+                os.unlink(res_name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+from array import array
+
+import assembler
+import container
+import interpreter
+
+SOURCE = (
+    "LOAD_CONST 0 5\n"
+    "LOAD_CONST 1 300\n"
+    "WRITE_MEM 0 1\n"
+    "POPCNT 2 300\n"
+    "READ_MEM 40 3\n"
+    "POPCNT_RANGE 10 4\n"
+)
+
+
+class TestContainer(unittest.TestCase):
+    def setUp(self):
+        self.code = assembler.assemble(SOURCE)
+
+    def test_round_trip(self):
+        data = container.pack(self.code, offsets=True)
+        self.assertTrue(container.is_container(data))
+        self.assertFalse(container.is_container(self.code))
+        header = container.unpack(data)
+        self.assertEqual(bytes(header.code), self.code)
+        self.assertEqual(header.instruction_count, 6)
+        self.assertEqual(header.max_address, 300)
+        self.assertEqual(header.memory_size, 301)
+        self.assertEqual(header.histogram, {interpreter.OP_LOAD_CONST: 2, interpreter.OP_WRITE_MEM: 1,
+                                            interpreter.OP_POPCNT: 1, interpreter.OP_READ_MEM: 1,
+                                            interpreter.OP_POPCNT_RANGE: 1})
+        program = interpreter.decode_program(self.code)
+        self.assertEqual(list(header.offsets), [0] + list(program.next_pc[:-1]))
+        self.assertIsNone(container.unpack(container.pack(self.code)).offsets)
+
+    def test_empty_program(self):
+        header = container.unpack(container.pack(b'', offsets=True))
+        self.assertEqual((header.instruction_count, header.max_address, header.memory_size), (0, None, 0))
+
+    def test_corruption_detected(self):
+        data = container.pack(self.code)
+        corrupted = bytearray(data)
+        corrupted[-1] ^= 1
+        with self.assertRaisesRegex(container.ContainerError, 'checksum'):
+            container.unpack(corrupted)
+        with self.assertRaisesRegex(container.ContainerError, 'size mismatch'):
+            container.unpack(data[:-2])
+        with self.assertRaisesRegex(container.ContainerError, 'truncated'):
+            container.unpack(data[:10])
+        future = bytearray(data)
+        struct.pack_into('<H', future, len(container.MAGIC), container.VERSION + 1)
+        with self.assertRaisesRegex(container.ContainerError, 'version'):
+            container.unpack(future)
+
+    def test_data_section(self):
+        segments = [(600, array('Q', [1, 2, 3])), (4, array('Q', [(1 << 64) - 1]))]
+        data = container.pack(self.code, offsets=True, data=segments)
+        header = container.unpack(data)
+        self.assertEqual(header.data, segments)
+        self.assertEqual(header.max_address, 602)
+        self.assertEqual(bytes(header.code), self.code)
+        with self.assertRaisesRegex(container.ContainerError, 'size mismatch'):
+            container.unpack(data[:-1])
+
+    def test_data_values_bound_addresses(self):
+        # Адрес WRITE_MEM прочитан из сегмента данных: оценка наибольшего адреса учитывает его значения
+        code = assembler.assemble("READ_MEM 0 1\nWRITE_MEM 0 1\n")
+        header = container.unpack(container.pack(code, data=[(0, array('Q', [700]))]))
+        self.assertEqual(header.max_address, 700)
+        # Память по оценке, зависящей от данных, не выделяется: только под сегменты данных
+        self.assertTrue(header.data_bound)
+        self.assertEqual(header.memory_size, 1)
+
+        # Оценка за пределами адресного пространства сохраняется как неизвестная
+        for value in (10 ** 11, (1 << 64) - 1):
+            header = container.unpack(container.pack(code, data=[(0, array('Q', [value]))]))
+            self.assertEqual((header.max_address, header.bounded, header.memory_size), (None, False, 1))
+        header = container.unpack(container.pack(assembler.assemble(f"POPCNT_RANGE {(1 << 32) - 1} 2\n")))
+        self.assertEqual((header.max_address, header.bounded, header.data_bound), (None, False, False))
+
+    def test_vm_copies_data(self):
+        data = container.pack(assembler.assemble("POPCNT 0 1\nWRITE_MEM 0 0\n"),
+                              data=[(0, array('Q', [5, 255])), (14, array('Q', [9, 9]))])
+        for model in ('flat', 'paged'):
+            vm = interpreter.VM(memory_size=16, memory_model=model)
+            vm.load(data).run()
+            self.assertEqual(vm.memory[0:16], [5, 8] + [0] * 6 + [8] + [0] * 5 + [9, 9])
+            # reset() заново копирует сегменты данных загруженной программы
+            vm.reset()
+            self.assertEqual(vm.memory[0:2], [5, 255])
+        with self.assertRaisesRegex(interpreter.VMError, 'Data segment'):
+            interpreter.VM(memory_size=15).load(data)
+
+    def test_unknown_opcode_rejected(self):
+        with self.assertRaises(container.ContainerError):
+            container.pack(self.code + b'\x7f')
+
+    def test_vm_accepts_container_and_raw(self):
+        states = []
+        for binary in (self.code, container.pack(self.code)):
+            for decode in (True, False):
+                vm = interpreter.VM()
+                states.append(vm.load(binary, decode=decode).run())
+                self.assertEqual(vm.header is not None, binary is not self.code)
+        self.assertTrue(all(state == states[0] for state in states))
+
+    def test_cli(self):
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as tmp:
+            source_path = os.path.join(tmp, 'program.asm')
+            binary_path = os.path.join(tmp, 'program.bin')
+            result_path = os.path.join(tmp, 'result.json')
+            with open(source_path, 'w') as f:
+                f.write("LOAD_CONST 0 7\nLOAD_CONST 1 2000\nWRITE_MEM 0 1\n")
+            subprocess.run([sys.executable, 'assembler.py', source_path, binary_path, '--container', '--offsets'],
+                           check=True, cwd=cwd)
+
+            # Память выделяется по наибольшему адресу из заголовка
+            subprocess.run([sys.executable, 'interpreter.py', binary_path, result_path, '2000:2001'],
+                           check=True, cwd=cwd)
+            with open(result_path) as f:
+                self.assertEqual(json.load(f), [7])
+
+            # Явный --memory-size имеет приоритет
+            result = subprocess.run([sys.executable, 'interpreter.py', binary_path, result_path, '0:1',
+                                     '--memory-size', '1024'], capture_output=True, text=True, cwd=cwd)
+            self.assertEqual(result.returncode, 1)
+            self.assertIn('out of bounds', result.stderr)
+
+            # Слишком большой адрес в заголовке не увеличивает память: выход за границы сообщается при исполнении
+            with open(source_path, 'w') as f:
+                f.write("READ_MEM 4000000000 0\n")
+            subprocess.run([sys.executable, 'assembler.py', source_path, binary_path, '--container'],
+                           check=True, cwd=cwd)
+            result = subprocess.run([sys.executable, 'interpreter.py', binary_path, result_path, '0:1'],
+                                    capture_output=True, text=True, cwd=cwd)
+            self.assertEqual(result.returncode, 1)
+            self.assertEqual(result.stderr.strip(), 'Memory read error: Address 4000000000 out of bounds.')
+
+            # Сегменты данных: директивы .data, сборка в контейнер и вывод дизассемблером
+            with open(source_path, 'w') as f:
+                f.write(".data 3000 4 5 6\nREAD_MEM 3001 0\nLOAD_CONST 1 0\nWRITE_MEM 0 1\n")
+            subprocess.run([sys.executable, 'assembler.py', source_path, binary_path, '--container'],
+                           check=True, cwd=cwd)
+            subprocess.run([sys.executable, 'interpreter.py', binary_path, result_path, '0:1,3000:3003',
+                            '--format', 'compact'], check=True, cwd=cwd)
+            with open(result_path) as f:
+                self.assertEqual(json.load(f), {'0:1': [5], '3000:3003': [4, 5, 6]})
+            result = subprocess.run([sys.executable, 'disassembler.py', binary_path], capture_output=True,
+                                    text=True, check=True, cwd=cwd)
+            self.assertEqual(result.stdout.splitlines()[0], '.data 3000 4 5 6')
+
+            with open(binary_path, 'r+b') as f:
+                f.seek(-1, os.SEEK_END)
+                f.write(b'\xff')
+            result = subprocess.run([sys.executable, 'interpreter.py', binary_path, result_path, '0:1', '--mmap'],
+                                    capture_output=True, text=True, cwd=cwd)
+            self.assertEqual(result.returncode, 1)
+            self.assertIn('checksum mismatch', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
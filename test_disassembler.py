@@ -0,0 +1,47 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+import assembler
+import disassembler
+import offset_index
+
+SOURCE = (
+    "LOAD_CONST 6 632\n"
+    "WRITE_MEM 1 5\n"
+    "READ_MEM 100 2\n"
+    "POPCNT 3 7\n"
+    "POPCNT_RANGE 10 4\n"
+)
+
+
+class TestDisassembler(unittest.TestCase):
+    def setUp(self):
+        self.binary = assembler.assemble(SOURCE)
+
+    def test_round_trip(self):
+        lines = [disassembler.format_instruction(*i) for i in disassembler.disassemble(self.binary)]
+        self.assertEqual('\n'.join(lines) + '\n', SOURCE)
+
+    def test_seek_with_and_without_index(self):
+        index = offset_index.build_index(self.binary)
+        for used in (index, None):
+            self.assertEqual(list(disassembler.disassemble(self.binary, 2, 2, used)),
+                             [(2, 7, 'READ_MEM', 100, 2), (3, 13, 'POPCNT', 3, 7)])
+        self.assertEqual(list(disassembler.disassemble(self.binary, 10, None, index)), [])
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'program.bin')
+            with open(path, 'wb') as f:
+                f.write(self.binary)
+            result = subprocess.run(['python', 'disassembler.py', path, '--start', '4', '--addresses',
+                                     '--save-index'], capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(result.stdout.split(), ['POPCNT_RANGE', '10', '4', '#', '4', '@', '0x13'])
+            self.assertTrue(os.path.exists(offset_index.index_path(path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,8 @@ import subprocess
 import tempfile
 import os
 import json
+import assembler
+import interpreter
 
 class TestFullSystem(unittest.TestCase):
     def test_full_assembly_and_execution(self):
@@ -87,5 +89,20 @@ class TestFullSystem(unittest.TestCase):
             os.unlink(log_name)
             os.unlink(res_name)
 
+    def test_in_process_assembly_and_execution(self):
+        # Тот же сценарий, но без подпроцессов и промежуточных файлов
+        binary = assembler.assemble(
+            "LOAD_CONST 0 25\n"
+            "LOAD_CONST 1 10\n"
+            "WRITE_MEM 0 1\n"
+            "READ_MEM 10 2\n"
+            "POPCNT 2 3\n"
+        )
+        state = interpreter.VM().load(binary).run()
+        expected_memory = [0] * 15
+        expected_memory[10] = 25
+        self.assertEqual(state['memory'][0:15], expected_memory)
+        self.assertEqual(state['registers'][:3], [25, 10, 0])
+
 if __name__ == '__main__':
     unittest.main()
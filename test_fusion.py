@@ -0,0 +1,87 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+import assembler
+import bench
+import fusion
+import interpreter
+
+
+class TestFusion(unittest.TestCase):
+    def run_program(self, binary, fuse, memory_size=1024):
+        vm = interpreter.VM(memory_size=memory_size)
+        vm.load(binary, fuse=fuse).run()
+        return vm.registers, vm.memory
+
+    def test_report(self):
+        binary = assembler.assemble(
+            "LOAD_CONST 0 5\n"
+            "WRITE_MEM 1 0\n"
+            "POPCNT 2 3\n"
+            "WRITE_MEM 2 0\n"
+            "READ_MEM 3 4\n"
+            "WRITE_MEM 3 0\n"
+            "LOAD_CONST 1 7\n"
+        )
+        program = fusion.fuse(interpreter.decode_program(binary))
+        self.assertTrue(program.fused)
+        self.assertEqual(list(program.ops), [interpreter.OP_FUSED_LOAD_WRITE, interpreter.OP_FUSED_POPCNT_WRITE,
+                                             interpreter.OP_READ_MEM, interpreter.OP_WRITE_MEM,
+                                             interpreter.OP_LOAD_CONST])
+        report = program.report
+        self.assertEqual((report.instructions_before, report.instructions_after), (7, 5))
+        self.assertEqual(report.fusions, {'LOAD_CONST+WRITE_MEM': 1, 'POPCNT+WRITE_MEM': 1})
+        self.assertEqual(report.dispatches_saved, 2)
+        self.assertEqual(program.next_pc[-1], len(binary))
+
+    def test_generated_programs_match_unfused(self):
+        for seed in range(5):
+            binary = assembler.assemble(bench.generate_program(2000, memory_size=256, seed=seed))
+            self.assertEqual(self.run_program(binary, True, 256), self.run_program(binary, False, 256))
+
+    def test_same_registers_in_pair(self):
+        # Регистр, записанный первой командой, используется как адрес и как значение в WRITE_MEM
+        binary = assembler.assemble("LOAD_CONST 0 9\nWRITE_MEM 0 0\nPOPCNT 1 9\nWRITE_MEM 1 1\n")
+        self.assertEqual(self.run_program(binary, True, 16), self.run_program(binary, False, 16))
+
+    def test_errors_match_unfused(self):
+        for source in ("LOAD_CONST 0 100\nWRITE_MEM 1 0\n", "POPCNT 0 100\nWRITE_MEM 1 0\n",
+                       "LOAD_CONST 1 70\nPOPCNT 0 1\nWRITE_MEM 0 1\n"):
+            binary = assembler.assemble(source)
+            messages = []
+            for fuse in (False, True):
+                with self.assertRaises(interpreter.VMError) as ctx:
+                    self.run_program(binary, fuse, 16)
+                messages.append(str(ctx.exception))
+            self.assertEqual(messages[0], messages[1])
+
+    def test_stop_rejected(self):
+        vm = interpreter.VM(memory_size=16)
+        vm.load(assembler.assemble("LOAD_CONST 0 1\nWRITE_MEM 0 0\n"), fuse=True)
+        with self.assertRaises(interpreter.VMError):
+            vm.run(stop=1)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            binary_path = os.path.join(tmp, 'program.bin')
+            with open(binary_path, 'wb') as f:
+                f.write(assembler.assemble("LOAD_CONST 0 5\nWRITE_MEM 0 0\n"))
+            result = subprocess.run(
+                ['python', 'interpreter.py', binary_path, os.path.join(tmp, 'result.json'), '0:8', '--fuse'],
+                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn('LOAD_CONST+WRITE_MEM: 1 fused', result.stdout)
+
+            # Номера команд снимка относятся к исходной программе
+            result = subprocess.run(
+                ['python', 'interpreter.py', binary_path, os.path.join(tmp, 'result.json'), '0:8', '--fuse',
+                 '--resume', os.path.join(tmp, 'state.snap')],
+                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            self.assertEqual(result.returncode, 2)
+            self.assertIn('--resume', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import random
+import subprocess
+import tempfile
+import unittest
+
+import assembler
+import bench
+import incremental
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.binary_path = os.path.join(self.tmp.name, 'program.bin')
+        self.lines = bench.generate_program(300, seed=2) + ['# конец']
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, lines):
+        source = ('\n'.join(lines) + '\n').encode('utf-8')
+        summary = incremental.reassemble(source, self.binary_path)
+        with open(self.binary_path, 'rb') as f:
+            self.assertEqual(f.read(), assembler.assemble(source.decode('utf-8')))
+        return summary
+
+    def test_modes(self):
+        self.assertEqual(self.build(self.lines)['mode'], 'full')
+        self.assertEqual(self.build(self.lines)['mode'], 'unchanged')
+
+        self.lines[10] = 'LOAD_CONST 1 99'
+        self.lines[11] = 'LOAD_CONST 2 98'
+        self.lines[12] = 'LOAD_CONST 3 97'
+        self.build(self.lines)
+        self.lines[10] = 'LOAD_CONST 5 12345'
+        summary = self.build(self.lines)
+        self.assertEqual((summary['mode'], summary['lines_encoded']), ('patch', 1))
+
+        self.lines[11] = 'WRITE_MEM 1 2'
+        self.assertEqual(self.build(self.lines)['mode'], 'splice')
+
+        self.lines[50:50] = ['', 'POPCNT 1 2', 'READ_MEM 7 3']
+        summary = self.build(self.lines)
+        self.assertEqual(summary['mode'], 'splice')
+        self.assertLess(summary['lines_encoded'], 10)
+
+    def test_random_edits(self):
+        rng = random.Random(5)
+        pool = bench.generate_program(50, {'LOAD_CONST': 1, 'WRITE_MEM': 1, 'POPCNT': 1, 'READ_MEM': 1}, seed=9)
+        self.build(self.lines)
+        for _ in range(40):
+            action = rng.randrange(3)
+            position = rng.randrange(len(self.lines))
+            if action == 0:
+                self.lines[position] = rng.choice(pool)
+            elif action == 1:
+                self.lines.insert(position, rng.choice(pool + ['', '# комментарий']))
+            elif len(self.lines) > 1:
+                del self.lines[position]
+            self.build(self.lines)
+
+    def test_external_change_forces_full_build(self):
+        self.build(self.lines)
+        with open(self.binary_path, 'ab') as f:
+            f.write(b'\x0a')
+        self.assertEqual(self.build(self.lines)['mode'], 'full')
+
+    def test_error_leaves_files_untouched(self):
+        self.build(self.lines)
+        with open(self.binary_path, 'rb') as f:
+            before = f.read()
+        self.lines[20] = 'LOAD_CONST 9 1'
+        with self.assertRaises(assembler.AssemblerError) as cm:
+            self.build(self.lines)
+        self.assertEqual(cm.exception.line_number, 21)
+        with open(self.binary_path, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.lines[20] = 'LOAD_CONST 1 1'
+        self.assertEqual(self.build(self.lines)['mode'], 'patch')
+
+    def test_line_offset(self):
+        self.build(['# заголовок', 'LOAD_CONST 0 1', 'WRITE_MEM 0 1'])
+        index = incremental._load_index(self.binary_path)
+        self.assertEqual(index.line_offset(1), (0, 0))
+        self.assertEqual(index.line_offset(2), (0, 5))
+        self.assertEqual(index.line_offset(3), (5, 2))
+
+    def test_cli(self):
+        source_path = os.path.join(self.tmp.name, 'program.asm')
+        with open(source_path, 'w') as f:
+            f.write('\n'.join(self.lines))
+        result = subprocess.run(['python', 'assembler.py', source_path, self.binary_path, '--incremental'],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('full', result.stdout)
+        self.assertTrue(os.path.exists(incremental.index_path(self.binary_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,19 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 from unittest.mock import mock_open, patch
 from io import StringIO
+import assembler
+import bench
 import interpreter
+import machine
 
 
 class TestUVMInterpreter(unittest.TestCase):
 
-    @patch('interpreter.open', new_callable=mock_open)
+    @patch('machine.open', new_callable=mock_open)
     @patch('interpreter.sys.argv', ['interpreter.py', 'binary.bin', 'result.json', '0:10'])
     def test_load_const(self, mock_file):
         # Подготовка бинарных данных для LOAD_CONST
@@ -25,7 +32,7 @@ class TestUVMInterpreter(unittest.TestCase):
                 expected_result = [0] * 10  # Поскольку LOAD_CONST не изменяет память
                 mock_json_dump.assert_called_once_with(expected_result, m(), indent=2)
 
-    @patch('interpreter.open', new_callable=mock_open)
+    @patch('machine.open', new_callable=mock_open)
     @patch('interpreter.sys.argv', ['interpreter.py', 'binary.bin', 'result.json', '0:10'])
     def test_read_write_mem(self, mock_file):
         # Подготовка бинарных данных для:
@@ -76,7 +83,7 @@ class TestUVMInterpreter(unittest.TestCase):
                 expected_result = [0] * 10
                 mock_json_dump.assert_called_once_with(expected_result, m(), indent=2)
 
-    @patch('interpreter.open', new_callable=mock_open)
+    @patch('machine.open', new_callable=mock_open)
     @patch('interpreter.sys.argv', ['interpreter.py', 'binary.bin', 'result.json', '0:10'])
     def test_popcnt(self, mock_file):
         # Подготовка бинарных данных для:
@@ -106,7 +113,7 @@ class TestUVMInterpreter(unittest.TestCase):
                 expected_result = [0] * 10
                 mock_json_dump.assert_called_once_with(expected_result, m(), indent=2)
 
-    @patch('interpreter.open', new_callable=mock_open)
+    @patch('machine.open', new_callable=mock_open)
     @patch('interpreter.sys.argv', ['interpreter.py', 'binary.bin', 'result.json', '0:10'])
     def test_unknown_opcode(self, mock_file):
         # Подготовка бинарных данных с неизвестным opcode=99
@@ -119,7 +126,7 @@ class TestUVMInterpreter(unittest.TestCase):
             self.assertNotEqual(cm.exception.code, 0)
             self.assertIn("Unknown opcode", mock_stderr.getvalue())
 
-    @patch('interpreter.open', new_callable=mock_open)
+    @patch('machine.open', new_callable=mock_open)
     @patch('interpreter.sys.argv', ['interpreter.py', 'binary.bin', 'result.json', '1000:2000'])
     def test_invalid_memory_range(self, mock_file):
         # Подготовка пустых бинарных данных
@@ -132,7 +139,7 @@ class TestUVMInterpreter(unittest.TestCase):
             self.assertNotEqual(cm.exception.code, 0)
             self.assertIn("Memory range out of bounds", mock_stderr.getvalue())
 
-    @patch('interpreter.open', new_callable=mock_open)
+    @patch('machine.open', new_callable=mock_open)
     @patch('interpreter.sys.argv', ['interpreter.py', 'binary.bin', 'result.json', '0:10'])
     def test_memory_address_out_of_bounds_read(self, mock_file):
         # Подготовка бинарных данных для READ_MEM с адресом вне диапазона
@@ -149,7 +156,7 @@ class TestUVMInterpreter(unittest.TestCase):
             self.assertNotEqual(cm.exception.code, 0)
             self.assertIn("Memory read error", mock_stderr.getvalue())
 
-    @patch('interpreter.open', new_callable=mock_open)
+    @patch('machine.open', new_callable=mock_open)
     @patch('interpreter.sys.argv', ['interpreter.py', 'binary.bin', 'result.json', '0:10'])
     def test_memory_address_out_of_bounds_write(self, mock_file):
         # Подготовка бинарных данных для:
@@ -178,5 +185,183 @@ class TestUVMInterpreter(unittest.TestCase):
             self.assertNotEqual(cm.exception.code, 0)
             self.assertIn("Memory write error", mock_stderr.getvalue())
 
+class TestDecodedProgram(unittest.TestCase):
+
+    def test_decode_columns(self):
+        # LOAD_CONST рег 1 = 5, затем WRITE_MEM B=1, C=1
+        load_const = (10 + (1 << 7) + (5 << 10)).to_bytes(5, byteorder='little')
+        write_mem = (39 + (1 << 7) + (1 << 10)).to_bytes(2, byteorder='little')
+        program = interpreter.decode_program(load_const + write_mem)
+
+        self.assertEqual(list(program.ops), [10, 39])
+        self.assertEqual(list(program.b), [1, 1])
+        self.assertEqual(list(program.c), [5, 1])
+        self.assertEqual(list(program.next_pc), [5, 7])
+        self.assertIsNone(program.error)
+
+    def test_decoded_program_is_reusable(self):
+        load_const = (10 + (1 << 7) + (5 << 10)).to_bytes(5, byteorder='little')
+        write_mem = (39 + (1 << 7) + (1 << 10)).to_bytes(2, byteorder='little')
+        program = interpreter.decode_program(load_const + write_mem)
+
+        for _ in range(2):
+            registers = [0] * 8
+            memory = [0] * 16
+            interpreter.execute(program, registers, memory)
+            self.assertEqual(registers[1], 5)
+            self.assertEqual(memory[5], 5)
+
+    def test_unknown_opcode_after_valid_instructions(self):
+        load_const = (10 + (1 << 7) + (5 << 10)).to_bytes(5, byteorder='little')
+        program = interpreter.decode_program(load_const + bytes([99]))
+        self.assertEqual(program.error, (5, 99))
+
+        registers = [0] * 8
+        with self.assertRaises(interpreter.VMError) as cm:
+            interpreter.execute(program, registers, [0] * 16)
+        self.assertIn("Unknown opcode at pc=5: 99", str(cm.exception))
+        self.assertEqual(registers[1], 5)
+
+    def test_matches_per_instruction_decoding(self):
+        # Эталон — разбор по одной команде через DECODE_TABLE; маленькие фрагменты проверяют их границы
+        binary = assembler.assemble(bench.generate_program(3000, memory_size=256, seed=4)) + bytes([99, 10])
+        expected = ([], [], [], [])
+        pc = 0
+        while machine.DECODE_TABLE[binary[pc] & 0x7F] is not None:
+            size, read, b_shift, b_mask, c_shift, c_mask = machine.DECODE_TABLE[binary[pc] & 0x7F]
+            instr = read(binary, pc)
+            for column, value in zip(expected, (binary[pc] & 0x7F, (instr >> b_shift) & b_mask,
+                                                (instr >> c_shift) & c_mask, pc + size)):
+                column.append(value)
+            pc += size
+        for chunk in (machine.TOKEN_CHUNK_BYTES, 61):
+            with patch.object(machine, 'TOKEN_CHUNK_BYTES', chunk):
+                program = interpreter.decode_program(memoryview(binary))
+            self.assertEqual((list(program.ops), list(program.b), list(program.c), list(program.next_pc)),
+                             expected)
+            self.assertEqual(program.error, (pc, 99))
+
+            registers, memory = [0] * 8, [0] * 256
+            with patch.object(machine, 'TOKEN_CHUNK_BYTES', chunk), \
+                    self.assertRaisesRegex(interpreter.VMError, f"Unknown opcode at pc={pc}: 99"):
+                interpreter.execute_buffer(binary, registers, memory)
+            decoded_registers, decoded_memory = [0] * 8, [0] * 256
+            with self.assertRaises(interpreter.VMError):
+                interpreter.execute(program, decoded_registers, decoded_memory)
+            self.assertEqual((registers, memory), (decoded_registers, decoded_memory))
+
+
+class TestVM(unittest.TestCase):
+
+    def test_library_modules_do_not_import_cli(self):
+        # Модули библиотеки импортируют machine и assembly, а не интерфейсы командной строки
+        code = ('import sys, batch, compiler, container, fusion, incremental, offset_index, profiler, scheduler, '
+                'service, verifier; print(sorted({"interpreter", "assembler"} & set(sys.modules)))')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_run_returns_state(self):
+        load_const = (10 + (1 << 7) + (5 << 10)).to_bytes(5, byteorder='little')
+        write_mem = (39 + (1 << 7) + (1 << 10)).to_bytes(2, byteorder='little')
+        vm = interpreter.VM()
+        state = vm.load(bytearray(load_const + write_mem)).run()
+
+        self.assertEqual(state['registers'][1], 5)
+        self.assertEqual(state['memory'][5], 5)
+        self.assertEqual(len(state['memory']), 1024)
+        self.assertEqual(vm.read_memory(4, 6), [0, 5])
+
+    def test_shared_decoded_program_and_reset(self):
+        load_const = (10 + (1 << 7) + (5 << 10)).to_bytes(5, byteorder='little')
+        program = interpreter.decode_program(load_const)
+        vm = interpreter.VM(memory_size=8)
+        vm.load(program).run()
+        vm.reset()
+        self.assertEqual(vm.registers, [0] * 8)
+        self.assertIs(vm.program, program)
+        self.assertEqual(vm.run()['registers'][1], 5)
+
+    def test_run_errors(self):
+        with self.assertRaises(interpreter.VMError):
+            interpreter.VM().run()
+        read_mem = (54 + (2000 << 7)).to_bytes(6, byteorder='little')
+        with self.assertRaises(interpreter.VMError) as cm:
+            interpreter.VM().load(read_mem).run()
+        self.assertIn("Memory read error", str(cm.exception))
+
+
+class TestBufferExecution(unittest.TestCase):
+
+    def setUp(self):
+        load_const = (10 + (1 << 7) + (5 << 10)).to_bytes(5, byteorder='little')
+        write_mem = (39 + (1 << 7) + (1 << 10)).to_bytes(2, byteorder='little')
+        popcnt = (18 + (2 << 7) + (5 << 10)).to_bytes(6, byteorder='little')
+        self.binary = load_const + write_mem + popcnt
+
+    def test_execute_buffer_matches_decoded(self):
+        expected = interpreter.VM().load(self.binary).run()
+        for buffer in (self.binary, memoryview(self.binary), bytearray(self.binary)):
+            vm = interpreter.VM()
+            self.assertEqual(vm.load(buffer, decode=False).run(), expected)
+        self.assertEqual(expected['registers'][2], 2)
+
+    def test_truncated_instruction_is_zero_padded(self):
+        # Последняя команда обрезана: недостающие старшие байты считаются нулями, как и раньше
+        program = interpreter.decode_program(self.binary[:-3])
+        self.assertEqual(list(program.c), [5, 1, 5])
+
+    def test_mmap_loading(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(self.binary)
+        try:
+            with interpreter.open_binary(f.name, use_mmap=True) as code:
+                state = interpreter.VM().load(code, decode=False).run()
+            self.assertEqual(state['memory'][5], 2)
+        finally:
+            os.unlink(f.name)
+
+    def test_mmap_empty_file(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            pass
+        try:
+            with interpreter.open_binary(f.name, use_mmap=True) as code:
+                self.assertEqual(len(code), 0)
+        finally:
+            os.unlink(f.name)
+
+
+class TestPopcntRange(unittest.TestCase):
+
+    def setUp(self):
+        self.init = "".join(f"LOAD_CONST 0 {v}\nLOAD_CONST 1 {i}\nWRITE_MEM 0 1\n"
+                            for i, v in enumerate([3, 7, 15, 31, 63, 127, 255, 511]))
+
+    def test_encoding(self):
+        binary = assembler.assemble("POPCNT_RANGE 1000 8\n")
+        self.assertEqual(len(binary), 8)
+        self.assertEqual(int.from_bytes(binary, byteorder='little'), 45 | (1000 << 7) | (8 << 39))
+
+    def test_same_as_repeated_popcnt(self):
+        repeated = interpreter.VM().load(assembler.assemble(
+            self.init + "".join(f"POPCNT 7 {i}\n" for i in range(2, 6)))).run()
+        block = interpreter.VM().load(assembler.assemble(self.init + "POPCNT_RANGE 2 4\n")).run()
+        self.assertEqual(block['memory'], repeated['memory'])
+        self.assertEqual(block['memory'][:8], [3, 7, 4, 5, 6, 7, 255, 511])
+
+    def test_out_of_bounds_processes_prefix(self):
+        vm = interpreter.VM(memory_size=6)
+        vm.load(assembler.assemble(self.init.split("LOAD_CONST 0 127")[0] + "POPCNT_RANGE 4 10\n"))
+        with self.assertRaises(interpreter.VMError) as cm:
+            vm.run()
+        self.assertEqual(str(cm.exception), "Memory popcnt error: Address 6 out of bounds.")
+        self.assertEqual(vm.memory, [3, 7, 15, 31, 6, 0])
+
+    def test_paged_memory(self):
+        vm = interpreter.VM(memory_model='paged', page_size=4)
+        state = vm.load(assembler.assemble(self.init + "POPCNT_RANGE 0 16000000\n")).run()
+        self.assertEqual(state['memory'][0:8], [2, 3, 4, 5, 6, 7, 8, 9])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import isa
+import interpreter
+
+
+class TestISA(unittest.TestCase):
+    def test_encoders_match_decode_table(self):
+        # Каждое значение, закодированное ассемблером, должно декодироваться интерпретатором обратно
+        for spec in isa.ISA:
+            opcode, encode = isa.ENCODERS[spec.mnemonic]
+            b_max = (1 << spec.b.width) - 1
+            c_max = (1 << spec.c.width) - 1
+            binary = encode(b_max, c_max)
+            self.assertEqual(len(binary), spec.size)
+
+            program = interpreter.decode_program(binary)
+            self.assertEqual(list(program.ops), [opcode])
+            self.assertEqual(list(program.b), [b_max])
+            self.assertEqual(list(program.c), [c_max])
+
+    def test_fields_fit_instruction_size(self):
+        for spec in isa.ISA:
+            for field in (spec.b, spec.c):
+                self.assertLessEqual(field.offset + field.width, spec.size * 8, spec.mnemonic)
+            self.assertIs(isa.BY_OPCODE[spec.opcode], spec)
+
+    def test_range_check_message(self):
+        _, encode = isa.ENCODERS['POPCNT']
+        with self.assertRaises(ValueError) as cm:
+            encode(1, 1 << 32)
+        self.assertEqual(str(cm.exception), "Field C=4294967296 out of range for POPCNT (0-4294967295)")
+
+
+if __name__ == '__main__':
+    unittest.main()
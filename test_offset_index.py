@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+import assembler
+import bench
+import interpreter
+import offset_index
+
+
+class TestOffsetIndex(unittest.TestCase):
+    def setUp(self):
+        mix = {'LOAD_CONST': 2, 'WRITE_MEM': 2, 'READ_MEM': 1, 'POPCNT': 1, 'POPCNT_RANGE': 1}
+        self.binary = assembler.assemble('\n'.join(bench.generate_program(1000, mix, seed=4)))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'program.bin')
+        with open(self.path, 'wb') as f:
+            f.write(self.binary)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_offsets_match_decoder(self):
+        index = offset_index.build_index(self.binary)
+        program = interpreter.decode_program(self.binary)
+        self.assertEqual(index.offsets.typecode, 'I')
+        self.assertEqual(len(index), len(program))
+        self.assertEqual(list(index.offsets[1:]), list(program.next_pc))
+        self.assertEqual(index.offset(0), 0)
+        with self.assertRaises(IndexError):
+            index.offset(len(index))
+
+    def test_unknown_opcode(self):
+        index = offset_index.build_index(bytes([0xA7, 0x14, 0x7F, 0x00]))
+        self.assertEqual((len(index), index.error), (1, (2, 0x7F)))
+
+    def test_persist_and_invalidate(self):
+        saved = offset_index.load_index(self.path, save=True)
+        loaded = offset_index.load_index(self.path, build=False)
+        self.assertEqual(loaded.offsets, saved.offsets)
+        with open(self.path, 'ab') as f:
+            f.write(bytes([0xA7, 0x14]))
+        self.assertIsNone(offset_index.load_index(self.path, build=False))
+        self.assertEqual(len(offset_index.load_index(self.path)), len(saved) + 1)
+
+    def test_decode_parallel(self):
+        expected = interpreter.decode_program(self.binary)
+        for jobs in (1, 3):
+            program = offset_index.decode_parallel(self.path, jobs=jobs, chunk_instructions=97)
+            self.assertEqual((program.ops, program.b, program.c, program.next_pc, program.error),
+                             (expected.ops, expected.b, expected.c, expected.next_pc, expected.error))
+
+    def test_decode_parallel_keeps_error(self):
+        with open(self.path, 'ab') as f:
+            f.write(bytes([0x7F]))
+        program = offset_index.decode_parallel(self.path, jobs=2, chunk_instructions=100)
+        self.assertEqual(program.error, (len(self.binary), 0x7F))
+        with self.assertRaises(interpreter.VMError):
+            interpreter.VM().load(program).run()
+
+
+if __name__ == '__main__':
+    unittest.main()
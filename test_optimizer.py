@@ -0,0 +1,94 @@
+import random
+import unittest
+
+import assembler
+import interpreter
+import optimizer
+
+
+def run(instructions, image=(), memory_size=64):
+    binary, _ = optimizer.encode(instructions)
+    vm = interpreter.VM(memory_size=memory_size)
+    vm.load(binary)
+    vm.memory[:len(image)] = image
+    try:
+        vm.run()
+        error = None
+    except interpreter.VMError as e:
+        error = str(e)
+    return vm.registers, vm.memory, error
+
+
+def random_program(rng, length):
+    instructions = []
+    for _ in range(length):
+        kind = rng.randrange(5)
+        if kind == 0:
+            instructions.append((optimizer.OP_LOAD_CONST, rng.randrange(8), rng.randrange(8)))
+        elif kind == 1:
+            instructions.append((optimizer.OP_READ_MEM, rng.randrange(8), rng.randrange(8)))
+        elif kind == 2:
+            instructions.append((optimizer.OP_WRITE_MEM, rng.randrange(8), rng.randrange(8)))
+        elif kind == 3:
+            instructions.append((optimizer.OP_POPCNT, rng.randrange(8), rng.randrange(8)))
+        else:
+            instructions.append((optimizer.OP_POPCNT_RANGE, rng.randrange(8), rng.randrange(4)))
+    return instructions
+
+
+class TestOptimizer(unittest.TestCase):
+    def load(self, source):
+        log_entries = []
+        assembler.assemble(source, log_entries)
+        return [(e['A'], e['B'], e['C']) for e in log_entries]
+
+    def test_input_program(self):
+        with open('input_program.txt') as f:
+            instructions = self.load(f)
+        optimized, report = optimizer.optimize(instructions, level=2, memory_size=1024)
+        self.assertLess(report.bytes_after, report.bytes_before)
+        self.assertEqual(report.instructions_after, len(optimized))
+        self.assertIsNone(report.stopped_at)
+        self.assertEqual(run(optimized, memory_size=1024), run(instructions, memory_size=1024))
+
+    def test_dead_and_redundant_instructions(self):
+        instructions = self.load(
+            "LOAD_CONST 0 5\n"
+            "LOAD_CONST 0 6\n"   # первая загрузка в регистр 0 мертва
+            "LOAD_CONST 1 3\n"
+            "WRITE_MEM 0 1\n"    # перезаписывается следующей записью по тому же адресу
+            "WRITE_MEM 1 1\n"
+            "LOAD_CONST 1 3\n"   # регистр уже содержит 3
+        )
+        optimized, report = optimizer.optimize(instructions, level=1, memory_size=64)
+        self.assertEqual(optimized, self.load("LOAD_CONST 0 6\nLOAD_CONST 1 3\nWRITE_MEM 1 1\n"))
+        self.assertEqual(report.instructions_before - report.instructions_after, 3)
+
+    def test_unprovable_access_stops_optimization(self):
+        instructions = self.load(
+            "LOAD_CONST 2 1\n"
+            "LOAD_CONST 2 1\n"
+            "READ_MEM 0 1\n"
+            "WRITE_MEM 2 1\n"    # адрес зависит от памяти — дальше оптимизировать нельзя
+            "LOAD_CONST 2 1\n"
+        )
+        optimized, report = optimizer.optimize(instructions, level=1, memory_size=64)
+        self.assertEqual(report.stopped_at, "instruction 3: WRITE_MEM address unknown")
+        self.assertEqual(optimized, instructions[1:])
+        self.assertIn("Stopped at possible out-of-bounds access", optimizer.format_report(report))
+
+    def test_random_programs_are_equivalent(self):
+        rng = random.Random(1234)
+        for _ in range(300):
+            instructions = random_program(rng, rng.randrange(1, 40))
+            optimized, _ = optimizer.optimize(instructions, level=2, memory_size=64)
+            self.assertEqual(run(optimized), run(instructions))
+
+            # Уровень 1 не зависит от начального содержимого памяти
+            image = [rng.randrange(16) for _ in range(8)]
+            optimized, _ = optimizer.optimize(instructions, level=1, memory_size=64)
+            self.assertEqual(run(optimized, image), run(instructions, image))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import assembler
+import interpreter
+from paged_memory import PagedMemory, make_memory
+
+
+class TestPagedMemory(unittest.TestCase):
+    def test_sparse_access(self):
+        memory = PagedMemory(page_size=16)
+        self.assertEqual(len(memory), 1 << 32)
+        self.assertEqual(memory[(1 << 32) - 1], 0)
+        memory[5] = 7
+        memory[(1 << 32) - 1] = 9
+        memory[1000] = 0  # запись нуля не выделяет страницу
+        self.assertEqual(memory[5], 7)
+        self.assertEqual(memory[(1 << 32) - 1], 9)
+        self.assertEqual(memory.populated_pages(), [0, ((1 << 32) - 1) // 16])
+        self.assertEqual(memory[4:7], [0, 7, 0])
+
+    def test_dump_only_populated_pages(self):
+        memory = PagedMemory(page_size=4)
+        memory[1] = 1
+        memory[9] = 2
+        self.assertEqual(memory.dump(2, 10), {'2': [0, 0], '8': [0, 2]})
+        # Чтение, выгрузка и перебор короткого диапазона не сортируют все выделенные страницы
+        memory[400] = memory[800] = 3
+        with patch.object(PagedMemory, 'populated_pages', side_effect=AssertionError):
+            self.assertEqual(memory[0:10], [0, 1, 0, 0, 0, 0, 0, 0, 0, 2])
+            self.assertEqual(list(memory.iter_nonzero(0, 10)), [(1, 1), (9, 2)])
+            self.assertEqual(memory.dump(0, 4), {'0': [0, 1, 0, 0]})
+
+    def test_copy_is_independent(self):
+        memory = PagedMemory(page_size=4)
+        memory[1] = 1
+        other = memory.copy()
+        memory[1] = 5
+        self.assertEqual(other[1], 1)
+
+    def test_bulk_write(self):
+        memory = PagedMemory(page_size=4)
+        memory.write(2, [1, 2, 0, 0, 0, 0, 3])
+        self.assertEqual(memory[0:10], [0, 0, 1, 2, 0, 0, 0, 0, 3, 0])
+        # Страница из одних нулей не выделяется
+        self.assertEqual(memory.populated_pages(), [0, 2])
+
+    def test_popcount_range_visits_only_range_pages(self):
+        memory = PagedMemory(page_size=4)
+        for index in range(0, 4000, 2):
+            memory[4 * index + 1] = 7
+        # Короткий диапазон не сортирует все выделенные страницы
+        with patch.object(PagedMemory, 'populated_pages', side_effect=AssertionError):
+            memory.popcount_range(6, 17)
+        self.assertEqual(memory[0:20], [0, 7, 0, 0, 0, 0, 0, 0, 0, 3, 0, 0, 0, 0, 0, 0, 0, 7, 0, 0])
+        # Диапазон шире выделенных страниц обходит их по порядку
+        memory.popcount_range(0, 1 << 32)
+        self.assertEqual((memory[1], memory[8 * 1999 + 1]), (3, 3))
+
+    def test_invalid_page_size(self):
+        with self.assertRaises(ValueError):
+            make_memory('paged', page_size=3)
+
+    def test_vm_far_addresses(self):
+        binary = assembler.assemble(
+            "LOAD_CONST 0 77\n"
+            "LOAD_CONST 1 16000000\n"
+            "WRITE_MEM 0 1\n"
+            "READ_MEM 16000000 2\n"
+            "POPCNT 3 4000000000\n"
+        )
+        vm = interpreter.VM(memory_model='paged')
+        state = vm.load(binary).run()
+        self.assertEqual(state['registers'][2], 77)
+        self.assertEqual(state['memory'][16000000], 77)
+        self.assertEqual(len(vm.memory.pages), 1)
+
+    def test_cli_paged_and_flat_size(self):
+        binary = assembler.assemble("LOAD_CONST 0 77\nLOAD_CONST 1 3000\nWRITE_MEM 0 1\n")
+        with tempfile.TemporaryDirectory() as directory:
+            bin_name = os.path.join(directory, 'p.bin')
+            res_name = os.path.join(directory, 'r.json')
+            with open(bin_name, 'wb') as f:
+                f.write(binary)
+
+            result = subprocess.run(['python', 'interpreter.py', bin_name, res_name, '2999:3001',
+                                     '--memory', 'paged', '--page-size', '1024'], capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(res_name) as f:
+                self.assertEqual(json.load(f), {'2999': [0, 77]})
+
+            result = subprocess.run(['python', 'interpreter.py', bin_name, res_name, '2999:3001',
+                                     '--memory-size', '4096'], capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            with open(res_name) as f:
+                self.assertEqual(json.load(f), [0, 77])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import unittest
+from array import array
+
+import popcnt_vector
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestPopcount(unittest.TestCase):
+    def test_scalar_matches_string_version(self):
+        for x in [0, 1, 3, 255, 511, (1 << 64) - 1, (1 << 100) + 5]:
+            self.assertEqual(popcnt_vector.popcnt(x), popcnt_vector.popcnt_str(x))
+
+    def test_any_length(self):
+        self.assertEqual(popcnt_vector.apply_popcnt_to_vector([3, 7, 15]), [2, 3, 4])
+        self.assertEqual(popcnt_vector.apply_popcnt_to_vector([]), [])
+        self.assertEqual(popcnt_vector.popcount_vector(list(range(10))), [bin(i).count('1') for i in range(10)])
+
+    def test_array_input(self):
+        result = popcnt_vector.popcount_vector(array('Q', [0, 1, (1 << 64) - 1]))
+        self.assertEqual(result, array('Q', [0, 1, 64]))
+
+    def test_buffer_input(self):
+        words = [0, 5, (1 << 63) | 1]
+        buffer = b''.join(w.to_bytes(8, byteorder='little') for w in words)
+        self.assertEqual(list(popcnt_vector.popcount_vector(buffer)), [0, 2, 2])
+        self.assertEqual(list(popcnt_vector.popcount_vector(b'\x03\xff', itemsize=1)), [2, 8])
+        with self.assertRaises(ValueError):
+            popcnt_vector.popcount_vector(b'\x01\x02\x03')
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_numpy_input(self):
+        values = np.array([[0, 7], [255, (1 << 40) - 1]], dtype=np.uint64)
+        result = popcnt_vector.popcount_vector(values)
+        self.assertEqual(result.shape, (2, 2))
+        self.assertEqual(result.tolist(), [[0, 3], [8, 40]])
+        self.assertEqual(popcnt_vector.popcount_vector(np.array([3, 1], dtype=np.uint8)).tolist(), [2, 1])
+
+    def test_negative_values_rejected(self):
+        # Результат для отрицательных чисел зависел бы от типа входа: отвергаем их на всех путях
+        inputs = [[3, -1], array('q', [-1]), array('b', [1, -2])]
+        if np is not None:
+            inputs.append(np.array([-1, 2], dtype=np.int64))
+        for values in inputs:
+            with self.assertRaisesRegex(ValueError, 'negative'):
+                popcnt_vector.popcount_vector(values)
+        self.assertEqual(popcnt_vector.popcount_vector(array('q', [7, 0])), array('q', [3, 0]))
+
+    def test_numpy_not_imported_by_interpreter(self):
+        result = subprocess.run([sys.executable, '-c', 'import interpreter, sys; print("numpy" in sys.modules)'],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_benchmark_runs(self):
+        results = popcnt_vector.benchmark(size=100, repeat=1)
+        self.assertIn('bin(x).count', results)
+        self.assertIn('int.bit_count', results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+
+import assembler
+import interpreter
+import profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.binary = assembler.assemble(
+            "LOAD_CONST 0 5\n"
+            "LOAD_CONST 1 3\n"
+            "WRITE_MEM 0 1\n"
+            "POPCNT 2 3\n"
+            "READ_MEM 3 4\n"
+            "READ_MEM 3 5\n"
+        )
+
+    def test_counts_and_addresses(self):
+        program = interpreter.decode_program(self.binary)
+        registers, memory = [0] * 8, [0] * 16
+        profile = profiler.execute_profiled(program, registers, memory)
+
+        self.assertEqual(profile.instructions, 6)
+        self.assertEqual(profile.counts[interpreter.OP_LOAD_CONST], 2)
+        self.assertEqual(profile.counts[interpreter.OP_READ_MEM], 2)
+        self.assertEqual(profile.addresses[interpreter.OP_WRITE_MEM], {3: 1})
+        self.assertEqual(profile.addresses[interpreter.OP_READ_MEM], {3: 2})
+        self.assertNotIn(interpreter.OP_LOAD_CONST, profile.addresses)
+        # Результат исполнения совпадает с обычным циклом
+        vm = interpreter.VM(memory_size=16)
+        vm.load(self.binary).run()
+        self.assertEqual((registers, memory), (vm.registers, vm.memory))
+
+    def test_to_dict(self):
+        vm = interpreter.VM(memory_size=16)
+        profile = profiler.Profile()
+        vm.load(self.binary).run(profile)
+        report = profile.to_dict(top=1)
+        self.assertEqual(report['instructions'], 6)
+        self.assertEqual(set(report['opcodes']), {'LOAD_CONST', 'WRITE_MEM', 'POPCNT', 'READ_MEM'})
+        self.assertEqual(report['opcodes']['READ_MEM']['addresses'], [[3, 2]])
+        self.assertIn('READ_MEM', profile.format_table())
+
+    def test_error_keeps_partial_profile(self):
+        binary = assembler.assemble("LOAD_CONST 0 1\nREAD_MEM 100 0\n")
+        program = interpreter.decode_program(binary)
+        with self.assertRaises(interpreter.VMError) as ctx:
+            profiler.execute_profiled(program, [0] * 8, [0] * 16)
+        self.assertEqual(ctx.exception.profile.instructions, 1)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            binary_path = os.path.join(tmp, 'program.bin')
+            with open(binary_path, 'wb') as f:
+                f.write(self.binary)
+            profile_path = os.path.join(tmp, 'profile.json')
+            result = subprocess.run(
+                ['python', 'interpreter.py', binary_path, os.path.join(tmp, 'result.json'), '0:8',
+                 '--profile', '--profile-json', profile_path, '--mmap'],
+                capture_output=True, text=True,
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn('instructions/s', result.stdout)
+            with open(profile_path) as f:
+                self.assertEqual(json.load(f)['instructions'], 6)
+
+            result = subprocess.run(
+                ['python', 'interpreter.py', binary_path, os.path.join(tmp, 'result.json'), '0:8',
+                 '--profile', '--engine', 'compiled'],
+                capture_output=True, text=True,
+            )
+            self.assertNotEqual(result.returncode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
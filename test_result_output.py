@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import assembler
+import result_output
+from paged_memory import PagedMemory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestResultOutput(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'result')
+        self.memory = [0] * 32
+        self.memory[3] = 5
+        self.memory[20] = 7
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_text(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def read_words(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        return [int.from_bytes(data[i:i + 8], byteorder='little') for i in range(0, len(data), 8)]
+
+    def test_parse_ranges(self):
+        self.assertEqual(result_output.parse_ranges("0:10,20:25"), [(0, 10), (20, 25)])
+        with self.assertRaises(ValueError):
+            result_output.parse_ranges("0-10")
+
+    def test_json_formats_agree(self):
+        ranges = [(0, 5), (18, 22)]
+        expected = {"0:5": [0, 0, 0, 5, 0], "18:22": [0, 0, 7, 0]}
+        for fmt in ('json', 'compact', 'stream'):
+            result_output.write_result(self.path, self.memory, ranges, fmt)
+            self.assertEqual(json.loads(self.read_text()), expected, fmt)
+        result_output.write_result(self.path, self.memory, ranges[:1], 'compact')
+        self.assertEqual(self.read_text(), "[0,0,0,5,0]")
+
+    def test_stream_in_chunks(self):
+        memory = list(range(10))
+        with patch('result_output.CHUNK_CELLS', 3):
+            result_output.write_result(self.path, memory, [(1, 9)], 'stream')
+            self.assertEqual(json.loads(self.read_text()), list(range(1, 9)))
+            result_output.write_result(self.path, memory, [(0, 10)], 'stream', dirty_only=True)
+            self.assertEqual(json.loads(self.read_text()), [[i, i] for i in range(1, 10)])
+
+    def test_dirty_only(self):
+        result_output.write_result(self.path, self.memory, [(0, 32)], 'json', dirty_only=True)
+        self.assertEqual(json.loads(self.read_text()), [[3, 5], [20, 7]])
+        result_output.write_result(self.path, self.memory, [(0, 32)], 'raw', dirty_only=True)
+        self.assertEqual(self.read_words(), [3, 5, 20, 7])
+
+    def test_raw(self):
+        result_output.write_result(self.path, self.memory, [(2, 4), (20, 21)], 'raw')
+        self.assertEqual(self.read_words(), [0, 5, 7])
+
+    def test_paged_memory(self):
+        memory = PagedMemory(page_size=4)
+        memory[3] = 5
+        memory[1 << 30] = 9
+        result_output.write_result(self.path, memory, [(0, 1 << 31)], 'raw', dirty_only=True)
+        self.assertEqual(self.read_words(), [3, 5, 1 << 30, 9])
+        result_output.write_result(self.path, memory, [(2, 6)], 'stream')
+        self.assertEqual(json.loads(self.read_text()), [0, 5, 0, 0])
+
+    def test_npy_header(self):
+        for dirty_only in (False, True):
+            result_output.write_result(self.path, self.memory, [(0, 32)], 'npy', dirty_only)
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            self.assertEqual(data[:8], b'\x93NUMPY\x01\x00')
+            header_length = int.from_bytes(data[8:10], byteorder='little')
+            self.assertEqual((10 + header_length) % 64, 0)
+            expected_shape = "(2, 2)" if dirty_only else "(32,)"
+            self.assertIn(f"'shape': {expected_shape}", data[10:10 + header_length].decode('latin1'))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_npy_loads_with_numpy(self):
+        result_output.write_result(self.path, self.memory, [(0, 32)], 'npy')
+        self.assertEqual(np.load(self.path).tolist(), self.memory)
+        result_output.write_result(self.path, self.memory, [(0, 32)], 'npy', dirty_only=True)
+        self.assertEqual(np.load(self.path).tolist(), [[3, 5], [20, 7]])
+
+    def test_cli(self):
+        bin_name = os.path.join(self.directory.name, 'p.bin')
+        with open(bin_name, 'wb') as f:
+            f.write(assembler.assemble("LOAD_CONST 0 25\nLOAD_CONST 1 10\nWRITE_MEM 0 1\n"))
+        result = subprocess.run(['python', 'interpreter.py', bin_name, self.path, '9:11,0:1',
+                                 '--format', 'compact'], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(self.read_text()), {"9:11": [0, 25], "0:1": [0]})
+
+        result = subprocess.run(['python', 'interpreter.py', bin_name, self.path, '0:5,0:5000'],
+                                capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("Memory range out of bounds", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
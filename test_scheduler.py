@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+
+import assembler
+import bench
+import interpreter
+import scheduler
+
+
+def make_vm(source, memory_size=1024):
+    vm = interpreter.VM(memory_size=memory_size)
+    vm.load(assembler.assemble(source))
+    return vm
+
+
+class TestStep(unittest.TestCase):
+    def test_step_matches_run(self):
+        binary = assembler.assemble(bench.generate_program(1000, memory_size=256, seed=1))
+        expected = interpreter.VM(memory_size=256).load(binary).run()
+        vm = interpreter.VM(memory_size=256).load(binary)
+        executed = []
+        while not vm.finished:
+            executed.append(vm.step(97))
+        self.assertEqual(sum(executed), 1000)
+        self.assertEqual(executed[-1], 1000 % 97)
+        self.assertEqual(vm.snapshot(), expected)
+        self.assertEqual(vm.step(10), 0)
+
+    def test_fused_budget_counts_superinstructions(self):
+        vm = interpreter.VM(memory_size=16)
+        vm.load(assembler.assemble("LOAD_CONST 0 1\nWRITE_MEM 0 0\nLOAD_CONST 1 2\n"), fuse=True)
+        self.assertEqual((vm.step(1), vm.finished), (1, False))
+        self.assertEqual((vm.step(5), vm.finished), (1, True))
+        self.assertEqual(vm.memory[1], 1)
+        self.assertEqual(vm.registers[:2], [1, 2])
+
+    def test_step_requires_decoded_program(self):
+        vm = interpreter.VM()
+        vm.load(assembler.assemble("LOAD_CONST 0 1\n"), decode=False)
+        with self.assertRaises(interpreter.VMError):
+            vm.step(1)
+
+
+class TestScheduler(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_results_match_run(self):
+        binaries = [assembler.assemble(bench.generate_program(500, memory_size=256, seed=seed)) for seed in range(20)]
+
+        async def main():
+            jobs = scheduler.Scheduler(slice_steps=7)
+            vms = [interpreter.VM(memory_size=256).load(binary) for binary in binaries]
+            return await asyncio.gather(*(jobs.run(vm) for vm in vms)), jobs
+
+        states, jobs = self.run_async(main())
+        for binary, state in zip(binaries, states):
+            self.assertEqual(state, interpreter.VM(memory_size=256).load(binary).run())
+        self.assertEqual(jobs.describe(), {'running': 0, 'completed': 20, 'steps': 20 * 500})
+
+    def test_short_job_not_starved(self):
+        async def main():
+            jobs = scheduler.Scheduler(slice_steps=10, slice_time=1e-4)
+            long_job = jobs.submit(make_vm("LOAD_CONST 0 1\n" * 50000), name='long')
+            short_job = jobs.submit(make_vm("LOAD_CONST 0 1\n" * 100), name='short')
+            await short_job.wait()
+            self.assertFalse(long_job.done())
+            await long_job.wait()
+            return long_job, short_job
+
+        long_job, short_job = self.run_async(main())
+        self.assertLess(short_job.latency, long_job.latency)
+        self.assertGreater(long_job.slices, 1)
+        self.assertEqual((long_job.steps, short_job.steps), (50000, 100))
+        metrics = long_job.describe()
+        self.assertEqual((metrics['name'], metrics['status']), ('long', 'done'))
+        self.assertGreater(metrics['throughput'], 0)
+        self.assertGreaterEqual(metrics['wait_time'], 0)
+
+    def test_instruction_limit_and_resume(self):
+        async def main():
+            jobs = scheduler.Scheduler(slice_steps=4)
+            vm = make_vm("LOAD_CONST 0 1\n" * 9 + "LOAD_CONST 1 2\n")
+            job = jobs.submit(vm, max_steps=6)
+            with self.assertRaisesRegex(scheduler.LimitExceeded, 'Instruction limit of 6'):
+                await job.wait()
+            self.assertEqual((job.status, job.steps, vm.steps), ('failed', 6, 6))
+            # Машина остановлена на границе кванта и исполняется дальше
+            state = await jobs.run(vm, max_steps=4)
+            self.assertEqual(state['registers'][:2], [1, 2])
+
+        self.run_async(main())
+
+    def test_time_limit(self):
+        async def main():
+            jobs = scheduler.Scheduler(slice_time=1e-4)
+            job = jobs.submit(make_vm("POPCNT_RANGE 0 1024\n" * 20000), max_time=0.01)
+            with self.assertRaisesRegex(scheduler.LimitExceeded, 'Time limit'):
+                await job.wait()
+            self.assertLess(job.steps, 20000)
+            self.assertGreaterEqual(job.run_time, 0.01)
+
+        self.run_async(main())
+
+    def test_cancellation_and_errors(self):
+        async def main():
+            jobs = scheduler.Scheduler(slice_steps=10, max_running=1)
+            failing = jobs.submit(make_vm("LOAD_CONST 0 1\n" * 30 + "READ_MEM 5000 0\n"))
+            running = jobs.submit(make_vm("LOAD_CONST 0 1\n" * 100000))
+            queued = jobs.submit(make_vm("LOAD_CONST 0 1\n"))
+            with self.assertRaisesRegex(interpreter.VMError, 'Memory read error'):
+                await failing.wait()
+            await asyncio.sleep(0)
+            running.cancel()
+            queued.cancel()
+            await jobs.join()
+            self.assertIn('Memory read error', failing.error)
+            self.assertEqual((running.status, queued.status), ('cancelled', 'cancelled'))
+            self.assertLess(running.vm.steps, 100000)
+            self.assertIsNone(queued.started)
+            self.assertEqual(jobs.jobs, set())
+
+        self.run_async(main())
+
+    def test_wait_for_timeout_cancels_job(self):
+        async def main():
+            jobs = scheduler.Scheduler(slice_time=1e-4)
+            job = jobs.submit(make_vm("POPCNT_RANGE 0 1024\n" * 100000))
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(job.wait(), 0.02)
+            await jobs.join()
+            self.assertEqual(job.status, 'cancelled')
+
+        self.run_async(main())
+
+    def test_requires_decoded_program(self):
+        async def main():
+            vm = interpreter.VM()
+            vm.load(assembler.assemble("LOAD_CONST 0 1\n"), decode=False)
+            with self.assertRaises(interpreter.VMError):
+                scheduler.Scheduler().submit(vm)
+
+        self.run_async(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
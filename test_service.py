@@ -0,0 +1,152 @@
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from array import array
+from unittest.mock import patch
+
+import assembler
+import container
+import scheduler
+import service
+
+SOURCE = (
+    "LOAD_CONST 0 7\n"
+    "LOAD_CONST 1 2\n"
+    "WRITE_MEM 0 1\n"
+    "POPCNT 3 2\n"
+)
+
+
+class TestHandleRequest(unittest.TestCase):
+    def setUp(self):
+        service._programs.clear()
+
+    def test_source_and_cache(self):
+        response = service.handle_request({'source': SOURCE, 'range': '0:4'})
+        self.assertEqual(response, {'ok': True, 'result': [0, 0, 3, 0], 'registers': [7, 2, 0, 3, 0, 0, 0, 0],
+                                    'cached': False})
+        self.assertTrue(service.handle_request({'source': SOURCE, 'range': '2:3'})['cached'])
+
+    def test_container_binary_with_data(self):
+        binary = container.pack(assembler.assemble("POPCNT 0 1\n"), data=[(0, array('Q', [3, 255]))])
+        response = service.handle_request({'binary': base64.b64encode(binary).decode('ascii'), 'range': '0:2'})
+        self.assertEqual((response['result'], response['registers'][0]), ([3, 8], 8))
+        self.assertIn("--container", service.handle_request({'source': '.data 0 1'})['error'])
+
+    def test_errors_are_returned(self):
+        self.assertIn("Field B=8", service.handle_request({'source': 'LOAD_CONST 8 1'})['error'])
+        self.assertIn("Memory range out of bounds",
+                      service.handle_request({'source': SOURCE, 'range': '0:2000'})['error'])
+        self.assertIn("Memory read error",
+                      service.handle_request({'source': 'READ_MEM 5000 0', 'range': '0:1'})['error'])
+        self.assertFalse(service.handle_request({})['ok'])
+        for options in ({'memory_size': 10 ** 12}, {'memory_size': '1024'}, {'memory_size': True},
+                        {'page_size': 1 << 40, 'memory': 'paged'}, {'memory_size': -1}):
+            response = service.handle_request(dict(options, source=SOURCE))
+            self.assertFalse(response['ok'])
+            self.assertIn('must be an integer', response['error'])
+        self.assertIn("'memory_size'", service.handle_request({'source': SOURCE, 'memory_size': 5000},
+                                                              max_memory_size=4096)['error'])
+        self.assertIn("--scheduler", service.handle_request({'source': SOURCE, 'max_steps': 2})['error'])
+
+    def test_scheduled(self):
+        async def main():
+            jobs = scheduler.Scheduler(slice_steps=1)
+            return await asyncio.gather(service.handle_scheduled(jobs, {'source': SOURCE, 'range': '0:4'}),
+                                        service.handle_scheduled(jobs, {'source': SOURCE, 'max_steps': 3}),
+                                        service.handle_scheduled(jobs, {'source': 'LOAD_CONST 8 1'}))
+
+        done, limited, invalid = asyncio.run(main())
+        self.assertEqual((done['result'], done['registers'][3]), ([0, 0, 3, 0], 3))
+        self.assertEqual(done['metrics']['steps'], 4)
+        self.assertGreater(done['metrics']['slices'], 1)
+        self.assertEqual((limited['ok'], limited['metrics']['steps']), (False, 3))
+        self.assertIn('Instruction limit of 3', limited['error'])
+        self.assertNotIn('metrics', invalid)
+
+    def test_scheduled_preparation_does_not_block_loop(self):
+        prepare = service.prepare_request
+
+        def slow_prepare(*args):
+            time.sleep(0.2)
+            return prepare(*args)
+
+        async def main():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            ticker = asyncio.ensure_future(tick())
+            response = await service.handle_scheduled(scheduler.Scheduler(), {'source': SOURCE, 'range': '0:4'})
+            ticker.cancel()
+            return response, ticks
+
+        with patch('service.prepare_request', slow_prepare):
+            response, ticks = asyncio.run(main())
+        self.assertEqual(response['result'], [0, 0, 3, 0])
+        # Пока запрос подготавливается, цикл событий продолжает обслуживать другие корутины
+        self.assertGreater(ticks, 5)
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'uvm.sock')
+        self.loop = asyncio.new_event_loop()
+        self.server = service.Server(self.path, workers=0, scheduler=self.make_scheduler())
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def make_scheduler(self):
+        return None
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.tmp.cleanup()
+
+    def test_client_round_trip(self):
+        with service.Client(self.path) as client:
+            self.assertEqual(client.run(SOURCE, mem_range='0:4')['result'], [0, 0, 3, 0])
+            response = client.run(binary=assembler.assemble(SOURCE), mem_range='2:3,0:1')
+            self.assertEqual(response['result'], {'2:3': [3], '0:1': [0]})
+            self.assertFalse(client.request([1, 2])['ok'])
+            self.assertIn('must be an integer', client.run(SOURCE, memory_size=10 ** 12)['error'])
+            # Соединение остаётся рабочим после ошибочного запроса
+            self.assertTrue(client.run(SOURCE, mem_range='0:1')['ok'])
+
+    def test_cli_run_forwards_page_size(self):
+        source_path = os.path.join(self.tmp.name, 'program.asm')
+        with open(source_path, 'w') as f:
+            f.write(SOURCE)
+        command = [sys.executable, 'service.py', 'run', source_path, '0:4', '--socket', self.path, '--memory', 'paged']
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        result = subprocess.run(command + ['--page-size', '16'], capture_output=True, text=True, cwd=cwd)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout), {'0': [0, 0, 3, 0]})
+        result = subprocess.run(command + ['--page-size', '3'], capture_output=True, text=True, cwd=cwd)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('Page size must be a power of two, got 3', result.stderr)
+
+
+class TestScheduledServer(TestServer):
+    def make_scheduler(self):
+        return scheduler.Scheduler()
+
+
+if __name__ == '__main__':
+    unittest.main()
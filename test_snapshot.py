@@ -0,0 +1,106 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+import assembler
+import bench
+import interpreter
+import snapshot
+from paged_memory import PagedMemory
+
+
+class TestSnapshotFormat(unittest.TestCase):
+    def test_round_trip_flat_is_sparse(self):
+        memory = [0] * 100_000
+        memory[5] = 1
+        memory[70_000:70_010] = range(1, 11)
+        state = snapshot.Snapshot(12, 40, [1, 2, 3, 4, 5, 6, 7, 2 ** 64 - 1], memory)
+        data = snapshot.dumps(state)
+        self.assertLess(len(data), 2000)
+        restored = snapshot.loads(data)
+        self.assertEqual((restored.steps, restored.pc), (12, 40))
+        self.assertEqual(restored.registers, state.registers)
+        self.assertEqual(restored.memory, memory)
+
+    def test_round_trip_paged(self):
+        vm = interpreter.VM(memory_model='paged', page_size=256)
+        vm.memory[1 << 30] = 9
+        vm.memory[7] = 3
+        restored = snapshot.loads(snapshot.dumps(vm.checkpoint()))
+        self.assertEqual(restored.memory_model, 'paged')
+        self.assertEqual(restored.memory.page_size, 256)
+        self.assertEqual((restored.memory[1 << 30], restored.memory[7], restored.memory[8]), (9, 3, 0))
+
+    def test_rejects_corrupt_data(self):
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.loads(b'not a snapshot at all, definitely not' * 3)
+        data = snapshot.dumps(snapshot.Snapshot(0, 0, [1] * 8, [1] * 10))
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.loads(data[:-8])
+        for page_size in (0, 3):
+            for model, memory in (('flat', [1] * 10), ('paged', PagedMemory())):
+                data = snapshot.dumps(snapshot.Snapshot(0, 0, [1] * 8, memory, model, page_size))
+                with self.assertRaisesRegex(snapshot.SnapshotError, 'page size'):
+                    snapshot.loads(data)
+
+
+class TestResume(unittest.TestCase):
+    def setUp(self):
+        mix = {'LOAD_CONST': 2, 'WRITE_MEM': 2, 'POPCNT': 1, 'POPCNT_RANGE': 1}
+        self.binary = assembler.assemble('\n'.join(bench.generate_program(2000, mix, seed=1)))
+        full = interpreter.VM()
+        full.load(self.binary).run()
+        self.expected = (full.registers, full.memory)
+
+    def test_stop_save_resume(self):
+        vm = interpreter.VM().load(self.binary)
+        vm.run(stop=700)
+        self.assertEqual(vm.steps, 700)
+        self.assertFalse(vm.finished)
+        state = snapshot.loads(snapshot.dumps(vm.checkpoint()))
+
+        resumed = interpreter.VM().load(self.binary).restore(state)
+        resumed.run()
+        self.assertTrue(resumed.finished)
+        self.assertEqual((resumed.registers, resumed.memory), self.expected)
+
+    def test_fork_shares_prefix(self):
+        vm = interpreter.VM().load(self.binary)
+        vm.run(stop=1000)
+        state = vm.checkpoint()
+        forks = [vm.fork(state) for _ in range(3)]
+        forks[0].memory[0] = 12345  # Изменение одной копии не затрагивает другие и снимок
+        for fork in forks[1:]:
+            fork.run()
+            self.assertEqual((fork.registers, fork.memory), self.expected)
+        self.assertEqual(state.memory[0], vm.memory[0])
+        self.assertIs(forks[0].program, vm.program)
+
+    def test_restore_rejects_other_program(self):
+        vm = interpreter.VM().load(self.binary)
+        vm.run(stop=100)
+        other = interpreter.VM().load(assembler.assemble("LOAD_CONST 0 1\n"))
+        with self.assertRaises(interpreter.VMError):
+            other.restore(vm.checkpoint())
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            binary_path = os.path.join(tmp, 'program.bin')
+            with open(binary_path, 'wb') as f:
+                f.write(self.binary)
+            snap = os.path.join(tmp, 'state.snap')
+            commands = [
+                [binary_path, os.path.join(tmp, 'full.json'), '0:1024'],
+                [binary_path, os.path.join(tmp, 'half.json'), '0:1024', '--stop-at', '900', '--save-snapshot', snap],
+                [binary_path, os.path.join(tmp, 'resumed.json'), '0:1024', '--resume', snap, '--mmap'],
+            ]
+            for command in commands:
+                result = subprocess.run(['python', 'interpreter.py'] + command, capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+            with open(os.path.join(tmp, 'full.json')) as f1, open(os.path.join(tmp, 'resumed.json')) as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import struct
+import subprocess
+import tempfile
+import unittest
+import zlib
+
+import assembler
+import bench
+import container
+import fusion
+import interpreter
+import verifier
+from paged_memory import PagedMemory
+
+
+def decode(source):
+    return interpreter.decode_program(assembler.assemble(source))
+
+
+class TestVerifier(unittest.TestCase):
+    def test_constant_addresses_are_safe(self):
+        result = verifier.verify(decode("LOAD_CONST 0 1023\nWRITE_MEM 1 0\nREAD_MEM 1023 2\nPOPCNT 3 5\n"), 1024)
+        self.assertTrue(result.safe)
+        self.assertEqual(result.instructions, 4)
+        self.assertIn('verified: 4 instructions', result.format())
+
+    def test_immediate_out_of_bounds(self):
+        result = verifier.verify(decode("LOAD_CONST 0 1\nREAD_MEM 16 0\n"), 16)
+        self.assertFalse(result.safe)
+        self.assertEqual((result.index, result.pc, result.instruction), (1, 5, 'READ_MEM 16 0'))
+        result = verifier.verify(decode("POPCNT_RANGE 10 7\n"), 16)
+        self.assertEqual((result.index, result.instruction), (0, 'POPCNT_RANGE 10 7'))
+
+    def test_address_from_memory(self):
+        # Значение, записанное по точному адресу, известно точно и после чтения остаётся допустимым адресом
+        safe = "LOAD_CONST 0 7\nLOAD_CONST 1 3\nWRITE_MEM 0 1\nREAD_MEM 3 2\nWRITE_MEM 0 2\n"
+        self.assertTrue(verifier.verify(decode(safe), 16).safe)
+        unsafe = "LOAD_CONST 0 70\nLOAD_CONST 1 3\nWRITE_MEM 0 1\nREAD_MEM 3 2\nWRITE_MEM 0 2\n"
+        result = verifier.verify(decode(unsafe), 16)
+        self.assertEqual((result.index, result.instruction), (4, 'WRITE_MEM 0 2'))
+        self.assertIn('may hold address 70', result.reason)
+
+    def test_popcnt_result_is_bounded(self):
+        # popcnt неизвестного значения не больше его длины в битах
+        source = "LOAD_CONST 0 1000\nLOAD_CONST 1 2\nWRITE_MEM 0 1\nPOPCNT 2 2\nWRITE_MEM 0 2\n"
+        self.assertTrue(verifier.verify(decode(source), 64).safe)
+
+    def test_initial_state(self):
+        program = decode("READ_MEM 0 1\nWRITE_MEM 0 1\n")
+        self.assertTrue(verifier.verify(program, 16).safe)
+        self.assertFalse(verifier.verify(program, 16, memory=[100] + [0] * 15).safe)
+        self.assertFalse(verifier.verify(decode("WRITE_MEM 0 1\n"), 16, registers=[0, 16] + [0] * 6).safe)
+        memory = PagedMemory(16, 1 << 20)
+        memory[3] = 1 << 20
+        self.assertFalse(verifier.verify(program, len(memory), memory=memory).safe)
+
+    def test_fused_program(self):
+        program = fusion.fuse(decode("LOAD_CONST 0 1\nLOAD_CONST 1 99\nWRITE_MEM 0 1\n"))
+        result = verifier.verify(program, 16)
+        self.assertEqual((result.index, result.pc, result.instruction), (1, 10, 'WRITE_MEM 0 1'))
+
+    def test_unchecked_run_matches_checked(self):
+        for seed in range(3):
+            binary = assembler.assemble(bench.generate_program(2000, memory_size=256, seed=seed))
+            checked = interpreter.VM(memory_size=256)
+            checked.load(binary).run()
+            unchecked = interpreter.VM(memory_size=256)
+            unchecked.load(binary)
+            self.assertTrue(unchecked.verify().safe)
+            unchecked.run(unchecked=True)
+            self.assertEqual((checked.registers, checked.memory), (unchecked.registers, unchecked.memory))
+
+    def test_from_header(self):
+        header = container.unpack(container.pack(assembler.assemble("LOAD_CONST 0 5\nWRITE_MEM 0 0\nREAD_MEM 40 1\n")))
+        result = verifier.from_header(header, 41)
+        self.assertEqual((result.safe, result.instructions, result.max_address), (True, 3, 40))
+        self.assertIsNone(verifier.from_header(header, 40))
+        empty = container.unpack(container.pack(assembler.assemble("LOAD_CONST 0 5\n")))
+        self.assertTrue(verifier.from_header(empty, 0).safe)
+        unbounded = container.unpack(container.pack(assembler.assemble(f"POPCNT_RANGE {(1 << 32) - 1} 2\n")))
+        self.assertIsNone(verifier.from_header(unbounded, 1 << 40))
+
+    def test_verify_requires_decoded_program(self):
+        vm = interpreter.VM()
+        vm.load(assembler.assemble("LOAD_CONST 0 1\n"), decode=False)
+        with self.assertRaises(interpreter.VMError):
+            vm.verify()
+        with self.assertRaises(interpreter.VMError):
+            vm.run(unchecked=True)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            binary_path = os.path.join(tmp, 'program.bin')
+            result_path = os.path.join(tmp, 'result.json')
+            command = ['python', 'interpreter.py', binary_path, result_path, '0:8', '--verify', '--memory-size', '16']
+            cwd = os.path.dirname(os.path.abspath(__file__))
+            with open(binary_path, 'wb') as f:
+                f.write(assembler.assemble("LOAD_CONST 0 5\nWRITE_MEM 0 0\n"))
+            result = subprocess.run(command, capture_output=True, text=True, cwd=cwd)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn('verified: 2 instructions', result.stdout)
+
+            with open(binary_path, 'wb') as f:
+                f.write(assembler.assemble("LOAD_CONST 0 50\nWRITE_MEM 0 0\n"))
+            result = subprocess.run(command, capture_output=True, text=True, cwd=cwd)
+            self.assertEqual(result.returncode, 1)
+            self.assertIn('unsafe instruction 1', result.stdout)
+            self.assertIn('out of bounds', result.stderr)
+
+            # Контейнер доказывается по заголовку; без доказательства исполнение идёт циклом с проверками
+            for source, safe in (("LOAD_CONST 0 5\nWRITE_MEM 0 0\n", True), ("READ_MEM 99 0\n", False)):
+                with open(binary_path, 'wb') as f:
+                    f.write(container.pack(assembler.assemble(source)))
+                result = subprocess.run(command, capture_output=True, text=True, cwd=cwd)
+                self.assertEqual(result.returncode, 0 if safe else 1, result.stderr)
+                self.assertIn('verified' if safe else 'unsafe instruction 0', result.stdout)
+
+            # Подменённый заголовок с верной контрольной суммой: неверная оценка обнаруживается при исполнении
+            data = bytearray(container.pack(assembler.assemble("LOAD_CONST 0 7\nLOAD_CONST 1 2000\nWRITE_MEM 0 1\n")))
+            struct.pack_into('<q', data, 28, 10)
+            struct.pack_into('<I', data, container._CHECKSUM_OFFSET, 0)
+            struct.pack_into('<I', data, container._CHECKSUM_OFFSET, zlib.crc32(data))
+            with open(binary_path, 'wb') as f:
+                f.write(data)
+            result = subprocess.run(command, capture_output=True, text=True, cwd=cwd)
+            self.assertEqual(result.returncode, 1)
+            self.assertIn('verified', result.stdout)
+            self.assertEqual(result.stderr.strip(), 'Memory access out of bounds in unchecked execution.')
+
+
+if __name__ == '__main__':
+    unittest.main()
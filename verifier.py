@@ -0,0 +1,216 @@
+"""
+Статическая проверка границ памяти программ УВМ.
+
+Адреса READ_MEM, POPCNT и POPCNT_RANGE — непосредственные значения, а адрес WRITE_MEM берётся из регистра,
+в который значения попадают только командами LOAD_CONST, READ_MEM и POPCNT. Переходов в УВМ нет, поэтому
+проверка проходит программу один раз, отслеживая для каждого регистра интервал возможных значений [lo, hi].
+Для памяти хранятся интервалы ячеек с известным адресом записи и общий интервал записей по неточному адресу;
+popcnt(x) не превосходит x и x.bit_length().
+
+Если все обращения доказуемо остаются в пределах памяти, программу можно исполнять циклом без проверок
+границ (execute(..., unchecked=True), флаг --verify интерпретатора); иначе отчёт указывает первую команду,
+безопасность которой доказать не удалось.
+
+Проверка проходит всю программу и стоит дороже, чем экономит цикл без проверок при однократном запуске.
+Контейнер (container.py) хранит наибольший адрес обращений, вычисленный этой проверкой при сборке, и
+from_header доказывает безопасность по заголовку без прохода по программе.
+"""
+from itertools import count, islice
+
+from machine import (
+    OP_FUSED_LOAD_WRITE, OP_FUSED_POPCNT_WRITE, OP_LOAD_CONST, OP_POPCNT, OP_POPCNT_RANGE, OP_READ_MEM,
+    OP_WRITE_MEM, VMError,
+)
+from paged_memory import PagedMemory
+
+# Размер команды WRITE_MEM в байтах: смещение второй половины слитой пары
+_WRITE_MEM_SIZE = 2
+
+
+class Verification:
+    """
+    Результат проверки границ.
+
+    Атрибуты:
+        safe (bool): True, если все обращения к памяти доказуемо допустимы.
+        memory_size (int | None): Размер памяти, для которой выполнена проверка (None — без ограничения).
+        instructions (int): Количество проверенных команд.
+        max_address (int | None): Наибольший адрес, к которому могут обратиться проверенные команды
+            (None — обращений к памяти нет).
+        index (int | None): Номер первой недоказанной команды.
+        pc (int | None): Смещение этой команды в бинарном коде.
+        instruction (str | None): Текст команды.
+        reason (str | None): Почему безопасность не доказана.
+    """
+
+    def __init__(self, memory_size, instructions, max_address=None, index=None, pc=None, instruction=None,
+                 reason=None):
+        self.safe = index is None
+        self.memory_size = memory_size
+        self.instructions = instructions
+        self.max_address = max_address
+        self.index = index
+        self.pc = pc
+        self.instruction = instruction
+        self.reason = reason
+
+    def format(self):
+        """
+        Возвращает текстовый отчёт.
+        """
+        if self.safe and self.memory_size is None:
+            return f"verified: {self.instructions} instructions, highest memory address {self.max_address}"
+        if self.safe:
+            return (f"verified: {self.instructions} instructions, all memory accesses within "
+                    f"[0, {self.memory_size})")
+        return f"unsafe instruction {self.index} at pc={self.pc:#x} ({self.instruction}): {self.reason}"
+
+
+def _memory_bound(memory):
+    """
+    Возвращает наибольшее значение ячейки начальной памяти.
+    """
+    if memory is None:
+        return 0
+    if isinstance(memory, PagedMemory):
+        return max((max(page) for page in memory.pages.values()), default=0)
+    return max(memory, default=0)
+
+
+def verify(program, memory_size, registers=None, memory=None, start=0, memory_bound=None):
+    """
+    Проверяет, что все обращения к памяти предекодированной программы остаются в [0, memory_size).
+
+    Параметры:
+        program (DecodedProgram): Программа (в том числе со слитыми командами, см. fusion.py).
+        memory_size (int | None): Размер памяти; None — только вычислить наибольший адрес обращений.
+        registers (list[int] | None): Начальные значения регистров (по умолчанию 8 нулевых).
+        memory (list[int] | PagedMemory | None): Начальная память (по умолчанию нулевая).
+        start (int): Номер первой проверяемой команды (продолжение исполнения из снимка).
+        memory_bound (int | None): Наибольшее значение ячейки начальной памяти, если сама память
+            не передана (например, наибольшее значение сегментов данных контейнера).
+
+    Возвращает:
+        Verification: Результат проверки.
+    """
+    lo = list(registers) if registers is not None else [0] * 8
+    hi = list(lo)
+    # Ячейки, записанные по точно известному адресу: адрес -> (lo, hi)
+    cells = {}
+    # Интервал значений ячеек начальной памяти и интервал записей по неточному адресу (None — таких не было)
+    initial = (0, _memory_bound(memory) if memory_bound is None else memory_bound)
+    weak = None
+
+    def read(addr):
+        cell = cells.get(addr, initial)
+        if weak is None:
+            return cell
+        # Запись по неточному адресу могла попасть в эту ячейку
+        return min(cell[0], weak[0]), max(cell[1], weak[1])
+
+    def popcnt_bounds(value):
+        value_lo, value_hi = value
+        if value_lo == value_hi:
+            bits = value_lo.bit_count()
+            return bits, bits
+        return 0, min(value_hi, value_hi.bit_length())
+
+    limit = memory_size if memory_size is not None else float('inf')
+    top = -1
+    for index, opcode, B, C in _instructions(program, start):
+        if opcode == OP_LOAD_CONST:
+            lo[B] = hi[B] = C
+        elif opcode == OP_READ_MEM:
+            if B > top:
+                top = B
+            if B >= limit:
+                return _unsafe(program, memory_size, start, index, f"READ_MEM {B} {C}",
+                               f"address {B} is outside memory of {memory_size} cells")
+            lo[C], hi[C] = read(B)
+        elif opcode == OP_WRITE_MEM:
+            if hi[C] > top:
+                top = hi[C]
+            if hi[C] >= limit:
+                return _unsafe(program, memory_size, start, index, f"WRITE_MEM {B} {C}",
+                               f"register {C} may hold address {hi[C]}, outside memory of {memory_size} cells")
+            value = (lo[B], hi[B])
+            if lo[C] == hi[C]:
+                cells[lo[C]] = value
+            else:
+                # Адрес известен неточно: запись может попасть в любую ячейку интервала
+                weak = value if weak is None else (min(weak[0], value[0]), max(weak[1], value[1]))
+        elif opcode == OP_POPCNT:
+            if C > top:
+                top = C
+            if C >= limit:
+                return _unsafe(program, memory_size, start, index, f"POPCNT {B} {C}",
+                               f"address {C} is outside memory of {memory_size} cells")
+            cells[C] = popcnt_bounds(read(C))
+            lo[B], hi[B] = cells[C]
+        elif opcode == OP_POPCNT_RANGE:
+            if C and B + C - 1 > top:
+                top = B + C - 1
+            if B + C > limit:
+                return _unsafe(program, memory_size, start, index, f"POPCNT_RANGE {B} {C}",
+                               f"range [{B}, {B + C}) exceeds memory of {memory_size} cells")
+            for addr in [addr for addr in cells if B <= addr < B + C]:
+                cells[addr] = popcnt_bounds(cells[addr])
+            if weak is not None:
+                weak = (0, weak[1])
+        else:
+            # Неизвестный opcode в середине программы невозможен: разбор останавливается на нём
+            raise VMError(f"Cannot verify opcode {opcode}.")
+    return Verification(memory_size, max(0, len(program) - start), top if top >= 0 else None)
+
+
+def from_header(header, memory_size):
+    """
+    Доказывает безопасность программы контейнера по наибольшему адресу из его заголовка, без прохода
+    по программе. Оценка в заголовке получена при сборке для начальной памяти из сегментов данных
+    контейнера, поэтому годится только для исполнения с начала на только что загруженной машине
+    (не после восстановления снимка). Контрольная сумма не доказывает верность оценки, и она не сверяется
+    с кодом: доверять ей можно только для плоской памяти, где неверная оценка обнаруживается при исполнении.
+
+    Параметры:
+        header (container.Container): Разобранный контейнер.
+        memory_size (int): Размер памяти.
+
+    Возвращает:
+        Verification | None: Результат safe=True, если все обращения программы в пределах памяти;
+            None, если заголовок этого не доказывает (адрес неизвестен или вне памяти).
+    """
+    if not header.bounded or (header.max_address is not None and header.max_address >= memory_size):
+        return None
+    return Verification(memory_size, header.instruction_count, header.max_address)
+
+
+def _unsafe(program, memory_size, start, index, instruction, reason):
+    """
+    Строит результат проверки, указывающий на недоказанную команду номер index.
+    """
+    pc = program.next_pc[index - 1] if index else 0
+    if instruction.startswith('WRITE_MEM') and program.ops[index] != OP_WRITE_MEM:
+        # Вторая половина слитой пары
+        pc = program.next_pc[index] - _WRITE_MEM_SIZE
+    return Verification(memory_size, index - start, None, index, pc, instruction, reason)
+
+
+def _instructions(program, start):
+    """
+    Перечисляет команды программы начиная с номера start: (номер, opcode, B, C).
+    Слитая пара (см. fusion.py) выдаётся как две исходные команды с одним номером.
+    """
+    instructions = zip(count(start), islice(program.ops, start, None), islice(program.b, start, None),
+                       islice(program.c, start, None))
+    if not program.fused:
+        return instructions
+    return _unfuse(instructions)
+
+
+def _unfuse(instructions):
+    for index, opcode, B, C in instructions:
+        if opcode == OP_FUSED_LOAD_WRITE or opcode == OP_FUSED_POPCNT_WRITE:
+            yield index, OP_LOAD_CONST if opcode == OP_FUSED_LOAD_WRITE else OP_POPCNT, B & 7, C
+            yield index, OP_WRITE_MEM, (B >> 3) & 7, B >> 6
+        else:
+            yield index, opcode, B, C